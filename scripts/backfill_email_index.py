@@ -0,0 +1,73 @@
+"""Create EMAIL#<email> pointer items for existing Cognite users.
+
+Login and the register duplicate check look users up with one GetItem on
+PK=EMAIL#<normalized email>, SK=USER (which holds cognite_user_id) instead
+of scanning the table. Users created before the pointers existed cannot
+log in until this script has been run. New users get their pointer in the
+same transaction that creates them.
+
+Emails are normalized (trimmed, lower-cased). If several users share an
+email the oldest one (by created_at) keeps the pointer and the others are
+reported.
+
+Usage:
+  python scripts/backfill_email_index.py [--apply]
+Default is dry-run; use --apply to write pointers.
+"""
+import os
+import argparse
+import sys
+
+TABLE = os.environ.get('TABLE_NAME')
+if not TABLE:
+    print('Please set TABLE_NAME env var to your DynamoDB table')
+    sys.exit(1)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from common.dynamodb import get_table
+from common.repositories import UserRepo
+
+table = get_table(TABLE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill EMAIL# pointer items for Cognite users')
+    parser.add_argument('--apply', action='store_true', help='Apply changes (default is dry-run)')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY CHANGES' if args.apply else 'DRY RUN (use --apply to write)'}")
+
+    repo = UserRepo(table)
+    users = repo.list_all()
+    print(f"Found {len(users)} users")
+
+    by_email = {}
+    for user in sorted(users, key=lambda u: u.get('created_at', '')):
+        email = UserRepo.normalize_email(user.get('email'))
+        if email:
+            by_email.setdefault(email, []).append(user)
+
+    written = 0
+    for email, group in sorted(by_email.items()):
+        user_id = UserRepo.user_id_of(group[0])
+        if len(group) > 1:
+            others = ', '.join(UserRepo.user_id_of(u) for u in group[1:])
+            print(f"  WARNING {email}: shared by {user_id} (kept) and {others}")
+
+        pointer = repo.get(UserRepo.email_key(email))
+        if pointer and pointer.get('cognite_user_id') == user_id:
+            continue
+        print(f"  EMAIL#{email} -> {user_id}")
+        if args.apply:
+            repo.put(UserRepo.email_pointer(email, user_id))
+            written += 1
+
+    if args.apply:
+        print(f"Wrote {written} pointers")
+    else:
+        print('\nDry run complete. Re-run with --apply to write pointers.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Backfill the one-shift-per-day lock items for existing SHIFT items.
+
+Creating or moving a shift writes a lock item (PK=SHIFTLOCK#YYYY-MM-DD,
+SK=EMP#employee_id) in the same conditional transaction, so a second shift
+for the same employee and date is rejected. Shifts written before the lock
+existed have no lock item and would not block a second shift until this
+script has been run. Where an employee has several shifts on a date the
+lock points at the first one by SK (the one reconcile_shifts.py keeps).
+
+Usage:
+  python scripts/backfill_shift_locks.py [--apply]
+Default is dry-run; use --apply to write the lock items.
+"""
+import os
+import argparse
+import sys
+
+TABLE = os.environ.get('TABLE_NAME')
+if not TABLE:
+    print('Please set TABLE_NAME env var to your DynamoDB table')
+    sys.exit(1)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from common.dynamodb import get_table, scan_all
+from common.repositories import ShiftRepo
+
+table = get_table(TABLE)
+
+
+def scan_prefix(prefix):
+    """Scan all items whose PK starts with prefix (following LastEvaluatedKey)."""
+    return scan_all(
+        table,
+        FilterExpression='begins_with(PK, :pk)',
+        ExpressionAttributeValues={':pk': prefix}
+    )
+
+
+def expected_locks(shifts):
+    """The lock item each (date, employee) should have: the first shift by SK."""
+    locks = {}
+    for item in sorted(shifts, key=lambda item: (item['PK'], item['SK'])):
+        lock = ShiftRepo.lock_item(item)
+        locks.setdefault((lock['PK'], lock['SK']), lock)
+    return locks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill one-shift-per-day lock items')
+    parser.add_argument('--apply', action='store_true', help='Apply changes (default is dry-run)')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY CHANGES' if args.apply else 'DRY RUN (use --apply to update)'}")
+
+    shifts = scan_prefix('SHIFT#')
+    existing = {(item['PK'], item['SK']): item for item in scan_prefix('SHIFTLOCK#')}
+    print(f"Found {len(shifts)} shift items and {len(existing)} lock items")
+
+    pending = [lock for key, lock in expected_locks(shifts).items()
+               if existing.get(key, {}).get('task_type') != lock['task_type']]
+
+    if not pending:
+        print('No changes necessary')
+        return
+
+    print(f"{len(pending)} lock items to write")
+    for lock in pending:
+        print(f"  {lock['PK']} {lock['SK']} -> {lock['task_type']}")
+
+    if args.apply:
+        written = ShiftRepo(table).batch_write(puts=pending)
+        print(f"Wrote {written} items")
+    else:
+        print('\nDry run complete. Re-run with --apply to perform changes.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Backfill the month index (GSI3) attributes on existing SHIFT items.
+
+GET /shifts/by-month reads a whole month with one query on GSI3
+(GSI3PK=SHIFTMONTH#YYYY-MM, GSI3SK=YYYY-MM-DD#EMP#employee_id#task_type).
+Shifts written before the index existed lack these attributes and would be
+invisible to that query until this script has been run.
+
+Usage:
+  python scripts/backfill_shift_month_index.py [--apply]
+Default is dry-run; use --apply to perform updates.
+"""
+import os
+import argparse
+import sys
+
+TABLE = os.environ.get('TABLE_NAME')
+if not TABLE:
+    print('Please set TABLE_NAME env var to your DynamoDB table')
+    sys.exit(1)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from common.dynamodb import get_table, scan_all
+from common.repositories import ShiftRepo
+
+table = get_table(TABLE)
+
+
+def scan_shifts():
+    """Scan all SHIFT# items (following LastEvaluatedKey)."""
+    return scan_all(
+        table,
+        FilterExpression='begins_with(PK, :pk)',
+        ExpressionAttributeValues={':pk': 'SHIFT#'}
+    )
+
+
+def month_index_keys(item):
+    return ShiftRepo.month_index_keys(*ShiftRepo.parse_key(item))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill GSI3 month index attributes on shifts')
+    parser.add_argument('--apply', action='store_true', help='Apply changes (default is dry-run)')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY CHANGES' if args.apply else 'DRY RUN (use --apply to update)'}")
+
+    shifts = scan_shifts()
+    print(f"Found {len(shifts)} shift items")
+
+    pending = []
+    for item in shifts:
+        keys = month_index_keys(item)
+        if item.get('GSI3PK') != keys['GSI3PK'] or item.get('GSI3SK') != keys['GSI3SK']:
+            pending.append((item, keys))
+
+    if not pending:
+        print('No changes necessary')
+        return
+
+    print(f"{len(pending)} items need the month index attributes")
+
+    updated = 0
+    for item, keys in pending:
+        print(f"  {item['PK']} {item['SK']} -> {keys['GSI3PK']} / {keys['GSI3SK']}")
+        if not args.apply:
+            continue
+        try:
+            table.update_item(
+                Key={'PK': item['PK'], 'SK': item['SK']},
+                UpdateExpression='SET GSI3PK = :pk, GSI3SK = :sk',
+                ExpressionAttributeValues={':pk': keys['GSI3PK'], ':sk': keys['GSI3SK']}
+            )
+            updated += 1
+        except Exception as e:
+            print(f"    Error: {e}")
+
+    if args.apply:
+        print(f"Updated {updated} items")
+    else:
+        print('\nDry run complete. Re-run with --apply to perform changes.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Create VACMONTH#YYYY-MM index items for existing vacation requests.
+
+Date-range lookups (GET /vacation-requests?from=&to=, and the absence map
+used by shift generation) read one PK=VACMONTH#<month> partition per month
+instead of every request. Each request gets one copy per month it covers
+(SK=EMP#<employee_id>#<request_id>). Requests created before the index
+existed are invisible to those lookups until this script has been run.
+New and updated requests write their copies in the same transaction.
+
+Usage:
+  python scripts/backfill_vacation_month_index.py [--apply]
+Default is dry-run; use --apply to write index items.
+"""
+import os
+import argparse
+import sys
+
+TABLE = os.environ.get('TABLE_NAME')
+if not TABLE:
+    print('Please set TABLE_NAME env var to your DynamoDB table')
+    sys.exit(1)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from common.dynamodb import get_table
+from common.repositories import VacationRepo
+
+table = get_table(TABLE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Backfill VACMONTH# index items for vacation requests')
+    parser.add_argument('--apply', action='store_true', help='Apply changes (default is dry-run)')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY CHANGES' if args.apply else 'DRY RUN (use --apply to write)'}")
+
+    repo = VacationRepo(table)
+    requests = repo.list_all()
+    print(f"Found {len(requests)} vacation requests")
+
+    puts = []
+    skipped = 0
+    for item in requests:
+        item.setdefault('employee_id', item['PK'].split('#', 1)[1])
+        month_items = VacationRepo.month_items(item)
+        if not month_items:
+            skipped += 1
+            print(f"  SKIP {item['request_id']}: no start_date or date")
+            continue
+        puts.extend(month_items)
+
+    print(f"{len(puts)} index items to write ({skipped} requests skipped)")
+    if args.apply:
+        written = repo.batch_write(puts)
+        print(f"Wrote {written} index items")
+    else:
+        print('\nDry run complete. Re-run with --apply to write index items.')
+
+
+if __name__ == '__main__':
+    main()
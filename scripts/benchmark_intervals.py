@@ -0,0 +1,89 @@
+"""Benchmark the interval conflict checks used by POST /shifts/assign.
+
+Compares the previous strptime-based overlap test against the integer-minute
+bitmaps in src/intervals.py on a synthetic day: every employee already has a
+few shifts and every task slot is checked against all of them, the way
+auto_assign_shifts does it.
+
+Usage:
+  python scripts/benchmark_intervals.py [--employees 200] [--shifts 4] [--rounds 20]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import intervals
+
+TASK_SLOTS = [('05:00', '07:00'), ('17:00', '19:00'), ('08:00', '10:00'), ('16:00', '17:00'),
+              ('10:00', '12:00'), ('14:00', '16:00'), ('13:00', '14:00'), ('20:00', '21:00')]
+
+
+def strptime_overlap(start1, end1, start2, end2):
+    """The previous shift_assignment.has_time_overlap."""
+    start1_dt = datetime.strptime(start1, '%H:%M').time()
+    end1_dt = datetime.strptime(end1, '%H:%M').time()
+    start2_dt = datetime.strptime(start2, '%H:%M').time()
+    end2_dt = datetime.strptime(end2, '%H:%M').time()
+    return not (end1_dt <= start2_dt or end2_dt <= start1_dt)
+
+
+def build_day(employee_count, shifts_per_employee):
+    existing = {}
+    for e in range(employee_count):
+        existing[f'{e + 1:03d}'] = [
+            {'start_time': f'{(e + 3 * s) % 20 + 2:02d}:30', 'end_time': f'{(e + 3 * s) % 20 + 3:02d}:15'}
+            for s in range(shifts_per_employee)
+        ]
+    return existing
+
+
+def run_strptime(existing):
+    busy = 0
+    for shifts in existing.values():
+        for start_time, end_time in TASK_SLOTS:
+            if any(strptime_overlap(s['start_time'], s['end_time'], start_time, end_time) for s in shifts):
+                busy += 1
+    return busy
+
+
+def run_bitmap(existing):
+    occupancy = intervals.DayOccupancy.from_shifts(existing)
+    busy = 0
+    for employee_id in existing:
+        for start_time, end_time in TASK_SLOTS:
+            if occupancy.busy(employee_id, start_time, end_time):
+                busy += 1
+    return busy
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark interval conflict checks')
+    parser.add_argument('--employees', type=int, default=200)
+    parser.add_argument('--shifts', type=int, default=4, help='Existing shifts per employee')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    existing = build_day(args.employees, args.shifts)
+    print(f"Day: {args.employees} employees x {args.shifts} existing shifts x {len(TASK_SLOTS)} task slots")
+
+    results = {}
+    for name, run in (('strptime', run_strptime), ('bitmap', run_bitmap)):
+        started = time.perf_counter()
+        for _ in range(args.rounds):
+            busy = run(existing)
+        elapsed = (time.perf_counter() - started) / args.rounds
+        results[name] = (elapsed, busy)
+        print(f"  {name:8s} {elapsed * 1000:9.2f} ms/round  busy={busy}")
+
+    if results['strptime'][1] != results['bitmap'][1]:
+        print('FAIL: the two implementations disagree')
+        sys.exit(1)
+    print(f"Speedup: {results['strptime'][0] / results['bitmap'][0]:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
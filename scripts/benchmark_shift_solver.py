@@ -0,0 +1,68 @@
+"""Benchmark the monthly shift solvers on a synthetic farm.
+
+Builds an in-memory month (default: 60 employees, 10 task types, 31 days,
+2 people per task per day) and times every registered solver.
+
+Usage:
+  python scripts/benchmark_shift_solver.py [--employees 60] [--tasks 10] [--days 31] [--per-task 2] [--budget 30]
+Exits with status 1 if any solver exceeds the budget (seconds).
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import shift_solver
+
+
+def build_month(employee_count, task_count, day_count, per_task):
+    tasks = [f'task{t}' for t in range(task_count)]
+    employees = []
+    for e in range(employee_count):
+        skills = {tasks[e % task_count], tasks[(e + 1) % task_count], tasks[(e + 3) % task_count]}
+        employees.append({'id': f'{e + 1:03d}', 'skills': sorted(skills), 'max_hours_per_day': 8})
+    days = [f'2030-01-{d:02d}' for d in range(1, day_count + 1)]
+    demands = []
+    for _ in days:
+        demands.append([(task, f'{5 + i % 12:02d}:00', f'{6 + i % 12:02d}:00', per_task) for i, task in enumerate(tasks)])
+    return days, demands, employees
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark monthly shift solvers')
+    parser.add_argument('--employees', type=int, default=60)
+    parser.add_argument('--tasks', type=int, default=10)
+    parser.add_argument('--days', type=int, default=31)
+    parser.add_argument('--per-task', type=int, default=2)
+    parser.add_argument('--budget', type=float, default=30.0, help='Seconds allowed per solve (Lambda timeout)')
+    args = parser.parse_args()
+
+    days, demands, employees = build_month(args.employees, args.tasks, args.days, args.per_task)
+    print(f"Problem: {args.employees} employees x {args.days} days x {args.tasks} tasks ({args.per_task} per task/day)")
+
+    over_budget = False
+    for name in shift_solver.SOLVERS:
+        started = time.perf_counter()
+        result = shift_solver.solve_month(days, demands, employees, solver=name)
+        elapsed = time.perf_counter() - started
+
+        counts = {}
+        for shift in result['assignments']:
+            counts[shift['employee_id']] = counts.get(shift['employee_id'], 0) + 1
+        loads = [counts.get(e['id'], 0) for e in employees]
+        missing = sum(u['missing'] for u in result['unfilled'])
+
+        print(f"  {name:8s} {elapsed * 1000:9.1f} ms  assigned={len(result['assignments'])} "
+              f"unfilled={missing} load min/max={min(loads)}/{max(loads)}")
+        if elapsed > args.budget:
+            over_budget = True
+
+    if over_budget:
+        print(f"FAIL: a solver exceeded the {args.budget:.1f}s budget")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
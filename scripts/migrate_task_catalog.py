@@ -0,0 +1,81 @@
+"""Tag existing task configs with the task catalog index attributes.
+
+GET /tasks reads the task catalog with one query on the sparse GSI1
+partition GSI1PK=TASK_CATALOG (GSI1SK=task_type) instead of scanning the
+whole table. TASK#<type>/CONFIG rows written before the catalog existed
+lack these attributes and are not listed until this script has been run.
+Task writes through the API add the attributes automatically.
+
+Usage:
+  python scripts/migrate_task_catalog.py [--apply]
+Default is dry-run; use --apply to perform updates.
+"""
+import os
+import argparse
+import sys
+
+TABLE = os.environ.get('TABLE_NAME')
+if not TABLE:
+    print('Please set TABLE_NAME env var to your DynamoDB table')
+    sys.exit(1)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from common.dynamodb import get_table, scan_all
+from common.repositories import TaskRepo
+
+table = get_table(TABLE)
+
+
+def scan_task_configs():
+    """Scan all TASK#<type>/CONFIG items (one-off full scan)."""
+    return scan_all(
+        table,
+        FilterExpression='begins_with(PK, :pk) AND SK = :sk',
+        ExpressionAttributeValues={':pk': 'TASK#', ':sk': TaskRepo.SK}
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Add task catalog (GSI1) attributes to task configs')
+    parser.add_argument('--apply', action='store_true', help='Apply changes (default is dry-run)')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY CHANGES' if args.apply else 'DRY RUN (use --apply to update)'}")
+
+    tasks = scan_task_configs()
+    print(f"Found {len(tasks)} task configs")
+
+    pending = []
+    for item in tasks:
+        keys = TaskRepo.catalog_keys(item['PK'].split('#', 1)[1])
+        if item.get('GSI1PK') != keys['GSI1PK'] or item.get('GSI1SK') != keys['GSI1SK']:
+            pending.append((item, keys))
+
+    if not pending:
+        print('No changes necessary')
+        return
+
+    updated = 0
+    for item, keys in pending:
+        print(f"  {item['PK']} ({item.get('name', '')}) -> {keys['GSI1PK']} / {keys['GSI1SK']}")
+        if not args.apply:
+            continue
+        try:
+            table.update_item(
+                Key={'PK': item['PK'], 'SK': item['SK']},
+                UpdateExpression='SET GSI1PK = :pk, GSI1SK = :sk',
+                ExpressionAttributeValues={':pk': keys['GSI1PK'], ':sk': keys['GSI1SK']}
+            )
+            updated += 1
+        except Exception as e:
+            print(f"    Error: {e}")
+
+    if args.apply:
+        print(f"Updated {updated} items")
+    else:
+        print('\nDry run complete. Re-run with --apply to perform changes.')
+
+
+if __name__ == '__main__':
+    main()
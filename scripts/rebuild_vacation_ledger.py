@@ -0,0 +1,78 @@
+"""Recompute VACLEDGER#<fiscal year> items from vacation request history.
+
+GET /employees/{id}/vacation-used reads one ledger item per employee and
+fiscal year (PK=EMPLOYEE#<id>, SK=VACLEDGER#<year>). Vacation creates,
+status changes and deletes keep it up to date with ADD expressions in the
+same transaction as the request, so this script is only needed once for
+requests filed before the ledger existed, or to repair drift. Ledgers
+are overwritten, so run it while nobody is filing or approving requests.
+
+Fiscal years start in FISCAL_YEAR_START_MONTH (default 4) and are named by
+the calendar year they start in. Half-day requests count 0.5 days.
+
+Usage:
+  python scripts/rebuild_vacation_ledger.py [--apply]
+Default is dry-run; use --apply to overwrite ledger items.
+"""
+import os
+import argparse
+import sys
+from datetime import datetime
+
+TABLE = os.environ.get('TABLE_NAME')
+if not TABLE:
+    print('Please set TABLE_NAME env var to your DynamoDB table')
+    sys.exit(1)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from common.dynamodb import get_table, scan_all
+from common.repositories import VacationRepo, VacationLedgerRepo
+
+table = get_table(TABLE)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild per-employee vacation ledgers')
+    parser.add_argument('--apply', action='store_true', help='Apply changes (default is dry-run)')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY CHANGES' if args.apply else 'DRY RUN (use --apply to write)'}")
+
+    requests = VacationRepo(table).list_all()
+    print(f"Found {len(requests)} vacation requests")
+
+    ledgers = {}
+    for item in requests:
+        employee_id = item.get('employee_id') or item['PK'].split('#', 1)[1]
+        for (fiscal_year, name), days in VacationLedgerRepo.contributions(item).items():
+            ledger = ledgers.setdefault((employee_id, fiscal_year), {
+                **VacationLedgerRepo.key(employee_id, fiscal_year),
+                'fiscal_year': fiscal_year,
+                'rebuilt_at': datetime.now().isoformat()
+            })
+            ledger[name] = ledger.get(name, 0) + days
+
+    existing = scan_all(
+        table,
+        FilterExpression='begins_with(SK, :sk)',
+        ExpressionAttributeValues={':sk': VacationLedgerRepo.SK_PREFIX},
+        ProjectionExpression='PK, SK'
+    )
+    rebuilt = {(ledger['PK'], ledger['SK']) for ledger in ledgers.values()}
+    stale = [item for item in existing if (item['PK'], item['SK']) not in rebuilt]
+
+    for (employee_id, fiscal_year), ledger in sorted(ledgers.items()):
+        print(f"  {employee_id} FY{fiscal_year}: used={ledger.get('used_days', 0)} pending={ledger.get('pending_days', 0)}")
+    for item in stale:
+        print(f"  DELETE {item['PK']} {item['SK']} (no requests)")
+
+    if args.apply:
+        written = VacationRepo(table).batch_write(puts=ledgers.values(), deletes=stale)
+        print(f"Wrote {written} ledger changes")
+    else:
+        print('\nDry run complete. Re-run with --apply to write ledgers.')
+
+
+if __name__ == '__main__':
+    main()
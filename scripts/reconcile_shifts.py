@@ -0,0 +1,53 @@
+"""Detect and remove duplicate (date, employee) shift rows.
+
+Runs the same reconciliation as the scheduled ShiftReconcilerFunction:
+the table is scanned in parallel segments for SHIFT# items in the date
+range, and for every employee with more than one shift on a date all but
+the first row (by SK) are deleted.
+
+Usage:
+  python scripts/reconcile_shifts.py [--from YYYY-MM-DD] [--to YYYY-MM-DD] [--segments 4] [--apply]
+Default range is the current and next month. Default is dry-run; use --apply to delete.
+"""
+import argparse
+import os
+import sys
+
+if not os.environ.get('TABLE_NAME'):
+    print('Please set TABLE_NAME env var to your DynamoDB table')
+    sys.exit(1)
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import shift_reconciler
+
+
+def main():
+    default_start, default_end = shift_reconciler.default_date_range()
+    parser = argparse.ArgumentParser(description='Remove duplicate shifts (one shift per employee per day)')
+    parser.add_argument('--from', dest='start_date', default=default_start)
+    parser.add_argument('--to', dest='end_date', default=default_end)
+    parser.add_argument('--segments', type=int, default=shift_reconciler.DEFAULT_SEGMENTS)
+    parser.add_argument('--apply', action='store_true', help='Delete duplicates (default is dry-run)')
+    args = parser.parse_args()
+
+    print(f"Mode: {'APPLY CHANGES' if args.apply else 'DRY RUN (use --apply to delete)'}")
+    print(f"Range: {args.start_date} .. {args.end_date} ({args.segments} scan segments)")
+
+    report = shift_reconciler.reconcile_duplicates(
+        args.start_date, args.end_date, dry_run=not args.apply, segments=args.segments
+    )
+
+    for group in report['groups']:
+        print(f"  {group['date']} {group['employee_id']}: keep {group['kept']}")
+        for key in group['removed']:
+            print(f"    remove {key['SK']}")
+
+    print(f"Scanned {report['scanned']} shifts, {report['duplicate_groups']} duplicate groups, "
+          f"deleted {report['deleted']} rows")
+    if not args.apply and report['groups']:
+        print('\nDry run complete. Re-run with --apply to delete duplicates.')
+
+
+if __name__ == '__main__':
+    main()
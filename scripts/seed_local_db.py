@@ -47,13 +47,13 @@ employees = [
 ]
 
 tasks = [
-    {'PK':'TASK#milking','SK':'CONFIG','name':'搾乳'},
-    {'PK':'TASK#feeding','SK':'CONFIG','name':'給餌'},
+    {'PK':'TASK#milking','SK':'CONFIG','GSI1PK':'TASK_CATALOG','GSI1SK':'milking','name':'搾乳'},
+    {'PK':'TASK#feeding','SK':'CONFIG','GSI1PK':'TASK_CATALOG','GSI1SK':'feeding','name':'給餌'},
 ]
 
 shifts = [
-    {'PK':'SHIFT#2025-12-01','SK':'EMP#E1#milking','GSI1PK':'E1','GSI1SK':'2025-12-01','GSI2PK':'milking','GSI2SK':'2025-12-01#E1','start_time':'05:00','end_time':'07:00','status':'scheduled'},
-    {'PK':'SHIFT#2025-12-01','SK':'EMP#E2#feeding','GSI1PK':'E2','GSI1SK':'2025-12-01','GSI2PK':'feeding','GSI2SK':'2025-12-01#E2','start_time':'08:00','end_time':'09:00','status':'scheduled'},
+    {'PK':'SHIFT#2025-12-01','SK':'EMP#E1#milking','GSI1PK':'E1','GSI1SK':'2025-12-01','GSI2PK':'milking','GSI2SK':'2025-12-01#E1','GSI3PK':'SHIFTMONTH#2025-12','GSI3SK':'2025-12-01#EMP#E1#milking','start_time':'05:00','end_time':'07:00','status':'scheduled'},
+    {'PK':'SHIFT#2025-12-01','SK':'EMP#E2#feeding','GSI1PK':'E2','GSI1SK':'2025-12-01','GSI2PK':'feeding','GSI2SK':'2025-12-01#E2','GSI3PK':'SHIFTMONTH#2025-12','GSI3SK':'2025-12-01#EMP#E2#feeding','start_time':'08:00','end_time':'09:00','status':'scheduled'},
 ]
 
 for item in employees + tasks + shifts:
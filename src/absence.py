@@ -0,0 +1,104 @@
+"""月間の休暇ビットマップ
+
+承認済みの休暇申請を月別の休暇インデックス（VACMONTH#YYYY-MM）から1回だけ読み込み、
+従業員×日の不在情報に展開する。
+従業員ごとに整数1つを持ち、1日あたり2ビット（午前・午後）を割り当てる。
+シフト生成中の「この従業員はこの日のこの時間帯に休みか」は、シフトと AND を取るだけで判定できる。
+"""
+import os
+from datetime import date as date_cls, timedelta
+from functools import lru_cache
+
+import intervals
+from common.repositories import VacationRepo
+
+MORNING = 0b01
+AFTERNOON = 0b10
+FULL_DAY = MORNING | AFTERNOON
+
+# 休暇申請の time_type とビットの対応（不明な値は一日休暇として扱う）
+TIME_TYPE_BITS = {
+    'full': FULL_DAY,
+    'morning': MORNING,
+    'afternoon': AFTERNOON
+}
+
+# 午前休・午後休の境界時刻
+NOON = os.environ.get('HALF_DAY_BOUNDARY', '12:00')
+
+
+@lru_cache(maxsize=1024)
+def slot_bits(start_time, end_time):
+    """時間帯が午前・午後のどちらにかかるかのビット（スロットごとに1回だけ計算する）"""
+    start, end = intervals.parse(start_time, end_time)
+    if end > intervals.MINUTES_PER_DAY:  # 日跨ぎ
+        return FULL_DAY
+    noon = intervals.to_minutes(NOON)
+    bits = 0
+    if start < noon:
+        bits |= MORNING
+    if end > noon:
+        bits |= AFTERNOON
+    return bits
+
+
+class AbsenceMap:
+    """日付リスト（通常は1か月分）に対する従業員ごとの不在ビットマップ"""
+
+    def __init__(self, days):
+        self.days = list(days)
+        self._day_index = {day: index for index, day in enumerate(self.days)}
+        self._bits = {}
+
+    @classmethod
+    def load(cls, table, days):
+        """期間にかかる承認済みの休暇を、月別の休暇インデックスから読み込む"""
+        absences = cls(days)
+        if not absences.days:
+            return absences
+        items = VacationRepo(table).list_overlapping(absences.days[0], absences.days[-1], status='approved')
+        for item in items:
+            absences.add(
+                item['employee_id'],
+                item['start_date'],
+                item.get('end_date') or item['start_date'],
+                item.get('time_type', 'full')
+            )
+        return absences
+
+    def add(self, employee_id, start_date, end_date, time_type='full'):
+        """休暇を追加する（期間外の日は無視）"""
+        bits = TIME_TYPE_BITS.get(time_type, FULL_DAY)
+        mask = self._bits.get(employee_id, 0)
+        day = date_cls.fromisoformat(start_date)
+        last = date_cls.fromisoformat(end_date)
+        while day <= last:
+            index = self._day_index.get(day.isoformat())
+            if index is not None:
+                mask |= bits << (2 * index)
+            day += timedelta(days=1)
+        if mask:
+            self._bits[employee_id] = mask
+
+    def day_bits(self, employee_id, date):
+        """その日の不在ビット（0 なら出勤可能）"""
+        index = self._day_index.get(date)
+        if index is None:
+            return 0
+        return (self._bits.get(employee_id, 0) >> (2 * index)) & FULL_DAY
+
+    def blocks(self, employee_id, date, start_time, end_time):
+        """その時間帯のシフトが休暇と重なるか"""
+        return bool(self.day_bits(employee_id, date) & slot_bits(start_time, end_time))
+
+    def full_day_keys(self):
+        """一日休暇の (日付, 従業員ID) の集合"""
+        keys = set()
+        for employee_id, mask in self._bits.items():
+            for index, day in enumerate(self.days):
+                if (mask >> (2 * index)) & FULL_DAY == FULL_DAY:
+                    keys.add((day, employee_id))
+        return keys
+
+    def __bool__(self):
+        return bool(self._bits)
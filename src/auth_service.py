@@ -1,17 +1,12 @@
 import json
-import boto3
-import os
 import time
 from decimal import Decimal
 
-# Support local dynamodb endpoint
-_dynamodb_endpoint = os.environ.get('DYNAMODB_ENDPOINT')
-if _dynamodb_endpoint:
-    dynamodb = boto3.resource('dynamodb', endpoint_url=_dynamodb_endpoint)
-else:
-    dynamodb = boto3.resource('dynamodb')
+from common.dynamodb import get_table
+from common.repositories import EmployeeRepo, UserRepo, DuplicateEmailError, DuplicateKeyError
+from common.responses import decode_request
 
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
 
 def get_cors_headers():
     return {
@@ -27,6 +22,7 @@ def decimal_default(obj):
     raise TypeError
 
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         method = event['httpMethod']
         path = event.get('path', '')
@@ -227,15 +223,7 @@ def check_user_exists(data):
             }
         
         # CogniteIDユーザーをメールアドレスで検索
-        response = table.scan(
-            FilterExpression='begins_with(PK, :pk) AND email = :email',
-            ExpressionAttributeValues={
-                ':pk': 'COGNITE_USER#',
-                ':email': email
-            }
-        )
-        
-        exists = len(response['Items']) > 0
+        exists = UserRepo(table).find_by_email(email) is not None
         
         return {
             'statusCode': 200,
@@ -264,24 +252,17 @@ def cognite_login(data):
             }
         
         # メールアドレスでユーザーを検索
-        response = table.scan(
-            FilterExpression='begins_with(PK, :pk) AND email = :email',
-            ExpressionAttributeValues={
-                ':pk': 'COGNITE_USER#',
-                ':email': email
-            }
-        )
+        user_item = UserRepo(table).find_by_email(email)
         
         # 開発用管理者アカウントの特別処理
         if email == 'admin@example.com':
-            if len(response['Items']) == 0:
+            if not user_item:
                 # 開発用管理者アカウントが存在しない場合は作成
                 cognite_user_id = 'admin001'
                 
                 from datetime import datetime
                 admin_item = {
-                    'PK': f'COGNITE_USER#{cognite_user_id}',
-                    'SK': 'PROFILE',
+                    **UserRepo.key(cognite_user_id),
                     'cognite_user_id': cognite_user_id,
                     'email': email,
                     'name': '管理者',
@@ -293,7 +274,8 @@ def cognite_login(data):
                     'updated_at': datetime.now().isoformat()
                 }
                 
-                table.put_item(Item=admin_item)
+                # ポインタの無い古い admin001 があれば上書きし、メールアドレスのポインタも作る
+                UserRepo(table).update(admin_item, old_email=None)
                 
                 # JWTトークンを生成
                 token = f"cognite_token_{cognite_user_id}_{int(time.time())}"
@@ -318,20 +300,17 @@ def cognite_login(data):
                 }
             else:
                 # 既存の管理者アカウントのロールを確認・更新
-                user_item = response['Items'][0]
                 if user_item.get('role') != 'admin':
                     user_item['role'] = 'admin'
                     table.put_item(Item=user_item)
         
-        if len(response['Items']) == 0:
+        if not user_item:
             return {
                 'statusCode': 401,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                 'body': json.dumps({'success': False, 'error': 'User not found'})
             }
         
-        user_item = response['Items'][0]
-        
         # パスワードチェック（簡易実装）
         stored_password = user_item.get('password', '')
         if stored_password != password:
@@ -400,15 +379,7 @@ def cognite_register(data):
             }
         
         # 既存ユーザーチェック
-        response = table.scan(
-            FilterExpression='begins_with(PK, :pk) AND email = :email',
-            ExpressionAttributeValues={
-                ':pk': 'COGNITE_USER#',
-                ':email': email
-            }
-        )
-        
-        if len(response['Items']) > 0:
+        if UserRepo(table).find_by_email(email):
             return {
                 'statusCode': 409,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
@@ -423,8 +394,7 @@ def cognite_register(data):
         # 新規ユーザーを作成
         from datetime import datetime
         item = {
-            'PK': f'COGNITE_USER#{cognite_user_id}',
-            'SK': 'PROFILE',
+            **UserRepo.key(cognite_user_id),
             'cognite_user_id': cognite_user_id,
             'email': email,
             'name': name,
@@ -436,7 +406,15 @@ def cognite_register(data):
             'updated_at': datetime.now().isoformat()
         }
         
-        table.put_item(Item=item)
+        # ユーザーとメールアドレスのポインタを同時に作成（同時登録による重複も防ぐ）
+        try:
+            UserRepo(table).create(item)
+        except DuplicateEmailError:
+            return {
+                'statusCode': 409,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'success': False, 'error': 'User already exists'})
+            }
         
         return {
             'statusCode': 201,
@@ -472,75 +450,74 @@ def employee_register(data):
             }
         
         # 既存ユーザーチェック
-        response = table.scan(
-            FilterExpression='begins_with(PK, :pk) AND email = :email',
-            ExpressionAttributeValues={
-                ':pk': 'COGNITE_USER#',
-                ':email': email
-            }
-        )
-        
-        if len(response['Items']) > 0:
+        if UserRepo(table).find_by_email(email):
             return {
                 'statusCode': 409,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                 'body': json.dumps({'success': False, 'error': 'User already exists'})
             }
         
-        # 従業員IDを生成
         import random
         import string
-        employee_id = ''.join(random.choices(string.digits, k=3))
-        
-        # 重複チェック
-        while True:
-            existing = table.get_item(
-                Key={'PK': 'EMPLOYEE', 'SK': employee_id}
-            )
-            if 'Item' not in existing:
-                break
-            employee_id = ''.join(random.choices(string.digits, k=3))
-        
-        # CogniteIDを生成
-        cognite_user_id = 'usr' + ''.join(random.choices(string.ascii_letters + string.digits, k=8))
-        
         from datetime import datetime
         
-        # 従業員レコードを作成（承認待ち状態）
-        employee_item = {
-            'PK': 'EMPLOYEE',
-            'SK': employee_id,
-            'employee_id': employee_id,
-            'name': name,
-            'kana_name': kana_name,
-            'phone': phone,
-            'email': email,
-            'skills': [],
-            'vacation_days': 20,
-            'status': 'PENDING_APPROVAL',  # 承認待ち
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        }
-        
-        # CogniteIDユーザーレコードを作成（非アクティブ状態）
-        cognite_item = {
-            'PK': f'COGNITE_USER#{cognite_user_id}',
-            'SK': 'PROFILE',
-            'cognite_user_id': cognite_user_id,
-            'email': email,
-            'name': name,
-            'password': password,
-            'role': 'employee',
-            'employee_id': employee_id,
-            'is_active': False,  # 非アクティブ
-            'status': 'PENDING_APPROVAL',  # 承認待ち
-            'created_at': datetime.now().isoformat(),
-            'updated_at': datetime.now().isoformat()
-        }
-        
-        # データベースに保存
-        table.put_item(Item=employee_item)
-        table.put_item(Item=cognite_item)
+        # 従業員・ユーザー・メールアドレスのポインタを1つのトランザクションで保存
+        # 従業員IDは採番カウンターから払い出し、既存IDとぶつかった場合（手動登録などで使用済み）は次の番号を使う
+        for _ in range(EmployeeRepo.MAX_ID_ATTEMPTS):
+            employee_id = EmployeeRepo(table).allocate_ids()[0]
+            
+            # CogniteIDを生成
+            cognite_user_id = 'usr' + ''.join(random.choices(string.ascii_letters + string.digits, k=8))
+            
+            # 従業員レコードを作成（承認待ち状態）
+            employee_item = {
+                **EmployeeRepo.key(employee_id),
+                'employee_id': employee_id,
+                'name': name,
+                'kana_name': kana_name,
+                'phone': phone,
+                'email': email,
+                'skills': [],
+                'vacation_days': 20,
+                'status': 'PENDING_APPROVAL',  # 承認待ち
+                'created_at': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat()
+            }
+            
+            # CogniteIDユーザーレコードを作成（非アクティブ状態）
+            cognite_item = {
+                **UserRepo.key(cognite_user_id),
+                'cognite_user_id': cognite_user_id,
+                'email': email,
+                'name': name,
+                'password': password,
+                'role': 'employee',
+                'employee_id': employee_id,
+                'is_active': False,  # 非アクティブ
+                'status': 'PENDING_APPROVAL',  # 承認待ち
+                'created_at': datetime.now().isoformat(),
+                'updated_at': datetime.now().isoformat()
+            }
+            
+            try:
+                UserRepo(table).create(cognite_item, also_put=[employee_item])
+                EmployeeRepo(table).invalidate_cache()
+                break
+            except DuplicateEmailError:
+                return {
+                    'statusCode': 409,
+                    'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                    'body': json.dumps({'success': False, 'error': 'User already exists'})
+                }
+            except DuplicateKeyError:
+                # 従業員ID（またはCogniteID）の衝突はメールアドレスの重複ではないので採番し直す
+                continue
+        else:
+            return {
+                'statusCode': 409,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'success': False, 'error': '従業員IDを採番できませんでした。再度お試しください'})
+            }
         
         return {
             'statusCode': 201,
@@ -606,23 +583,15 @@ def admin_change_password(data):
             }
         
         # 対象ユーザーを検索
-        response = table.scan(
-            FilterExpression='begins_with(PK, :pk) AND email = :email',
-            ExpressionAttributeValues={
-                ':pk': 'COGNITE_USER#',
-                ':email': target_email
-            }
-        )
+        user_item = UserRepo(table).find_by_email(target_email)
         
-        if len(response['Items']) == 0:
+        if not user_item:
             return {
                 'statusCode': 404,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                 'body': json.dumps({'success': False, 'error': 'Target user not found'})
             }
         
-        user_item = response['Items'][0]
-        
         # パスワードを更新
         from datetime import datetime
         user_item['password'] = new_password
@@ -697,23 +666,17 @@ def get_user_by_sub(sub):
     """subをキーにCogniteIDユーザーを検索"""
     try:
         # CogniteIDユーザーを検索
-        response = table.get_item(
-            Key={
-                'PK': f'COGNITE_USER#{sub}',
-                'SK': 'PROFILE'
-            }
-        )
+        item = UserRepo(table).get_user(sub)
         
-        if 'Item' not in response:
+        if not item:
             return {
                 'statusCode': 404,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                 'body': json.dumps({'error': 'User not found'})
             }
         
-        item = response['Item']
         cognite_user = {
-            'cognite_user_id': item['PK'].split('#')[1],
+            'cognite_user_id': UserRepo.user_id_of(item),
             'name': item.get('name', ''),
             'email': item.get('email', ''),
             'role': item.get('role', 'employee'),
@@ -751,19 +714,13 @@ def get_user_by_sub(sub):
 def get_cognite_user_by_id(cognite_user_id):
     """CogniteIDでユーザー情報を取得"""
     try:
-        response = table.get_item(
-            Key={
-                'PK': f'COGNITE_USER#{cognite_user_id}',
-                'SK': 'PROFILE'
-            }
-        )
+        item = UserRepo(table).get_user(cognite_user_id)
         
-        if 'Item' not in response:
+        if not item:
             return None
         
-        item = response['Item']
         return {
-            'cognite_user_id': item['PK'].split('#')[1],
+            'cognite_user_id': UserRepo.user_id_of(item),
             'name': item.get('name', ''),
             'email': item.get('email', ''),
             'role': item.get('role', 'employee'),
@@ -778,17 +735,11 @@ def get_cognite_user_by_id(cognite_user_id):
 def get_employee_by_id(employee_id):
     """従業員IDで従業員情報を取得"""
     try:
-        response = table.get_item(
-            Key={
-                'PK': 'EMPLOYEE',
-                'SK': employee_id
-            }
-        )
+        item = EmployeeRepo(table).get_employee(employee_id)
         
-        if 'Item' not in response:
+        if not item:
             return None
         
-        item = response['Item']
         return {
             'employee_id': item['SK'],
             'name': item.get('name', ''),
@@ -0,0 +1,155 @@
+"""シフト画面の初期表示データをまとめて返すハンドラー
+
+shifts.html は表示時に従業員・作業種別・休暇申請・確定日設定・月別シフトを別々の API から読んでいた。
+ここではそれらの DynamoDB 読み込みをスレッドプールで並行に実行し、1つのレスポンスにまとめる。
+レスポンス全体から ETag を計算し、If-None-Match が一致すれば 304 を返す（common.responses）。
+"""
+import calendar
+import json
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from common.dynamodb import get_table
+from common.repositories import (
+    ShiftRepo, EmployeeRepo, TaskRepo, RequirementsRepo, SettingsRepo, VacationRepo
+)
+from common.responses import conditional_get
+
+table = get_table()
+
+# 並行に実行する読み込みの数（boto3 のクライアントはスレッドセーフなので同じテーブルを共有する）
+MAX_WORKERS = 6
+
+DEFAULT_CONFIRMATION_DAY = 25
+
+def get_cors_headers():
+    return {
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
+        'Access-Control-Allow-Methods': 'GET,OPTIONS',
+        'Access-Control-Expose-Headers': 'ETag'
+    }
+
+def decimal_default(obj):
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+def lambda_handler(event, context):
+    try:
+        http_method = event['httpMethod']
+        path = event['path']
+
+        if http_method == 'OPTIONS':
+            return {
+                'statusCode': 200,
+                'headers': get_cors_headers(),
+                'body': ''
+            }
+
+        if http_method == 'GET' and path == '/bootstrap/shift-calendar':
+            return get_shift_calendar(event)
+        else:
+            return {
+                'statusCode': 404,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'error': 'Not found'})
+            }
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': str(e)})
+        }
+
+def load_employees():
+    return [
+        {
+            'employee_id': item['SK'],
+            'name': item.get('name', ''),
+            'kana_name': item.get('kana_name', ''),
+            'skills': item.get('skills', []),
+            'vacation_days': item.get('vacation_days', 20),
+            'status': item.get('status', 'ACTIVE'),
+            'deleted': item.get('deleted', False)
+        }
+        for item in EmployeeRepo(table).list_all()
+    ]
+
+def load_tasks():
+    tasks = []
+    for item in TaskRepo(table).list_all():
+        task = {key: value for key, value in item.items() if not key.startswith(('PK', 'SK', 'GSI'))}
+        task['task_type'] = item.get('task_type') or item['PK'].split('#', 1)[1]
+        tasks.append(task)
+    tasks.sort(key=lambda task: int(task['task_type']) if task['task_type'].isdigit() else 999)
+    return tasks
+
+def load_requirements(month):
+    repo = RequirementsRepo(table)
+    return {
+        'default': repo.get_month(month) or repo.get_global_default() or {},
+        'daily': repo.get_daily_for_month(month)
+    }
+
+def load_vacations(first_day, last_day):
+    return VacationRepo(table).list_overlapping(first_day, last_day)
+
+def load_confirmation():
+    item = SettingsRepo(table).get_settings('CONFIRMATION') or {}
+    return {'confirmation_day': item.get('confirmation_day', DEFAULT_CONFIRMATION_DAY)}
+
+def load_shifts(month):
+    shifts = []
+    seen = set()
+    for item in ShiftRepo(table).list_by_month(month):
+        date, employee_id, task_type = ShiftRepo.parse_key(item)
+        # get_shifts_by_month と同じく、同じ日の同じ従業員は先頭の1件だけ
+        if (date, employee_id) in seen:
+            continue
+        seen.add((date, employee_id))
+        shifts.append({
+            'date': date,
+            'employee_id': employee_id,
+            'task_type': task_type,
+            'start_time': item['start_time'],
+            'end_time': item['end_time'],
+            'status': item.get('status', 'scheduled')
+        })
+    return shifts
+
+def get_shift_calendar(event):
+    """GET /bootstrap/shift-calendar?month=YYYY-MM"""
+    params = event.get('queryStringParameters') or {}
+    month = params.get('month') or ''
+    try:
+        year, month_num = map(int, month.split('-'))
+        days_in_month = calendar.monthrange(year, month_num)[1]
+    except ValueError:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': f'不正な月フォーマット: {month}'})
+        }
+    month = f'{year:04d}-{month_num:02d}'
+    first_day, last_day = f'{month}-01', f'{month}-{days_in_month:02d}'
+
+    loaders = {
+        'employees': load_employees,
+        'tasks': load_tasks,
+        'requirements': lambda: load_requirements(month),
+        'vacations': lambda: load_vacations(first_day, last_day),
+        'confirmation': load_confirmation,
+        'shifts': lambda: load_shifts(month)
+    }
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = {name: executor.submit(loader) for name, loader in loaders.items()}
+        payload = {'month': month}
+        payload.update({name: future.result() for name, future in futures.items()})
+
+    body = json.dumps(payload, default=decimal_default, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return conditional_get(event, {
+        'statusCode': 200,
+        'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+        'body': body
+    }, 'shifts')
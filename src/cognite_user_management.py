@@ -1,16 +1,12 @@
 import json
-import boto3
-import os
 from decimal import Decimal
 
-# Support local dynamodb endpoint
-_dynamodb_endpoint = os.environ.get('DYNAMODB_ENDPOINT')
-if _dynamodb_endpoint:
-    dynamodb = boto3.resource('dynamodb', endpoint_url=_dynamodb_endpoint)
-else:
-    dynamodb = boto3.resource('dynamodb')
+from common.dynamodb import get_table
+from common.repositories import UserRepo, DuplicateEmailError
+from common.pagination import page_request, page_body
+from common.responses import decode_request
 
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
 
 def get_cors_headers():
     return {
@@ -26,6 +22,7 @@ def decimal_default(obj):
     raise TypeError
 
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         method = event['httpMethod']
         path = event.get('path', '')
@@ -44,7 +41,7 @@ def lambda_handler(event, context):
                 return get_cognite_user(user_id)
             else:
                 # ユーザー一覧取得
-                return get_cognite_users()
+                return get_cognite_users(event)
         elif method == 'POST':
             return create_cognite_user(json.loads(event['body']))
         elif method == 'PUT':
@@ -67,16 +64,26 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-def get_cognite_users():
-    """CogniteIDユーザー一覧を取得"""
+def get_cognite_users(event=None):
+    """CogniteIDユーザー一覧を取得（?limit=&cursor= 指定時はページング）"""
     try:
-        response = table.scan(
-            FilterExpression='begins_with(PK, :pk)',
-            ExpressionAttributeValues={':pk': 'COGNITE_USER#'}
-        )
+        paging = page_request(event)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': str(e)})
+        }
+    
+    try:
+        repo = UserRepo(table)
+        if paging:
+            items, next_cursor = repo.page(*paging)
+        else:
+            items, next_cursor = repo.list_all(), None
         
         users = []
-        for item in response['Items']:
+        for item in items:
             if item['SK'] == 'PROFILE':
                 user = {
                     'cognite_user_id': item['PK'].split('#')[1],
@@ -90,13 +97,13 @@ def get_cognite_users():
                 }
                 users.append(user)
         
-        # 作成日時でソート
+        # 作成日時でソート（ページング時はページ内で）
         users.sort(key=lambda x: x.get('created_at', ''))
         
         return {
             'statusCode': 200,
             'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-            'body': json.dumps(users, default=decimal_default)
+            'body': json.dumps(page_body(users, next_cursor) if paging else users, default=decimal_default)
         }
         
     except Exception as e:
@@ -154,27 +161,14 @@ def create_cognite_user(data):
         # CogniteIDを自動生成
         cognite_user_id = generate_cognite_user_id()
         
-        # 既存チェック（念のため）
-        existing = table.get_item(
-            Key={
-                'PK': f'COGNITE_USER#{cognite_user_id}',
-                'SK': 'PROFILE'
-            }
-        )
+        repo = UserRepo(table)
         
-        # 重複した場合は再生成
-        while 'Item' in existing:
+        # 既存チェック（念のため）。重複した場合は再生成
+        while repo.get_user(cognite_user_id):
             cognite_user_id = generate_cognite_user_id()
-            existing = table.get_item(
-                Key={
-                    'PK': f'COGNITE_USER#{cognite_user_id}',
-                    'SK': 'PROFILE'
-                }
-            )
         
         item = {
-            'PK': f'COGNITE_USER#{cognite_user_id}',
-            'SK': 'PROFILE',
+            **UserRepo.key(cognite_user_id),
             'cognite_user_id': cognite_user_id,
             'email': data.get('email', ''),
             'name': data.get('name', ''),
@@ -185,7 +179,15 @@ def create_cognite_user(data):
             'updated_at': data.get('updated_at', '')
         }
         
-        table.put_item(Item=item)
+        # ユーザーとメールアドレスのポインタを同じトランザクションで作成
+        try:
+            repo.create(item)
+        except DuplicateEmailError as e:
+            return {
+                'statusCode': 409,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'error': str(e)})
+            }
         
         return {
             'statusCode': 201,
@@ -216,14 +218,10 @@ def update_cognite_user(user_id, data):
     """CogniteIDユーザーを更新"""
     try:
         # 既存データを取得
-        response = table.get_item(
-            Key={
-                'PK': f'COGNITE_USER#{user_id}',
-                'SK': 'PROFILE'
-            }
-        )
+        repo = UserRepo(table)
+        item = repo.get_user(user_id)
         
-        if 'Item' not in response:
+        if not item:
             return {
                 'statusCode': 404,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
@@ -231,7 +229,7 @@ def update_cognite_user(user_id, data):
             }
         
         # 既存データとマージ
-        item = response['Item']
+        old_email = item.get('email', '')
         item.update({
             'email': data.get('email', item.get('email', '')),
             'name': data.get('name', item.get('name', '')),
@@ -241,7 +239,15 @@ def update_cognite_user(user_id, data):
             'updated_at': data.get('updated_at', '')
         })
         
-        table.put_item(Item=item)
+        # メールアドレスが変わった場合はポインタも同じトランザクションで付け替える
+        try:
+            repo.update(item, old_email)
+        except DuplicateEmailError as e:
+            return {
+                'statusCode': 409,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'error': str(e)})
+            }
         
         return {
             'statusCode': 200,
@@ -259,12 +265,7 @@ def update_cognite_user(user_id, data):
 def delete_cognite_user(user_id):
     """CogniteIDユーザーを削除"""
     try:
-        table.delete_item(
-            Key={
-                'PK': f'COGNITE_USER#{user_id}',
-                'SK': 'PROFILE'
-            }
-        )
+        UserRepo(table).delete_user(user_id)
         
         return {
             'statusCode': 200,
@@ -3,12 +3,14 @@ import boto3
 import os
 from decimal import Decimal
 
+from common.dynamodb import get_table
+from common.responses import decode_request
+
 # Cognito Identity Provider client
 cognito_client = boto3.client('cognito-idp')
 
 # DynamoDB
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
 
 def get_cors_headers():
     return {
@@ -23,6 +25,7 @@ def decimal_default(obj):
     raise TypeError
 
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         method = event['httpMethod']
         path = event.get('path', '')
@@ -0,0 +1,7 @@
+"""Lambda 関数間で共有するデータアクセス層
+
+- common.dynamodb: DynamoDB リソース/テーブルの共通生成とページング・バッチ処理
+- common.repositories: エンティティごとのキー形式とアクセスをまとめたリポジトリ
+
+すべての関数は CodeUri: src/ を共有しているため、このパッケージは各関数にそのまま同梱される。
+"""
@@ -0,0 +1,126 @@
+"""ウォームコンテナで使い回す参照データのキャッシュ
+
+必要人数・設定・作業設定・従業員一覧のように、読み込みが多く更新が少ないデータを
+モジュール変数に保持し、同じコンテナの後続の呼び出しで再利用する。
+
+無効化はバージョンカウンター（PK=CACHE_VERSION, SK=名前空間, version）で行う。
+書き込み側は bump() でカウンターを ADD し、読み込み側はキャッシュ済みのバージョンと比べる。
+バージョンの確認は小さな GetItem 1回で、VERSION_CHECK_INTERVAL 秒ごとにしか行わない。
+カウンターを更新しない書き込み（コンソールでの直接編集など）も CACHE_TTL 秒で反映される。
+バージョンが読めない場合はキャッシュを使わずに毎回読み込む。
+"""
+import copy
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+CACHE_TTL = float(os.environ.get('REFERENCE_CACHE_TTL', '300'))
+VERSION_CHECK_INTERVAL = float(os.environ.get('REFERENCE_CACHE_VERSION_CHECK', '1'))
+MAX_ENTRIES = int(os.environ.get('REFERENCE_CACHE_MAX_ENTRIES', '256'))
+
+VERSION_PK = 'CACHE_VERSION'
+
+REQUIREMENTS = 'requirements'
+SETTINGS = 'settings'
+TASKS = 'tasks'
+EMPLOYEES = 'employees'
+
+
+class _TableState:
+    def __init__(self):
+        self.entries = OrderedDict()  # (namespace, key) -> (version, expires_at, value)
+        self.versions = {}  # namespace -> (version, checked_at)
+
+
+class ReferenceCache:
+    """TTL と件数上限（LRU）つきのキャッシュ。状態はテーブルごとに持つ"""
+
+    def __init__(self, ttl=CACHE_TTL, max_entries=MAX_ENTRIES, version_check_interval=VERSION_CHECK_INTERVAL):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version_check_interval = version_check_interval
+        self._states = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def version_key(namespace):
+        return {'PK': VERSION_PK, 'SK': namespace}
+
+    def _state(self, table):
+        try:
+            with self._lock:
+                state = self._states.get(table)
+                if state is None:
+                    state = self._states[table] = _TableState()
+                return state
+        except TypeError:  # 弱参照・ハッシュできないテーブル
+            return None
+
+    def _version(self, table, state, namespace):
+        now = time.monotonic()
+        cached = state.versions.get(namespace)
+        if cached and now - cached[1] < self.version_check_interval:
+            return cached[0]
+        item = table.get_item(Key=self.version_key(namespace)).get('Item') or {}
+        version = int(item.get('version', 0))
+        state.versions[namespace] = (version, now)
+        return version
+
+    def get(self, table, namespace, key, loader):
+        """キャッシュ済みの値を返す。ないか古ければ loader() で読み込んで保存する
+
+        呼び出し側が書き換えても影響しないよう、値はコピーして返す。
+        """
+        state = self._state(table)
+        if state is None:
+            return loader()
+        try:
+            version = self._version(table, state, namespace)
+        except Exception as e:
+            print(f"Reference cache bypassed for {namespace}: {str(e)}")
+            return loader()
+
+        entry_key = (namespace, key)
+        now = time.monotonic()
+        with self._lock:
+            entry = state.entries.get(entry_key)
+            if entry and entry[0] == version and entry[1] > now:
+                state.entries.move_to_end(entry_key)
+                return copy.deepcopy(entry[2])
+
+        value = loader()
+        with self._lock:
+            state.entries[entry_key] = (version, now + self.ttl, copy.deepcopy(value))
+            state.entries.move_to_end(entry_key)
+            while len(state.entries) > self.max_entries:
+                state.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, table, namespace):
+        """このコンテナの名前空間のキャッシュを捨てる"""
+        state = self._state(table)
+        if state is None:
+            return
+        with self._lock:
+            for entry_key in [k for k in state.entries if k[0] == namespace]:
+                del state.entries[entry_key]
+            state.versions.pop(namespace, None)
+
+    def bump(self, table, namespace):
+        """名前空間のバージョンを上げ、他のコンテナのキャッシュも無効にする"""
+        self.invalidate(table, namespace)
+        try:
+            table.update_item(
+                Key=self.version_key(namespace),
+                UpdateExpression='ADD #version :one',
+                ExpressionAttributeNames={'#version': 'version'},
+                ExpressionAttributeValues={':one': 1}
+            )
+        except Exception as e:
+            # 書き込み自体は成功しているので、他のコンテナは TTL で追いつく
+            print(f"Failed to bump cache version for {namespace}: {str(e)}")
+
+
+reference_cache = ReferenceCache()
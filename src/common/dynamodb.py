@@ -0,0 +1,240 @@
+"""DynamoDB への共通アクセス
+
+コンテナ内で DynamoDB リソースを1つだけ生成し、すべてのハンドラーで共有する。
+接続プール・リトライ・タイムアウト・TCP keep-alive の設定はここで一元的に調整する。
+
+query/scan は必ずここのヘルパーを通す。1MB を超える結果や FilterExpression で空になったページも
+LastEvaluatedKey を辿って読み切る（iter_query / iter_scan）。一覧 API のカーソルページングには
+query_page / scan_page を使う（カーソルは LastEvaluatedKey を base64 化した文字列）。
+"""
+import base64
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import boto3
+
+try:
+    from botocore.config import Config
+except ImportError:  # botocore を持たないテスト環境向け
+    Config = None
+
+MAX_POOL_CONNECTIONS = int(os.environ.get('DYNAMODB_MAX_POOL_CONNECTIONS', '25'))
+MAX_ATTEMPTS = int(os.environ.get('DYNAMODB_MAX_ATTEMPTS', '5'))
+CONNECT_TIMEOUT = float(os.environ.get('DYNAMODB_CONNECT_TIMEOUT', '2'))
+READ_TIMEOUT = float(os.environ.get('DYNAMODB_READ_TIMEOUT', '5'))
+
+# BatchGetItem の1リクエストあたりの上限件数
+BATCH_GET_SIZE = 100
+
+_resource = None
+_tables = {}
+
+
+def _boto_config():
+    if Config is None:
+        return None
+    return Config(
+        max_pool_connections=MAX_POOL_CONNECTIONS,
+        retries={'max_attempts': MAX_ATTEMPTS, 'mode': 'adaptive'},
+        connect_timeout=CONNECT_TIMEOUT,
+        read_timeout=READ_TIMEOUT,
+        tcp_keepalive=True
+    )
+
+
+def get_resource():
+    """共有の DynamoDB リソース（初回呼び出し時に生成）"""
+    global _resource
+    if _resource is None:
+        kwargs = {}
+        config = _boto_config()
+        if config is not None:
+            kwargs['config'] = config
+        # Support local dynamodb endpoint
+        endpoint = os.environ.get('DYNAMODB_ENDPOINT')
+        if endpoint:
+            kwargs['endpoint_url'] = endpoint
+        _resource = boto3.resource('dynamodb', **kwargs)
+    return _resource
+
+
+def get_table(name=None):
+    """共有リソースから Table を取得（テーブル名ごとにキャッシュ）"""
+    name = name or os.environ['TABLE_NAME']
+    if name not in _tables:
+        _tables[name] = get_resource().Table(name)
+    return _tables[name]
+
+
+def iter_pages(operation, page_size=None, **params):
+    """query/scan を LastEvaluatedKey を辿って1ページずつ返すジェネレーター
+
+    FilterExpression 付きのページは空になることがあるが、LastEvaluatedKey がある限り読み続ける。
+    page_size は1リクエストで評価する件数（Limit）。
+    """
+    if page_size:
+        params['Limit'] = page_size
+    while True:
+        response = operation(**params)
+        yield response
+        if 'LastEvaluatedKey' not in response:
+            return
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def iter_query(table, page_size=None, **params):
+    """query の結果を全ページにわたって1件ずつ返す"""
+    for response in iter_pages(table.query, page_size, **params):
+        yield from response.get('Items', [])
+
+
+def iter_scan(table, page_size=None, segments=1, **params):
+    """scan の結果を全ページにわたって1件ずつ返す
+
+    segments > 1 のときは並列セグメントスキャンを行い、終わったセグメントから順に返す。
+    boto3 のクライアントはスレッドセーフなので、同じテーブルを各スレッドで共有する。
+    """
+    if segments <= 1:
+        for response in iter_pages(table.scan, page_size, **params):
+            yield from response.get('Items', [])
+        return
+
+    def scan_segment(segment):
+        return list(iter_scan(table, page_size, Segment=segment, TotalSegments=segments, **params))
+
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [executor.submit(scan_segment, segment) for segment in range(segments)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def query_all(table, **params):
+    """query を最後まで実行し、全アイテムをリストで返す"""
+    return list(iter_query(table, **params))
+
+
+def scan_all(table, segments=1, **params):
+    """scan を最後まで実行し、全アイテムをリストで返す"""
+    return list(iter_scan(table, segments=segments, **params))
+
+
+def encode_cursor(last_evaluated_key):
+    """LastEvaluatedKey を URL に載せられるカーソル文字列にする"""
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, default=str, sort_keys=True, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """カーソル文字列を ExclusiveStartKey に戻す。不正な値なら ValueError"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+    except (ValueError, UnicodeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+    if not isinstance(key, dict) or not all(isinstance(v, str) for v in key.values()):
+        raise ValueError('Invalid cursor')
+    return key
+
+
+def _fetch_page(operation, limit, cursor=None, **params):
+    items = []
+    start_key = decode_cursor(cursor)
+    while True:
+        request = dict(params, Limit=limit - len(items))
+        if start_key:
+            request['ExclusiveStartKey'] = start_key
+        response = operation(**request)
+        items.extend(response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey')
+        # Limit は評価件数の上限なので、LastEvaluatedKey から再開すれば取りこぼしも重複もない
+        if not start_key or len(items) >= limit:
+            return items, encode_cursor(start_key)
+
+
+def query_page(table, limit, cursor=None, **params):
+    """query の1ページ分（最大 limit 件）と次ページのカーソルを返す
+
+    FilterExpression で空ページになっても limit 件に達するか末尾まで読み進める。
+    最終ページなら次のカーソルは None。
+    """
+    return _fetch_page(table.query, limit, cursor, **params)
+
+
+def scan_page(table, limit, cursor=None, **params):
+    """scan の1ページ分（最大 limit 件）と次ページのカーソルを返す"""
+    return _fetch_page(table.scan, limit, cursor, **params)
+
+
+def batch_get(table, keys):
+    """キーのリストをまとめて取得（100件ずつ。UnprocessedKeys は再送する）"""
+    keys = list(keys)
+    items = []
+    resource = get_resource()
+    for start in range(0, len(keys), BATCH_GET_SIZE):
+        request = {table.name: {'Keys': keys[start:start + BATCH_GET_SIZE]}}
+        while request:
+            response = resource.batch_get_item(RequestItems=request)
+            items.extend(response.get('Responses', {}).get(table.name, []))
+            request = response.get('UnprocessedKeys') or None
+    return items
+
+
+def batch_write(table, puts=(), deletes=()):
+    """削除と追加をまとめて書き込む
+
+    batch_writer は 25 件ごとに BatchWriteItem を送り、未処理分も再送する。
+    同じキーの削除と追加が同じバッチに入らないよう overwrite_by_pkeys で後勝ちにする。
+    書き込んだ件数を返す。
+    """
+    puts = list(puts)
+    deletes = list(deletes)
+    if not puts and not deletes:
+        return 0
+    with table.batch_writer(overwrite_by_pkeys=['PK', 'SK']) as batch:
+        for key in deletes:
+            batch.delete_item(Key=key)
+        for item in puts:
+            batch.put_item(Item=item)
+    return len(puts) + len(deletes)
+
+
+def transact_write(table, actions):
+    """TransactWriteItems をテーブルリソースと同じ形式（Python の値）で実行する
+
+    actions は {'Put': {'Item': ..., 'ConditionExpression': ...}} / {'Delete': {'Key': ...}} /
+    {'Update': {'Key': ..., 'UpdateExpression': ...}} / {'ConditionCheck': {...}} のリスト。
+    TableName は自動で付与する。条件に失敗すると TransactionCanceledException（ClientError）になる。
+    """
+    from boto3.dynamodb.types import TypeSerializer
+    serializer = TypeSerializer()
+
+    def serialize(values):
+        return {k: serializer.serialize(v) for k, v in values.items()}
+
+    items = []
+    for action in actions:
+        (kind, params), = action.items()
+        request = {'TableName': table.name}
+        for name, value in params.items():
+            if name in ('Item', 'Key', 'ExpressionAttributeValues'):
+                value = serialize(value)
+            request[name] = value
+        items.append({kind: request})
+    return table.meta.client.transact_write_items(TransactItems=items)
+
+
+def error_code(error):
+    """botocore の ClientError からエラーコードを取り出す（それ以外は None）"""
+    return getattr(error, 'response', {}).get('Error', {}).get('Code')
+
+
+def cancellation_reasons(error):
+    """TransactionCanceledException の各アクションの失敗理由コードのリスト"""
+    reasons = getattr(error, 'response', {}).get('CancellationReasons', [])
+    return [reason.get('Code', 'None') for reason in reasons]
+
@@ -0,0 +1,33 @@
+"""一覧 API のカーソルページング
+
+クエリ文字列に limit または cursor があるときだけページングし、
+{'items': [...], 'next_cursor': 'カーソル' | None} の形で返す。
+どちらも無い場合は従来どおり全件を配列で返す（既存のフロントエンド互換）。
+"""
+from common.dynamodb import decode_cursor
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def page_request(event):
+    """イベントから (limit, cursor) を取り出す。ページング指定が無ければ None
+
+    limit が数値でない・範囲外の場合や、cursor が壊れている場合は ValueError。
+    """
+    params = (event or {}).get('queryStringParameters') or {}
+    if 'limit' not in params and 'cursor' not in params:
+        return None
+    try:
+        limit = int(params.get('limit') or DEFAULT_PAGE_SIZE)
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_PAGE_SIZE}')
+    cursor = params.get('cursor') or None
+    decode_cursor(cursor)
+    return limit, cursor
+
+
+def page_body(items, next_cursor):
+    return {'items': items, 'next_cursor': next_cursor}
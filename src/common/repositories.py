@@ -0,0 +1,1082 @@
+"""エンティティごとのリポジトリ
+
+シングルテーブル設計の PK/SK 形式とページング・バッチ処理をここにまとめる。
+各リポジトリは Table を受け取って作る（ハンドラーのモジュール変数 table をテストで差し替えられるように、
+リポジトリは呼び出し時に生成する）。
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from common import cache
+from common.cache import reference_cache
+from common.dynamodb import (
+    query_all, scan_all, query_page, scan_page, batch_get, batch_write,
+    transact_write, error_code, cancellation_reasons
+)
+
+
+class DuplicateEmailError(Exception):
+    """同じメールアドレスのユーザーが既に存在する"""
+
+
+class DuplicateKeyError(Exception):
+    """作成しようとしたアイテムのキー（ユーザーID・従業員IDなど）が既に存在する"""
+
+    def __init__(self, key):
+        super().__init__(f"{key['PK']}/{key['SK']} は既に存在します")
+        self.key = key
+
+
+class BaseRepo:
+    def __init__(self, table):
+        self.table = table
+
+    def get(self, key):
+        return self.table.get_item(Key=key).get('Item')
+
+    def put(self, item):
+        self.table.put_item(Item=item)
+        return item
+
+    def delete(self, key):
+        self.table.delete_item(Key=key)
+
+    def batch_get(self, keys):
+        return batch_get(self.table, keys)
+
+    def batch_write(self, puts=(), deletes=()):
+        return batch_write(self.table, puts, deletes)
+
+
+class CachedRepo(BaseRepo):
+    """読み込みをウォームコンテナのキャッシュに載せるリポジトリ
+
+    書き込み（put/delete/batch_write）のたびに名前空間のバージョンを上げる。
+    """
+    CACHE_NAMESPACE = None
+
+    def _cached(self, key, loader):
+        return reference_cache.get(self.table, self.CACHE_NAMESPACE, key, loader)
+
+    def invalidate_cache(self):
+        reference_cache.bump(self.table, self.CACHE_NAMESPACE)
+
+    def put(self, item):
+        item = super().put(item)
+        self.invalidate_cache()
+        return item
+
+    def delete(self, key):
+        super().delete(key)
+        self.invalidate_cache()
+
+    def batch_write(self, puts=(), deletes=()):
+        count = super().batch_write(puts, deletes)
+        if count:
+            self.invalidate_cache()
+        return count
+
+
+class ShiftRepo(BaseRepo):
+    """シフト: PK=SHIFT#日付, SK=EMP#従業員ID#作業種別
+
+    GSI1 は従業員別（GSI1PK=従業員ID, GSI1SK=日付）、GSI2 は作業種別、
+    GSI3 は月別（GSI3PK=SHIFTMONTH#YYYY-MM, GSI3SK=日付#EMP#従業員ID#作業種別）。
+
+    1日1シフトはロックアイテム（PK=SHIFTLOCK#日付, SK=EMP#従業員ID, task_type=作業種別）で保証する。
+    シフトの作成・移動はロックの attribute_not_exists 条件つき Put と同じトランザクションで書くので、
+    同時に書き込まれても同じ日に2件目は入らない。
+    """
+    MONTH_INDEX_NAME = 'GSI3'
+
+    # TransactWriteItems の1リクエストあたりの上限件数
+    TRANSACT_MAX_ITEMS = 100
+
+    @staticmethod
+    def key(date, employee_id, task_type):
+        return {'PK': f'SHIFT#{date}', 'SK': f'EMP#{employee_id}#{task_type}'}
+
+    @staticmethod
+    def parse_key(item):
+        """アイテムのキーから (日付, 従業員ID, 作業種別) を取り出す"""
+        date = item['PK'].split('#', 1)[1]
+        parts = item['SK'].split('#')
+        task_type = parts[2] if len(parts) > 2 else ''
+        return date, parts[1], task_type
+
+    @staticmethod
+    def lock_key(date, employee_id):
+        """(日付, 従業員ID) のロックアイテムのキー"""
+        return {'PK': f'SHIFTLOCK#{date}', 'SK': f'EMP#{employee_id}'}
+
+    @classmethod
+    def lock_item(cls, item):
+        """シフトアイテムに対応するロックアイテム"""
+        date, employee_id, task_type = cls.parse_key(item)
+        return {**cls.lock_key(date, employee_id), 'task_type': task_type}
+
+    @classmethod
+    def lock_key_of(cls, item):
+        date, employee_id, _ = cls.parse_key(item)
+        return cls.lock_key(date, employee_id)
+
+    @staticmethod
+    def month_index_keys(date, employee_id, task_type):
+        """月別インデックス（GSI3）のキー属性"""
+        return {
+            'GSI3PK': f'SHIFTMONTH#{date[:7]}',
+            'GSI3SK': f'{date}#EMP#{employee_id}#{task_type}'
+        }
+
+    @classmethod
+    def index_keys(cls, date, employee_id, task_type):
+        """GSI1〜GSI3 のキー属性"""
+        return {
+            'GSI1PK': employee_id,
+            'GSI1SK': date,
+            'GSI2PK': task_type,
+            'GSI2SK': f'{date}#{employee_id}',
+            **cls.month_index_keys(date, employee_id, task_type)
+        }
+
+    @classmethod
+    def build_item(cls, assignment, status='auto_assigned'):
+        """シフト割り当てから DynamoDB のアイテムを組み立てる"""
+        date = assignment['date']
+        employee_id = assignment['employee_id']
+        task_type = assignment['task_type']
+        return {
+            **cls.key(date, employee_id, task_type),
+            **cls.index_keys(date, employee_id, task_type),
+            'start_time': assignment['start_time'],
+            'end_time': assignment['end_time'],
+            'status': status,
+            'created_at': datetime.now().isoformat()
+        }
+
+    def list_by_date(self, date):
+        return query_all(
+            self.table,
+            KeyConditionExpression='PK = :pk',
+            ExpressionAttributeValues={':pk': f'SHIFT#{date}'}
+        )
+
+    def list_by_employee_on_date(self, date, employee_id):
+        return query_all(
+            self.table,
+            KeyConditionExpression='PK = :pk AND begins_with(SK, :sk)',
+            ExpressionAttributeValues={':pk': f'SHIFT#{date}', ':sk': f'EMP#{employee_id}#'}
+        )
+
+    def list_by_month(self, month):
+        """月内の全シフトを日付順に取得"""
+        return query_all(
+            self.table,
+            IndexName=self.MONTH_INDEX_NAME,
+            KeyConditionExpression='GSI3PK = :pk',
+            ExpressionAttributeValues={':pk': f'SHIFTMONTH#{month}'}
+        )
+
+    def list_by_employee(self, employee_id, start_date=None, end_date=None):
+        """従業員のシフトを GSI1 から取得（期間指定は任意）"""
+        if start_date and end_date:
+            return query_all(
+                self.table,
+                IndexName='GSI1',
+                KeyConditionExpression='GSI1PK = :pk AND GSI1SK BETWEEN :start AND :end',
+                ExpressionAttributeValues={':pk': employee_id, ':start': start_date, ':end': end_date}
+            )
+        return query_all(
+            self.table,
+            IndexName='GSI1',
+            KeyConditionExpression='GSI1PK = :pk',
+            ExpressionAttributeValues={':pk': employee_id}
+        )
+
+    @classmethod
+    def create_change(cls, item):
+        """新規作成の (アクション, 取り消しアクション)。ロックが既にあれば（同じ日にシフトがあれば）失敗する"""
+        key = {'PK': item['PK'], 'SK': item['SK']}
+        return (
+            [{'Put': {'Item': item, 'ConditionExpression': 'attribute_not_exists(PK)'}},
+             {'Put': {'Item': cls.lock_item(item), 'ConditionExpression': 'attribute_not_exists(PK)'}}],
+            [{'Delete': {'Key': key}}, {'Delete': {'Key': cls.lock_key_of(item)}}]
+        )
+
+    @classmethod
+    def replace_change(cls, old_item, new_item):
+        """更新の (アクション, 取り消しアクション)
+
+        キーが変わる場合は新規 Put と旧アイテムの Delete。日付か従業員が変わる場合はロックも移す。
+        """
+        old_key = {'PK': old_item['PK'], 'SK': old_item['SK']}
+        new_key = {'PK': new_item['PK'], 'SK': new_item['SK']}
+        if old_key == new_key:
+            return (
+                [{'Put': {'Item': new_item, 'ConditionExpression': 'attribute_exists(PK)'}}],
+                [{'Put': {'Item': old_item}}]
+            )
+        actions = [{'Put': {'Item': new_item, 'ConditionExpression': 'attribute_not_exists(PK)'}},
+                   {'Delete': {'Key': old_key, 'ConditionExpression': 'attribute_exists(PK)'}}]
+        undo = [{'Delete': {'Key': new_key}}, {'Put': {'Item': old_item}}, {'Put': {'Item': cls.lock_item(old_item)}}]
+        if cls.lock_key_of(old_item) == cls.lock_key_of(new_item):
+            # 同じ日・同じ従業員で作業種別だけが変わる: ロックは持ったまま作業種別を書き換える
+            actions.append({'Put': {'Item': cls.lock_item(new_item)}})
+        else:
+            actions += [{'Put': {'Item': cls.lock_item(new_item), 'ConditionExpression': 'attribute_not_exists(PK)'}},
+                        {'Delete': {'Key': cls.lock_key_of(old_item)}}]
+            undo.insert(1, {'Delete': {'Key': cls.lock_key_of(new_item)}})
+        return actions, undo
+
+    @classmethod
+    def delete_change(cls, item, keep_lock=False):
+        """削除の (アクション, 取り消しアクション)
+
+        ロックはこのシフトの作業種別を指している場合だけ削除する（別のシフトを指していれば失敗する）。
+        keep_lock なら（同じ日に同じ従業員の別のシフトが残る古い重複データなど）ロックは残す。
+        """
+        key = {'PK': item['PK'], 'SK': item['SK']}
+        actions = [{'Delete': {'Key': key, 'ConditionExpression': 'attribute_exists(PK)'}}]
+        undo = [{'Put': {'Item': item}}]
+        if not keep_lock:
+            actions.append({'Delete': {
+                'Key': cls.lock_key_of(item),
+                'ConditionExpression': 'attribute_not_exists(PK) OR task_type = :task',
+                'ExpressionAttributeValues': {':task': cls.parse_key(item)[2]}
+            }})
+            undo.append({'Put': {'Item': cls.lock_item(item)}})
+        return actions, undo
+
+    def create(self, item):
+        """ロックつきで1件作成する。同じ日に同じ従業員のシフトがあれば False"""
+        try:
+            transact_write(self.table, self.create_change(item)[0])
+        except Exception as e:
+            if error_code(e) != 'TransactionCanceledException':
+                raise
+            return False
+        return True
+
+    def delete_shift(self, date, employee_id, task_type):
+        """シフトを削除する（delete_change）。シフトが無いか同時に変更されていれば False
+
+        ロックは読んだ時点でこのシフトの作業種別を指していて、同じ日にこの従業員の別のシフト
+        （古い重複データ）が無い場合だけ一緒に削除する。
+        """
+        lock = self.get(self.lock_key(date, employee_id))
+        others = [item for item in self.list_by_employee_on_date(date, employee_id)
+                  if item['SK'] != self.key(date, employee_id, task_type)['SK']]
+        keep_lock = not lock or lock.get('task_type') != task_type or bool(others)
+        try:
+            transact_write(self.table, self.delete_change(self.key(date, employee_id, task_type), keep_lock)[0])
+        except Exception as e:
+            if error_code(e) != 'TransactionCanceledException':
+                raise
+            return False
+        return True
+
+    @staticmethod
+    def _action_key(action):
+        (_, params), = action.items()
+        key = params.get('Key') or params['Item']
+        return key['PK'], key['SK']
+
+    @classmethod
+    def _chunks(cls, changes):
+        """変更を分割せずに上限件数ごとにまとめる（同じアイテムへの2つの操作は別のトランザクションにする）"""
+        chunk, size, keys = [], 0, set()
+        for change in changes:
+            actions = change[0]
+            action_keys = {cls._action_key(action) for action in actions}
+            if chunk and (size + len(actions) > cls.TRANSACT_MAX_ITEMS or keys & action_keys):
+                yield chunk
+                chunk, size, keys = [], 0, set()
+            chunk.append(change)
+            size += len(actions)
+            keys |= action_keys
+        if chunk:
+            yield chunk
+
+    def create_all(self, items):
+        """新しい (日付, 従業員ID) のシフトをロックつき（create_change）でまとめて作成する
+
+        チャンクごとの TransactWriteItems で書き込み、ロックが既にある（同じ日にシフトが作られていた）
+        アイテムは書かずに除いて再送する。書けなかったアイテムのリストを返す。
+        """
+        conflicts = []
+        # create_change は1件あたり2アクション
+        size = self.TRANSACT_MAX_ITEMS // 2
+        for start in range(0, len(items), size):
+            chunk = list(items[start:start + size])
+            while chunk:
+                try:
+                    transact_write(self.table, [action for item in chunk for action in self.create_change(item)[0]])
+                    break
+                except Exception as e:
+                    if error_code(e) != 'TransactionCanceledException':
+                        raise
+                    failed = {index // 2 for index, reason in enumerate(cancellation_reasons(e))
+                              if reason == 'ConditionalCheckFailed'}
+                    if not failed:
+                        raise
+                    conflicts += [item for index, item in enumerate(chunk) if index in failed]
+                    chunk = [item for index, item in enumerate(chunk) if index not in failed]
+        return conflicts
+
+    def write_changes(self, changes):
+        """[(アクション, 取り消しアクション)] を順にチャンクごとの TransactWriteItems で書き込む
+
+        途中のチャンクが失敗したら、書き込み済みの変更を逆順に取り消してから例外を再送出する。
+        戻り値は実行したトランザクションの数。
+        """
+        done = []
+        transactions = 0
+        try:
+            for chunk in self._chunks(changes):
+                transact_write(self.table, [action for actions, _ in chunk for action in actions])
+                done.extend(chunk)
+                transactions += 1
+        except Exception:
+            undo = [(undo_actions, ()) for _, undo_actions in reversed(done)]
+            for chunk in self._chunks(undo):
+                transact_write(self.table, [action for actions, _ in chunk for action in actions])
+            raise
+        return transactions
+
+
+class SequenceRepo(BaseRepo):
+    """採番カウンター: PK=SEQUENCE, SK=名前, value=最後に払い出した番号
+
+    UpdateItem の ADD で番号を払い出すので、同時に呼ばれても同じ番号は返らない。
+    count を指定すると連続した番号をまとめて予約できる（一括登録用）。
+    カウンターがまだ無い場合は seed() の値（既存データの最大値など）で初期化する。
+    """
+    PK = 'SEQUENCE'
+
+    @classmethod
+    def key(cls, name):
+        return {'PK': cls.PK, 'SK': name}
+
+    def _add(self, name, count):
+        response = self.table.update_item(
+            Key=self.key(name),
+            UpdateExpression='ADD #value :count',
+            ConditionExpression='attribute_exists(PK)',
+            ExpressionAttributeNames={'#value': 'value'},
+            ExpressionAttributeValues={':count': count},
+            ReturnValues='UPDATED_NEW'
+        )
+        return int(response['Attributes']['value'])
+
+    def _initialize(self, name, value):
+        try:
+            self.table.put_item(
+                Item={**self.key(name), 'value': value},
+                ConditionExpression='attribute_not_exists(PK)'
+            )
+        except Exception as e:
+            # 他のリクエストが先に初期化した
+            if error_code(e) != 'ConditionalCheckFailedException':
+                raise
+
+    def reserve(self, name, count=1, seed=None):
+        """count 個の連続した番号を予約し、(最初の番号, 最後の番号) を返す"""
+        if count < 1:
+            raise ValueError('count must be at least 1')
+        try:
+            last = self._add(name, count)
+        except Exception as e:
+            if error_code(e) != 'ConditionalCheckFailedException':
+                raise
+            self._initialize(name, seed() if seed else 0)
+            last = self._add(name, count)
+        return last - count + 1, last
+
+    def next(self, name, seed=None):
+        return self.reserve(name, 1, seed)[0]
+
+
+class ShiftGenerationRepo(BaseRepo):
+    """月間生成の日ごとの入力フィンガープリント: PK=SHIFTGEN#YYYY-MM, SK=FINGERPRINTS
+
+    days は {日付: {'fingerprint': ハッシュ, 'unfilled': [...]}}。1か月分を1アイテムで読み書きする。
+    """
+    SK = 'FINGERPRINTS'
+
+    @classmethod
+    def key(cls, month):
+        return {'PK': f'SHIFTGEN#{month}', 'SK': cls.SK}
+
+    def get_days(self, month):
+        item = self.get(self.key(month)) or {}
+        days = {}
+        for date, entry in (item.get('days') or {}).items():
+            days[date] = {
+                'fingerprint': entry.get('fingerprint', ''),
+                'unfilled': [
+                    {**unfilled, 'missing': int(unfilled.get('missing', 0))}
+                    for unfilled in entry.get('unfilled', [])
+                ]
+            }
+        return days
+
+    @classmethod
+    def build_item(cls, month, days):
+        return {**cls.key(month), 'days': days, 'updated_at': datetime.now().isoformat()}
+
+
+class ShiftDraftRepo(BaseRepo):
+    """月間生成のプレビュー（下書き）: PK=SHIFTDRAFT#ID, SK=DRAFT
+
+    計画（追加するシフト・作り直す日・フィンガープリントなど）は JSON を gzip した document（Binary）に持つ。
+    expires_at（エポック秒）を過ぎるとテーブルの TTL で削除される。TTL の削除は遅れることがあるので読み込み時にも確認する。
+    """
+    SK = 'DRAFT'
+    TTL_SECONDS = int(os.environ.get('SHIFT_DRAFT_TTL_SECONDS', '86400'))
+
+    @classmethod
+    def key(cls, draft_id):
+        return {'PK': f'SHIFTDRAFT#{draft_id}', 'SK': cls.SK}
+
+    def put_draft(self, draft_id, month, plan):
+        """下書きを保存し、期限（エポック秒）を返す"""
+        now = datetime.now()
+        expires_at = int(now.timestamp()) + self.TTL_SECONDS
+        document = gzip.compress(json.dumps(plan, ensure_ascii=False, separators=(',', ':')).encode('utf-8'), mtime=0)
+        self.put({
+            **self.key(draft_id),
+            'month': month,
+            'document': document,
+            'expires_at': expires_at,
+            'created_at': now.isoformat()
+        })
+        return expires_at
+
+    def get_draft(self, draft_id):
+        """下書きの中身。無いか期限切れなら None"""
+        item = self.get(self.key(draft_id))
+        if not item or int(item.get('expires_at', 0)) < int(datetime.now().timestamp()):
+            return None
+        document = item['document']
+        plan = json.loads(gzip.decompress(bytes(getattr(document, 'value', document))).decode('utf-8'))
+        return {**plan, 'month': item['month']}
+
+    def delete_draft(self, draft_id):
+        self.delete(self.key(draft_id))
+
+
+class EmployeeRepo(CachedRepo):
+    """従業員: PK=EMPLOYEE, SK=従業員ID（3桁ゼロ埋め）
+
+    一覧と1件取得はキャッシュする（ページング取得はしない）。
+    IDは採番カウンター（PK=SEQUENCE, SK=EMPLOYEE）から払い出す。
+    """
+    PK = 'EMPLOYEE'
+    CACHE_NAMESPACE = cache.EMPLOYEES
+    SEQUENCE = 'EMPLOYEE'
+    # 採番したIDが使用済みだった場合に払い出し直す回数
+    MAX_ID_ATTEMPTS = 5
+
+    @classmethod
+    def key(cls, employee_id):
+        return {'PK': cls.PK, 'SK': employee_id}
+
+    def _list_params(self, projection=None):
+        params = {
+            'KeyConditionExpression': 'PK = :pk',
+            'ExpressionAttributeValues': {':pk': self.PK}
+        }
+        if projection:
+            params['ProjectionExpression'] = projection
+        return params
+
+    def list_all(self, projection=None):
+        return self._cached(('list', projection), lambda: query_all(self.table, **self._list_params(projection)))
+
+    def page(self, limit, cursor=None):
+        """従業員ID順に1ページ分を取得。(items, next_cursor) を返す"""
+        return query_page(self.table, limit, cursor, **self._list_params())
+
+    def get_employee(self, employee_id):
+        return self._cached(('item', employee_id), lambda: self.get(self.key(employee_id)))
+
+    @staticmethod
+    def format_id(number):
+        return f'{number:03d}'
+
+    def _max_numeric_id(self):
+        # 採番カウンターの初期値用（カウンターが無いときに一度だけ読む）
+        ids = [item['SK'] for item in query_all(self.table, **self._list_params('SK'))]
+        return max([int(employee_id) for employee_id in ids if employee_id.isdigit()], default=0)
+
+    def allocate_ids(self, count=1):
+        """新しい従業員IDを count 個払い出す（3桁ゼロ埋め、桁あふれはそのまま伸ばす）"""
+        first, last = SequenceRepo(self.table).reserve(self.SEQUENCE, count, seed=self._max_numeric_id)
+        return [self.format_id(number) for number in range(first, last + 1)]
+
+    def create(self, item):
+        """従業員を新規作成する。同じIDが既に存在すれば False（上書きしない）"""
+        try:
+            self.table.put_item(Item=item, ConditionExpression='attribute_not_exists(PK)')
+        except Exception as e:
+            if error_code(e) != 'ConditionalCheckFailedException':
+                raise
+            return False
+        self.invalidate_cache()
+        return True
+
+    def create_many(self, items, taken=()):
+        """従業員をまとめて新規作成し、IDを振った新しいアイテムのリストを返す
+
+        IDは1回の予約でまとめて払い出し（taken のIDは飛ばす）、attribute_not_exists 条件つきの
+        TransactWriteItems で ShiftRepo.TRANSACT_MAX_ITEMS 件ずつ書き込む（既存の従業員は上書きしない）。
+        使用済みだったIDだけを払い出し直して再送し、MAX_ID_ATTEMPTS 回で書けなければ例外を送出する。
+        """
+        taken = set(taken)
+
+        def allocate(count):
+            ids = []
+            while len(ids) < count:
+                ids += [employee_id for employee_id in self.allocate_ids(count - len(ids)) if employee_id not in taken]
+            return ids
+
+        created = [{**self.key(employee_id), **item} for employee_id, item in zip(allocate(len(items)), items)]
+        size = ShiftRepo.TRANSACT_MAX_ITEMS
+        for start in range(0, len(created), size):
+            chunk = created[start:start + size]
+            for _ in range(self.MAX_ID_ATTEMPTS):
+                try:
+                    transact_write(self.table, [
+                        {'Put': {'Item': item, 'ConditionExpression': 'attribute_not_exists(PK)'}} for item in chunk
+                    ])
+                    break
+                except Exception as e:
+                    if error_code(e) != 'TransactionCanceledException':
+                        raise
+                    failed = [index for index, reason in enumerate(cancellation_reasons(e))
+                              if reason == 'ConditionalCheckFailed']
+                    if not failed:
+                        raise
+                    taken.update(chunk[index]['SK'] for index in failed)
+                    for index, employee_id in zip(failed, allocate(len(failed))):
+                        chunk[index] = {**chunk[index], **self.key(employee_id)}
+            else:
+                raise DuplicateKeyError(chunk[failed[0]])
+            created[start:start + size] = chunk
+        if created:
+            self.invalidate_cache()
+        return created
+
+    def delete_employee(self, employee_id):
+        self.delete(self.key(employee_id))
+
+    def batch_get_employees(self, employee_ids):
+        return self.batch_get([self.key(employee_id) for employee_id in dict.fromkeys(employee_ids)])
+
+
+class TaskRepo(CachedRepo):
+    """作業設定: PK=TASK#作業種別, SK=CONFIG
+
+    一覧は疎な GSI1（GSI1PK=TASK_CATALOG, GSI1SK=作業種別）への1回のクエリで取得する。
+    作業設定以外の行はこの属性を持たないので、テーブル全体の件数に関係なく作業種別の数だけ読む。
+    put() は常にカタログ属性を付けて保存する。一覧と1件取得はキャッシュする。
+    """
+    SK = 'CONFIG'
+    CACHE_NAMESPACE = cache.TASKS
+    CATALOG_INDEX = 'GSI1'
+    CATALOG_PK = 'TASK_CATALOG'
+
+    @classmethod
+    def key(cls, task_type):
+        return {'PK': f'TASK#{task_type}', 'SK': cls.SK}
+
+    @classmethod
+    def catalog_keys(cls, task_type):
+        return {'GSI1PK': cls.CATALOG_PK, 'GSI1SK': str(task_type)}
+
+    def put(self, item):
+        task_type = item['PK'].split('#', 1)[1]
+        return super().put({**item, **self.catalog_keys(task_type)})
+
+    def list_all(self):
+        return self._cached('catalog', lambda: query_all(
+            self.table,
+            IndexName=self.CATALOG_INDEX,
+            KeyConditionExpression='GSI1PK = :pk',
+            ExpressionAttributeValues={':pk': self.CATALOG_PK}
+        ))
+
+    def get_task(self, task_type):
+        return self._cached(('item', str(task_type)), lambda: self.get(self.key(task_type)))
+
+    def delete_task(self, task_type):
+        self.delete(self.key(task_type))
+
+
+class RequirementsRepo(CachedRepo):
+    """必要人数: PK=REQUIREMENTS, SK=GLOBAL_DEFAULT | MONTH#YYYY-MM | DAILY#YYYY-MM-DD"""
+    PK = 'REQUIREMENTS'
+    CACHE_NAMESPACE = cache.REQUIREMENTS
+    GLOBAL_DEFAULT = 'GLOBAL_DEFAULT'
+
+    @classmethod
+    def global_key(cls):
+        return {'PK': cls.PK, 'SK': cls.GLOBAL_DEFAULT}
+
+    @classmethod
+    def month_key(cls, month):
+        return {'PK': cls.PK, 'SK': f'MONTH#{month}'}
+
+    @classmethod
+    def daily_key(cls, date):
+        return {'PK': cls.PK, 'SK': f'DAILY#{date}'}
+
+    def _requirements(self, key):
+        item = self._cached(key['SK'], lambda: self.get(key))
+        return item.get('requirements') if item else None
+
+    def get_global_default(self):
+        return self._requirements(self.global_key())
+
+    def get_month(self, month):
+        return self._requirements(self.month_key(month))
+
+    def get_daily(self, date):
+        return self._requirements(self.daily_key(date))
+
+    def save_global_default(self, requirements):
+        return self.put({**self.global_key(), 'requirements': requirements})
+
+    def save_month(self, month, requirements):
+        return self.put({**self.month_key(month), 'requirements': requirements})
+
+    def save_daily(self, date, requirements):
+        return self.put({**self.daily_key(date), 'requirements': requirements})
+
+    def get_daily_for_month(self, month):
+        """月内の日別設定を1回のクエリで取得し {日付: 人数設定} で返す"""
+        def load():
+            items = query_all(
+                self.table,
+                KeyConditionExpression='PK = :pk AND begins_with(SK, :prefix)',
+                ExpressionAttributeValues={':pk': self.PK, ':prefix': f'DAILY#{month}-'}
+            )
+            return {item['SK'].split('#', 1)[1]: item.get('requirements') for item in items}
+        return self._cached(('daily-month', month), load)
+
+    def save_daily_for_month(self, overrides):
+        """{日付: 人数設定} をまとめて保存する。値が空の日は日別設定を削除する"""
+        puts = [{**self.daily_key(date), 'requirements': requirements}
+                for date, requirements in overrides.items() if requirements]
+        deletes = [self.daily_key(date) for date, requirements in overrides.items() if not requirements]
+        return self.batch_write(puts, deletes)
+
+
+class SettingsRepo(CachedRepo):
+    """設定: PK=SETTINGS, SK=CONFIRMATION | VACATION_DEFAULT"""
+    PK = 'SETTINGS'
+    CACHE_NAMESPACE = cache.SETTINGS
+
+    @classmethod
+    def key(cls, name):
+        return {'PK': cls.PK, 'SK': name}
+
+    def get_settings(self, name):
+        return self._cached(name, lambda: self.get(self.key(name)))
+
+    def save_settings(self, name, values):
+        return self.put({**self.key(name), **values})
+
+
+class VacationRepo(BaseRepo):
+    """休暇申請: PK=EMPLOYEE#従業員ID, SK=VACATION#タイムスタンプ
+
+    GSI1（GSI1PK=VACATION_REQUEST, GSI1SK=開始日#申請ID）で全申請を引ける。
+    申請ID は「従業員ID_タイムスタンプ」。
+
+    期間での検索用に、申請がかかる月ごとのコピー（PK=VACMONTH#YYYY-MM, SK=EMP#従業員ID#申請ID）を持つ。
+    申請の作成・更新・削除は月別のコピーと同じトランザクションで書き込む。
+    """
+    INDEX_PK = 'VACATION_REQUEST'
+    # type の無い申請の休暇種別（作成時の既定値と台帳の集計で同じ値を使う）
+    DEFAULT_TYPE = 'normal'
+    # 月別のコピーに載せる属性
+    MONTH_ATTRS = ('request_id', 'employee_id', 'start_date', 'end_date', 'type', 'time_type', 'status')
+    # 期間検索で読む月数の上限
+    MAX_RANGE_MONTHS = 24
+
+    @staticmethod
+    def key(employee_id, timestamp):
+        return {'PK': f'EMPLOYEE#{employee_id}', 'SK': f'VACATION#{timestamp}'}
+
+    @staticmethod
+    def request_id(employee_id, timestamp):
+        return f'{employee_id}_{timestamp}'
+
+    @staticmethod
+    def parse_request_id(request_id):
+        """申請ID を (従業員ID, タイムスタンプ) に分ける。形式が不正なら None"""
+        parts = request_id.split('_')
+        if len(parts) < 2:
+            return None
+        return parts[0], parts[1]
+
+    @classmethod
+    def with_request_id(cls, item):
+        """request_id 属性のない古いアイテムに PK/SK から補う"""
+        if 'request_id' not in item:
+            employee_id = item.get('PK', '').replace('EMPLOYEE#', '')
+            timestamp = item.get('SK', '').replace('VACATION#', '')
+            item['request_id'] = cls.request_id(employee_id, timestamp)
+        return item
+
+    @staticmethod
+    def months_between(start_date, end_date):
+        """start_date〜end_date（両端を含む）がかかる月（YYYY-MM）のリスト"""
+        year, month = int(start_date[:4]), int(start_date[5:7])
+        last = (int(end_date[:4]), int(end_date[5:7]))
+        months = []
+        while (year, month) <= last:
+            months.append(f'{year:04d}-{month:02d}')
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    @staticmethod
+    def month_key(month, employee_id, request_id):
+        return {'PK': f'VACMONTH#{month}', 'SK': f'EMP#{employee_id}#{request_id}'}
+
+    @staticmethod
+    def start_date_of(item):
+        """申請の開始日。start_date の無い古い申請は date を使う（どちらも無ければ None）"""
+        return item.get('start_date') or item.get('date')
+
+    @classmethod
+    def month_items(cls, item):
+        """申請から月別のコピーを作る。開始日の無い申請はコピーを持たない（空のリスト）"""
+        start_date = cls.start_date_of(item)
+        if not start_date:
+            return []
+        end_date = item.get('end_date') or start_date
+        # 古い申請は employee_id / request_id を持たないので PK/SK から補う
+        item = cls.with_request_id(dict(item))
+        if 'employee_id' not in item:
+            item['employee_id'] = item['PK'].replace('EMPLOYEE#', '')
+        attrs = {name: item[name] for name in cls.MONTH_ATTRS if name in item}
+        attrs['start_date'] = start_date
+        attrs['end_date'] = end_date
+        return [
+            {**cls.month_key(month, item['employee_id'], item['request_id']), **attrs}
+            for month in cls.months_between(start_date, end_date)
+        ]
+
+    def save_request(self, item, old_item=None, extra_actions=()):
+        """申請と月別のコピーを1つのトランザクションで保存する
+
+        old_item（更新前のアイテム）を渡すと、その後に他の更新が入っていればトランザクションが失敗する。
+        期間が変わって不要になった月のコピーも削除する。
+        extra_actions は同じトランザクションに含める追加の書き込み。
+        """
+        puts = self.month_items(item)
+        keep = {(month['PK'], month['SK']) for month in puts}
+        stale = [
+            {'PK': month['PK'], 'SK': month['SK']} for month in (self.month_items(old_item) if old_item else [])
+            if (month['PK'], month['SK']) not in keep
+        ]
+        put = {'Item': item}
+        if old_item:
+            # 読んでから書くまでに他の更新が入っていたら失敗させる（楽観ロック）
+            if 'updated_at' in old_item:
+                put['ConditionExpression'] = 'updated_at = :prev'
+                put['ExpressionAttributeValues'] = {':prev': old_item['updated_at']}
+            else:
+                put['ConditionExpression'] = 'attribute_exists(PK)'
+        actions = [{'Put': put}]
+        actions += [{'Put': {'Item': month}} for month in puts]
+        actions += [{'Delete': {'Key': key}} for key in stale]
+        actions += list(extra_actions)
+        transact_write(self.table, actions)
+        return item
+
+    def delete_request(self, item, extra_actions=()):
+        """申請と月別のコピーを1つのトランザクションで削除する（読んだ後に更新されていれば失敗する）"""
+        delete = {'Key': {'PK': item['PK'], 'SK': item['SK']}}
+        if 'updated_at' in item:
+            delete['ConditionExpression'] = 'updated_at = :prev'
+            delete['ExpressionAttributeValues'] = {':prev': item['updated_at']}
+        actions = [{'Delete': delete}]
+        actions += [{'Delete': {'Key': {'PK': month['PK'], 'SK': month['SK']}}} for month in self.month_items(item)]
+        actions += list(extra_actions)
+        transact_write(self.table, actions)
+
+    def list_overlapping(self, date_from, date_to, status=None):
+        """期間（両端を含む）と重なる申請を、かかる月のパーティションだけを読んで取得
+
+        月をまたぐ申請は重複を除き、開始日順で返す。
+        """
+        months = self.months_between(date_from, date_to)
+        if len(months) > self.MAX_RANGE_MONTHS:
+            raise ValueError(f'期間は{self.MAX_RANGE_MONTHS}か月以内で指定してください')
+        values = {':from': date_from, ':to': date_to}
+        names = None
+        condition = 'start_date <= :to AND end_date >= :from'
+        if status:
+            condition += ' AND #status = :status'
+            values[':status'] = status
+            names = {'#status': 'status'}
+        found = {}
+        for month in months:
+            params = {
+                'KeyConditionExpression': 'PK = :pk',
+                'FilterExpression': condition,
+                'ExpressionAttributeValues': {**values, ':pk': f'VACMONTH#{month}'}
+            }
+            if names:
+                params['ExpressionAttributeNames'] = names
+            for item in query_all(self.table, **params):
+                found.setdefault(item['request_id'], item)
+        requests = []
+        for item in found.values():
+            requests.append({name: item[name] for name in self.MONTH_ATTRS if name in item})
+        return sorted(requests, key=lambda item: (item['start_date'], item['request_id']))
+
+    def _all_params(self):
+        return {
+            'IndexName': 'GSI1',
+            'KeyConditionExpression': 'GSI1PK = :gsi1pk',
+            'ExpressionAttributeValues': {':gsi1pk': self.INDEX_PK}
+        }
+
+    @staticmethod
+    def _employee_params(employee_id):
+        return {
+            'KeyConditionExpression': 'PK = :pk AND begins_with(SK, :sk_prefix)',
+            'ExpressionAttributeValues': {
+                ':pk': f'EMPLOYEE#{employee_id}',
+                ':sk_prefix': 'VACATION#'
+            }
+        }
+
+    def list_all(self):
+        return [self.with_request_id(item) for item in query_all(self.table, **self._all_params())]
+
+    def page_all(self, limit, cursor=None):
+        """開始日順に1ページ分を取得。(items, next_cursor) を返す"""
+        items, next_cursor = query_page(self.table, limit, cursor, **self._all_params())
+        return [self.with_request_id(item) for item in items], next_cursor
+
+    def list_by_employee(self, employee_id):
+        items = query_all(self.table, **self._employee_params(employee_id))
+        return [self.with_request_id(item) for item in items]
+
+    def page_by_employee(self, employee_id, limit, cursor=None):
+        """新しい申請から順に1ページ分を取得。(items, next_cursor) を返す"""
+        items, next_cursor = query_page(
+            self.table, limit, cursor, ScanIndexForward=False, **self._employee_params(employee_id)
+        )
+        return [self.with_request_id(item) for item in items], next_cursor
+
+
+class VacationLedgerRepo(BaseRepo):
+    """休暇の集計台帳: PK=EMPLOYEE#従業員ID, SK=VACLEDGER#年度
+
+    承認済み（used_days）と申請中（pending_days）の日数を年度ごとに持ち、
+    休暇種別ごとの内訳は used_days#種別 / pending_days#種別 に持つ。
+    申請の作成・更新・削除と同じトランザクションで ADD して差分だけ反映するので、
+    使用日数の取得は GetItem 1回で済む。半日休暇は 0.5 日として数える。
+    """
+    SK_PREFIX = 'VACLEDGER#'
+    # 年度の開始月（4 なら 4月〜翌3月。年度はその開始年で表す）
+    FISCAL_YEAR_START_MONTH = int(os.environ.get('FISCAL_YEAR_START_MONTH', '4'))
+    COUNTERS = {'approved': 'used_days', 'applying': 'pending_days'}
+    HALF_DAY = ('morning', 'afternoon')
+
+    @classmethod
+    def key(cls, employee_id, fiscal_year):
+        return {'PK': f'EMPLOYEE#{employee_id}', 'SK': f'{cls.SK_PREFIX}{fiscal_year}'}
+
+    @classmethod
+    def fiscal_year(cls, day):
+        """日付（date または YYYY-MM-DD）の年度"""
+        if isinstance(day, str):
+            day = date.fromisoformat(day)
+        return day.year if day.month >= cls.FISCAL_YEAR_START_MONTH else day.year - 1
+
+    @classmethod
+    def contributions(cls, item):
+        """申請が台帳に加える日数 {(年度, 属性名): 日数}（集計対象外のステータスなら空）"""
+        if not item or not item.get('start_date'):
+            return {}
+        counter = cls.COUNTERS.get(item.get('status', 'applying'))
+        if not counter:
+            return {}
+        per_day = Decimal('0.5') if item.get('time_type') in cls.HALF_DAY else Decimal('1')
+        vacation_type = item.get('type') or VacationRepo.DEFAULT_TYPE
+        totals = {}
+        day = date.fromisoformat(item['start_date'])
+        last = date.fromisoformat(item.get('end_date') or item['start_date'])
+        while day <= last:
+            fiscal_year = cls.fiscal_year(day)
+            for name in (counter, f'{counter}#{vacation_type}'):
+                totals[(fiscal_year, name)] = totals.get((fiscal_year, name), 0) + per_day
+            day += timedelta(days=1)
+        return totals
+
+    @classmethod
+    def update_actions(cls, employee_id, old_item=None, new_item=None):
+        """申請の変更前後の差分を台帳に ADD するトランザクションのアクション"""
+        delta = dict(cls.contributions(new_item or {}))
+        for key, days in cls.contributions(old_item or {}).items():
+            delta[key] = delta.get(key, 0) - days
+        by_year = {}
+        for (fiscal_year, name), days in delta.items():
+            if days:
+                by_year.setdefault(fiscal_year, []).append((name, days))
+        actions = []
+        for fiscal_year, counters in sorted(by_year.items()):
+            names = {'#fy': 'fiscal_year'}
+            values = {':fy': fiscal_year}
+            adds = []
+            for index, (name, days) in enumerate(sorted(counters)):
+                names[f'#c{index}'] = name
+                values[f':c{index}'] = days
+                adds.append(f'#c{index} :c{index}')
+            actions.append({'Update': {
+                'Key': cls.key(employee_id, fiscal_year),
+                'UpdateExpression': 'SET #fy = :fy ADD ' + ', '.join(adds),
+                'ExpressionAttributeNames': names,
+                'ExpressionAttributeValues': values
+            }})
+        return actions
+
+    def get_ledger(self, employee_id, fiscal_year):
+        return self.get(self.key(employee_id, fiscal_year))
+
+
+class UserRepo(BaseRepo):
+    """CogniteID ユーザー: PK=COGNITE_USER#ユーザーID, SK=PROFILE
+
+    メールアドレスからの検索用に、正規化したメールアドレスごとのポインタ
+    （PK=EMAIL#メールアドレス, SK=USER, cognite_user_id）を持つ。
+    ユーザーの作成・メールアドレス変更・削除はポインタと同じトランザクションで書き込み、
+    attribute_not_exists 条件でメールアドレスの重複を防ぐ。
+    """
+    SK = 'PROFILE'
+    EMAIL_SK = 'USER'
+
+    @classmethod
+    def key(cls, user_id):
+        return {'PK': f'COGNITE_USER#{user_id}', 'SK': cls.SK}
+
+    @staticmethod
+    def normalize_email(email):
+        return (email or '').strip().lower()
+
+    @classmethod
+    def email_key(cls, email):
+        return {'PK': f'EMAIL#{cls.normalize_email(email)}', 'SK': cls.EMAIL_SK}
+
+    @classmethod
+    def email_pointer(cls, email, user_id):
+        return {**cls.email_key(email), 'cognite_user_id': user_id}
+
+    @staticmethod
+    def user_id_of(item):
+        return item['PK'].split('#', 1)[1]
+
+    def _list_params(self):
+        return {
+            'FilterExpression': 'begins_with(PK, :pk) AND SK = :sk',
+            'ExpressionAttributeValues': {':pk': 'COGNITE_USER#', ':sk': self.SK}
+        }
+
+    def list_all(self):
+        return scan_all(self.table, **self._list_params())
+
+    def page(self, limit, cursor=None):
+        return scan_page(self.table, limit, cursor, **self._list_params())
+
+    def get_user(self, user_id):
+        return self.get(self.key(user_id))
+
+    def find_by_email(self, email):
+        """メールアドレスのユーザー（ポインタの GetItem + ユーザーの GetItem）。見つからなければ None"""
+        if not self.normalize_email(email):
+            return None
+        pointer = self.get(self.email_key(email))
+        if not pointer:
+            return None
+        user = self.get_user(pointer['cognite_user_id'])
+        # ポインタが古い（ユーザー側のメールアドレスが変わっている）場合は一致しない扱い
+        if not user or self.normalize_email(user.get('email')) != self.normalize_email(email):
+            return None
+        return user
+
+    def _email_actions(self, user_id, old_email, new_email):
+        actions = []
+        if self.normalize_email(old_email) == self.normalize_email(new_email):
+            return actions
+        if self.normalize_email(old_email):
+            # 自分を指しているポインタだけを消す（他のユーザーのポインタは残す）
+            pointer = self.get(self.email_key(old_email))
+            if pointer and pointer.get('cognite_user_id') == user_id:
+                actions.append({'Delete': {
+                    'Key': self.email_key(old_email),
+                    'ConditionExpression': 'cognite_user_id = :uid',
+                    'ExpressionAttributeValues': {':uid': user_id}
+                }})
+        if self.normalize_email(new_email):
+            actions.append({'Put': {
+                'Item': self.email_pointer(new_email, user_id),
+                'ConditionExpression': 'attribute_not_exists(PK)'
+            }})
+        return actions
+
+    def _transact(self, actions):
+        try:
+            transact_write(self.table, actions)
+        except Exception as e:
+            if error_code(e) != 'TransactionCanceledException':
+                raise
+            # 失敗したのが新しいメールアドレスのポインタの Put なら重複として扱う
+            failed = [action['Put']['Item'] for action, reason in zip(actions, cancellation_reasons(e))
+                      if reason == 'ConditionalCheckFailed' and 'Put' in action]
+            if any(item['PK'].startswith('EMAIL#') for item in failed):
+                raise DuplicateEmailError('このメールアドレスは既に登録されています')
+            # それ以外の Put（ユーザーID・同時に作る従業員ID）の衝突は呼び出し側で採番し直す
+            if failed:
+                raise DuplicateKeyError({'PK': failed[0]['PK'], 'SK': failed[0]['SK']})
+            raise
+
+    def create(self, item, also_put=()):
+        """ユーザーとメールアドレスのポインタを1つのトランザクションで作成する
+
+        also_put のアイテム（同時に作る従業員レコードなど）も同じトランザクションに含める（既存のキーは上書きしない）。
+        メールアドレスが使用済みなら DuplicateEmailError、
+        同じユーザーIDや also_put のキーが存在する場合は DuplicateKeyError。
+        """
+        user_id = self.user_id_of(item)
+        actions = [{'Put': {'Item': item, 'ConditionExpression': 'attribute_not_exists(PK)'}}]
+        actions += self._email_actions(user_id, None, item.get('email'))
+        actions += [{'Put': {'Item': extra, 'ConditionExpression': 'attribute_not_exists(PK)'}} for extra in also_put]
+        self._transact(actions)
+        return item
+
+    def update(self, item, old_email):
+        """ユーザーを保存する。メールアドレスが変わった場合はポインタも付け替える"""
+        actions = self._email_actions(self.user_id_of(item), old_email, item.get('email'))
+        if not actions:
+            return self.put(item)
+        self._transact([{'Put': {'Item': item}}] + actions)
+        return item
+
+    def delete_user(self, user_id):
+        """ユーザーとメールアドレスのポインタを削除する"""
+        user = self.get_user(user_id)
+        if not user:
+            return
+        actions = [{'Delete': {'Key': self.key(user_id)}}]
+        actions += self._email_actions(user_id, user.get('email'), None)
+        self._transact(actions)
@@ -0,0 +1,173 @@
+"""GET レスポンスの条件付きリクエスト対応と圧縮
+
+本文の SHA-256 から強い ETag を作り、If-None-Match が一致すれば本文なしの 304 を返す。
+ブラウザは ETag つきのレスポンスを自動で再検証するので、フロントエンドの fetch はそのままでよい。
+
+Cache-Control はエンドポイントの種類ごとに決める。既定は no-cache（毎回再検証し、変わっていなければ 304）。
+保存直後に読み直す画面が古いデータを見ないよう max-age は既定で付けず、
+HTTP_CACHE_MAX_AGE_<種類>（秒）を設定した種類だけブラウザ・CDN にそのまま使わせる。
+
+COMPRESS_MIN_BYTES 以上の本文は Accept-Encoding に応じて Brotli（brotli パッケージがある場合）か gzip で圧縮し、
+API Gateway の要件どおり base64 にして isBase64Encoded を立てる。
+API は BinaryMediaTypes に */* を指定しているので、リクエスト本文も base64 で届くことがある。
+本文を読むハンドラーは最初に decode_request を通す。
+"""
+import base64
+import gzip
+import hashlib
+import os
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli は任意。無ければ gzip のみ
+    brotli = None
+
+CACHE_PROFILES = ('shifts', 'employees', 'tasks', 'requirements', 'settings', 'pages')
+
+# これより小さい本文は圧縮しない（圧縮と base64 の分だけかえって大きく・遅くなる）
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', '1024'))
+
+# memoize=True で圧縮した本文をコンテナ内に保持する件数（静的ページ用）
+COMPRESS_CACHE_ENTRIES = 32
+
+# ETag の末尾に付ける圧縮形式の印（圧縮後の表現は別の ETag にする）
+ENCODING_SUFFIXES = {'br': '-br', 'gzip': '-gz'}
+
+_compressed = OrderedDict()
+
+
+def max_age(profile):
+    return int(os.environ.get(f'HTTP_CACHE_MAX_AGE_{profile.upper()}', '0'))
+
+
+def cache_control(profile):
+    seconds = max_age(profile)
+    return f'private, max-age={seconds}' if seconds > 0 else 'private, no-cache'
+
+
+def compute_etag(body):
+    return '"' + hashlib.sha256(body.encode('utf-8')).hexdigest()[:32] + '"'
+
+
+def etag_matches(event, etag):
+    """If-None-Match（カンマ区切り・弱い比較）に etag が含まれるか"""
+    headers = {key.lower(): value for key, value in ((event or {}).get('headers') or {}).items()}
+    value = (headers.get('if-none-match') or '').strip()
+    if not value:
+        return False
+    if value == '*':
+        return True
+    tags = set()
+    for tag in value.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        for suffix in ENCODING_SUFFIXES.values():
+            if tag.endswith(suffix + '"'):
+                tag = tag[:-len(suffix) - 1] + '"'
+        tags.add(tag)
+    return etag in tags
+
+
+def decode_request(event):
+    """base64 で届いたリクエスト本文を文字列に戻したイベントを返す"""
+    if not (event or {}).get('isBase64Encoded') or not event.get('body'):
+        return event
+    return {**event, 'body': base64.b64decode(event['body']).decode('utf-8'), 'isBase64Encoded': False}
+
+
+def accepted_encodings(event):
+    """Accept-Encoding のうち q=0 でない形式の集合"""
+    headers = {key.lower(): value for key, value in ((event or {}).get('headers') or {}).items()}
+    accepted = set()
+    for part in (headers.get('accept-encoding') or '').split(','):
+        name, _, params = part.partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name.strip() and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+def choose_encoding(event):
+    accepted = accepted_encodings(event)
+    if brotli is not None and 'br' in accepted:
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def encoded_etag(etag, encoding):
+    """圧縮後の表現の ETag（etag_matches は印を外して比べる）"""
+    return etag[:-1] + ENCODING_SUFFIXES[encoding] + '"'
+
+
+def _encode(raw, encoding, memoize):
+    key = (hashlib.sha256(raw).digest(), encoding) if memoize else None
+    if key in _compressed:
+        _compressed.move_to_end(key)
+        return _compressed[key]
+    if encoding == 'br':
+        data = brotli.compress(raw, quality=11 if memoize else 5)
+    else:
+        data = gzip.compress(raw, compresslevel=9 if memoize else 6, mtime=0)
+    if memoize:
+        _compressed[key] = data
+        while len(_compressed) > COMPRESS_CACHE_ENTRIES:
+            _compressed.popitem(last=False)
+    return data
+
+
+def compress(event, response, memoize=False):
+    """200 レスポンスの本文を Accept-Encoding に応じて圧縮する
+
+    memoize=True の場合は同じ本文の圧縮結果をコンテナ内に保持して使い回す（静的ページ用）。
+    """
+    if response.get('statusCode') != 200 or response.get('isBase64Encoded'):
+        return response
+    raw = (response.get('body') or '').encode('utf-8')
+    if len(raw) < COMPRESS_MIN_BYTES:
+        return response
+    headers = {**(response.get('headers') or {}), 'Vary': 'Accept-Encoding'}
+    encoding = choose_encoding(event)
+    if not encoding:
+        return {**response, 'headers': headers}
+    headers['Content-Encoding'] = encoding
+    if headers.get('ETag'):
+        headers['ETag'] = encoded_etag(headers['ETag'], encoding)
+    return {
+        **response,
+        'headers': headers,
+        'body': base64.b64encode(_encode(raw, encoding, memoize)).decode('ascii'),
+        'isBase64Encoded': True
+    }
+
+
+def conditional_get(event, response, profile, memoize=False):
+    """GET の 200 レスポンスに ETag / Cache-Control を付け、If-None-Match が一致すれば 304 にする
+
+    GET 以外や 200 以外のレスポンスはそのまま返す。304 でなければ compress で圧縮する。
+    """
+    if (event or {}).get('httpMethod') != 'GET' or response.get('statusCode') != 200:
+        return response
+    etag = compute_etag(response.get('body') or '')
+    headers = {
+        **(response.get('headers') or {}),
+        'ETag': etag,
+        'Cache-Control': cache_control(profile),
+        'Access-Control-Expose-Headers': 'ETag'
+    }
+    if etag_matches(event, etag):
+        # 304 でも、200 なら返したはずの表現の ETag を返す
+        encoding = choose_encoding(event)
+        if encoding and len((response.get('body') or '').encode('utf-8')) >= COMPRESS_MIN_BYTES:
+            headers['ETag'] = encoded_etag(etag, encoding)
+        return {'statusCode': 304, 'headers': headers, 'body': ''}
+    return compress(event, {**response, 'headers': headers}, memoize)
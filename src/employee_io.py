@@ -0,0 +1,133 @@
+"""従業員の一括登録・エクスポート用の入出力
+
+CSV / NDJSON / JSON 配列の本文を1行ずつ読み、検証済みの行とエラーの行に分ける。
+エクスポートは1件ずつ文字列を生成するジェネレーターで、全件のリストを二重に持たない。
+"""
+import csv
+import io
+import json
+
+# CSV の列（エクスポートもこの順で出力する）
+FIELDS = ['employee_id', 'name', 'kana_name', 'phone', 'email', 'skills',
+          'vacation_days', 'status', 'cognite_user_id']
+
+# CSV のスキル列の区切り文字
+SKILL_SEPARATOR = ';'
+
+FORMATS = ('csv', 'ndjson', 'json')
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'json': 'application/json'
+}
+
+
+def detect_format(body, content_type=None):
+    """Content-Type、無ければ本文の先頭文字から形式を判定する"""
+    content_type = (content_type or '').lower()
+    if 'csv' in content_type:
+        return 'csv'
+    if 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    head = body.lstrip('\ufeff \t\r\n')[:1]
+    if head == '[':
+        return 'json'
+    if head == '{':
+        return 'ndjson'
+    return 'csv'
+
+
+def iter_rows(body, fmt):
+    """(行番号, dict) を順に返す。行として解釈できない場合は dict の代わりに例外を返す"""
+    if fmt == 'json':
+        try:
+            rows = json.loads(body)
+        except ValueError as e:
+            yield 1, e
+            return
+        if not isinstance(rows, list):
+            yield 1, ValueError('JSON の本文は配列にしてください')
+            return
+        yield from enumerate(rows, start=1)
+    elif fmt == 'ndjson':
+        for line_number, line in enumerate(io.StringIO(body), start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+    else:
+        reader = csv.DictReader(io.StringIO(body.lstrip('\ufeff')))
+        for row in reader:
+            # 行番号はファイル上の行（ヘッダーが1行目）
+            yield reader.line_num, {key.strip(): value for key, value in row.items() if key}
+
+
+def parse_skills(value):
+    if isinstance(value, list):
+        return [str(skill).strip() for skill in value if str(skill).strip()]
+    return [skill.strip() for skill in str(value or '').split(SKILL_SEPARATOR) if skill.strip()]
+
+
+def validate_row(row):
+    """行を従業員の属性に変換する。不正な場合は ValueError"""
+    if isinstance(row, Exception):
+        raise ValueError(f'解析できません: {row}')
+    if not isinstance(row, dict):
+        raise ValueError('行はオブジェクトにしてください')
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError('name は必須です')
+    employee = {'name': name}
+    for field in ('kana_name', 'phone', 'email', 'cognite_user_id', 'status'):
+        if row.get(field) not in (None, ''):
+            employee[field] = str(row[field]).strip()
+    if row.get('skills') not in (None, ''):
+        employee['skills'] = parse_skills(row['skills'])
+    if row.get('vacation_days') not in (None, ''):
+        try:
+            employee['vacation_days'] = int(row['vacation_days'])
+        except (TypeError, ValueError):
+            raise ValueError(f"vacation_days は整数にしてください: {row['vacation_days']}")
+    employee_id = str(row.get('employee_id') or '').strip()
+    return employee_id, employee
+
+
+def _export_row(item):
+    return {
+        'employee_id': item['SK'],
+        'name': item.get('name', ''),
+        'kana_name': item.get('kana_name', ''),
+        'phone': item.get('phone', ''),
+        'email': item.get('email', ''),
+        'skills': list(item.get('skills', [])),
+        'vacation_days': int(item.get('vacation_days', 20)),
+        'status': item.get('status', 'ACTIVE'),
+        'cognite_user_id': item.get('cognite_user_id', '')
+    }
+
+
+def iter_export(items, fmt):
+    """従業員アイテムを指定形式の文字列片として順に返す"""
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=FIELDS, lineterminator='\n')
+        writer.writeheader()
+        for item in items:
+            row = _export_row(item)
+            row['skills'] = SKILL_SEPARATOR.join(row['skills'])
+            writer.writerow(row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
+    elif fmt == 'ndjson':
+        for item in items:
+            yield json.dumps(_export_row(item), ensure_ascii=False) + '\n'
+    else:
+        yield '['
+        for index, item in enumerate(items):
+            yield (',' if index else '') + json.dumps(_export_row(item), ensure_ascii=False)
+        yield ']'
@@ -1,25 +1,24 @@
 import json
-import boto3
-import os
+from datetime import date
 from decimal import Decimal
 
-# Support local dynamodb endpoint
-_dynamodb_endpoint = os.environ.get('DYNAMODB_ENDPOINT')
-if _dynamodb_endpoint:
-    dynamodb = boto3.resource('dynamodb', endpoint_url=_dynamodb_endpoint)
-else:
-    dynamodb = boto3.resource('dynamodb')
+from common.dynamodb import get_table
+from common.repositories import EmployeeRepo, VacationLedgerRepo
+from common.responses import conditional_get, compress, decode_request
+from common.pagination import page_request, page_body
+import employee_io
 
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
 
 def get_cors_headers():
     return {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
 
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         http_method = event['httpMethod']
         path = event['path']
@@ -33,15 +32,19 @@ def lambda_handler(event, context):
             }
         
         if http_method == 'GET' and path == '/employees':
-            return get_all_employees()
+            return conditional_get(event, get_all_employees(event), 'employees')
         elif http_method == 'POST' and path == '/employees':
             return create_employee(event)
+        elif http_method == 'POST' and path == '/employees/bulk':
+            return bulk_import_employees(event)
+        elif http_method == 'GET' and path == '/employees/export':
+            return export_employees(event)
         elif http_method == 'GET' and '/employees/' in path and path.endswith('/vacation-used'):
             employee_id = path.split('/')[-2]
-            return get_vacation_used(employee_id)
+            return conditional_get(event, get_vacation_used(employee_id, event), 'employees')
         elif http_method == 'GET' and '/employees/' in path:
             employee_id = path.split('/')[-1]
-            return get_employee(employee_id)
+            return conditional_get(event, get_employee(employee_id), 'employees')
         elif http_method == 'PUT' and '/employees/' in path:
             employee_id = path.split('/')[-1]
             return update_employee(employee_id, event)
@@ -61,15 +64,26 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-def get_all_employees():
+def get_all_employees(event=None):
+    """従業員一覧を取得（?limit=&cursor= 指定時はページング）"""
     try:
-        response = table.query(
-            KeyConditionExpression='PK = :pk',
-            ExpressionAttributeValues={':pk': 'EMPLOYEE'}
-        )
+        paging = page_request(event)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': str(e)})
+        }
+    
+    try:
+        repo = EmployeeRepo(table)
+        if paging:
+            items, next_cursor = repo.page(*paging)
+        else:
+            items, next_cursor = repo.list_all(), None
         
         employees = []
-        for item in response['Items']:
+        for item in items:
             employee = {
                 'employee_id': item['SK'],
                 'name': item.get('name', ''),
@@ -88,7 +102,7 @@ def get_all_employees():
         return {
             'statusCode': 200,
             'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-            'body': json.dumps(employees)
+            'body': json.dumps(page_body(employees, next_cursor) if paging else employees)
         }
     except Exception as e:
         return {
@@ -101,32 +115,9 @@ def create_employee(event):
     try:
         data = json.loads(event['body'])
         
-        # 常に自動採番（ユーザー入力は受け付けない）
-        # 既存の従業員IDを取得して最大値+1を採番
-        response = table.query(
-            KeyConditionExpression='PK = :pk',
-            ExpressionAttributeValues={':pk': 'EMPLOYEE'},
-            ProjectionExpression='SK'
-        )
-        
-        max_id = 0
-        for item in response.get('Items', []):
-            try:
-                # 数値として解釈できるIDの最大値を取得
-                current_id = int(item['SK'])
-                max_id = max(max_id, current_id)
-            except (ValueError, KeyError):
-                # 数値でないIDはスキップ
-                pass
-        
-        # 次のIDを3桁ゼロ埋めで生成
-        employee_id = f"{max_id + 1:03d}"
-        
         from datetime import datetime
         
         item = {
-            'PK': 'EMPLOYEE',
-            'SK': employee_id,
             'name': data['name'],
             'kana_name': data.get('kana_name', ''),
             'phone': data.get('phone', ''),
@@ -138,7 +129,19 @@ def create_employee(event):
             'created_at': datetime.now().isoformat()
         }
         
-        table.put_item(Item=item)
+        # 常に自動採番（ユーザー入力は受け付けない）
+        # 採番カウンターから払い出し、既存IDとぶつかった場合（手動登録などで使用済み）は次の番号を使う
+        repo = EmployeeRepo(table)
+        for _ in range(EmployeeRepo.MAX_ID_ATTEMPTS):
+            employee_id = repo.allocate_ids()[0]
+            if repo.create({**EmployeeRepo.key(employee_id), **item}):
+                break
+        else:
+            return {
+                'statusCode': 409,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'error': '従業員IDを採番できませんでした。再度お試しください'})
+            }
         
         return {
             'statusCode': 201,
@@ -152,20 +155,118 @@ def create_employee(event):
             'body': json.dumps({'error': str(e)})
         }
 
+def bulk_import_employees(event):
+    """従業員の一括登録・更新（CSV / NDJSON / JSON 配列）
+
+    employee_id の無い行は新規登録（IDはまとめて予約）、ある行は既存の従業員に指定した列だけを上書きする。
+    正しい行だけを書き込み（新規は条件つきトランザクション、更新は batch_writer）、不正な行は行番号つきで errors に返す。
+    ?dry_run=true なら検証結果だけを返す。
+    """
+    try:
+        body = event.get('body') or ''
+        headers = {key.lower(): value for key, value in (event.get('headers') or {}).items()}
+        params = event.get('queryStringParameters') or {}
+        dry_run = str(params.get('dry_run', '')).lower() == 'true'
+        fmt = employee_io.detect_format(body, headers.get('content-type'))
+        
+        from datetime import datetime
+        now = datetime.now().isoformat()
+        
+        repo = EmployeeRepo(table)
+        existing = {item['SK']: item for item in repo.list_all()}
+        
+        new_rows = []
+        updates = {}
+        errors = []
+        for line, row in employee_io.iter_rows(body, fmt):
+            try:
+                employee_id, employee = employee_io.validate_row(row)
+                if employee_id:
+                    if employee_id not in existing:
+                        raise ValueError(f'従業員ID {employee_id} は存在しません')
+                    base = updates.get(employee_id) or existing[employee_id]
+                    updates[employee_id] = {**base, **employee, 'updated_at': now}
+                else:
+                    new_rows.append((line, employee))
+            except ValueError as e:
+                errors.append({'line': line, 'error': str(e)})
+        
+        created = []
+        if new_rows and not dry_run:
+            # IDは1回の予約でまとめて払い出し、既存の従業員を上書きしないよう条件つきで作成する
+            created = repo.create_many([{
+                'kana_name': '',
+                'phone': '',
+                'email': '',
+                'skills': [],
+                'vacation_days': 20,
+                'cognite_user_id': '',
+                'status': 'PENDING_APPROVAL',
+                **employee,
+                'created_at': now
+            } for line, employee in new_rows], taken=existing)
+        
+        if not dry_run:
+            repo.batch_write(puts=list(updates.values()))
+        
+        return {
+            'statusCode': 200,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({
+                'format': fmt,
+                'dry_run': dry_run,
+                'created': len(created) if not dry_run else len(new_rows),
+                'updated': len(updates),
+                'employee_ids': [item['SK'] for item in created],
+                'errors': errors
+            }, ensure_ascii=False)
+        }
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': str(e)})
+        }
+
+def export_employees(event):
+    """従業員一覧をエクスポート（?format=csv|ndjson|json、既定は csv）"""
+    params = (event or {}).get('queryStringParameters') or {}
+    fmt = params.get('format', 'csv')
+    if fmt not in employee_io.FORMATS:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': f'format は {", ".join(employee_io.FORMATS)} のいずれかです'})
+        }
+    
+    try:
+        items = EmployeeRepo(table).list_all()
+        headers = {'Content-Type': employee_io.CONTENT_TYPES[fmt], **get_cors_headers()}
+        if fmt == 'csv':
+            headers['Content-Disposition'] = 'attachment; filename="employees.csv"'
+        return compress(event, {
+            'statusCode': 200,
+            'headers': headers,
+            'body': ''.join(employee_io.iter_export(items, fmt))
+        })
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': str(e)})
+        }
+
 def get_employee(employee_id):
     try:
-        response = table.get_item(
-            Key={'PK': 'EMPLOYEE', 'SK': employee_id}
-        )
+        item = EmployeeRepo(table).get_employee(employee_id)
         
-        if 'Item' not in response:
+        if not item:
             return {
                 'statusCode': 404,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                 'body': json.dumps({'error': '従業員が見つかりません'})
             }
         
-        item = response['Item']
         employee = {
             'employee_id': item['SK'],
             'name': item.get('name', ''),
@@ -196,8 +297,7 @@ def update_employee(employee_id, event):
         data = json.loads(event['body'])
         
         item = {
-            'PK': 'EMPLOYEE',
-            'SK': employee_id,
+            **EmployeeRepo.key(employee_id),
             'name': data['name'],
             'kana_name': data.get('kana_name', ''),
             'phone': data.get('phone', ''),
@@ -209,7 +309,7 @@ def update_employee(employee_id, event):
             'created_at': data.get('created_at', '')
         }
         
-        table.put_item(Item=item)
+        EmployeeRepo(table).put(item)
         
         return {
             'statusCode': 200,
@@ -225,9 +325,7 @@ def update_employee(employee_id, event):
 
 def delete_employee(employee_id):
     try:
-        table.delete_item(
-            Key={'PK': 'EMPLOYEE', 'SK': employee_id}
-        )
+        EmployeeRepo(table).delete_employee(employee_id)
         
         return {
             'statusCode': 200,
@@ -241,13 +339,41 @@ def delete_employee(employee_id):
             'body': json.dumps({'error': str(e)})
         }
 
-def get_vacation_used(employee_id):
+def get_vacation_used(employee_id, event=None):
+    """年度の休暇使用日数を休暇台帳から取得（?fiscal_year= 省略時は今年度）"""
     try:
-        # 今年の有給使用日数を計算（実装簡略化のため0を返す）
+        params = (event or {}).get('queryStringParameters') or {}
+        try:
+            fiscal_year = int(params.get('fiscal_year') or VacationLedgerRepo.fiscal_year(date.today()))
+        except ValueError:
+            return {
+                'statusCode': 400,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'error': 'fiscal_year must be a year'})
+            }
+        
+        ledger = VacationLedgerRepo(table).get_ledger(employee_id, fiscal_year) or {}
+        employee = EmployeeRepo(table).get_employee(employee_id) or {}
+        vacation_days = float(employee.get('vacation_days', 20))
+        used_days = float(ledger.get('used_days', 0))
+        by_type = {}
+        for name, value in ledger.items():
+            if '#' in name and name.split('#', 1)[0] in ('used_days', 'pending_days'):
+                counter, vacation_type = name.split('#', 1)
+                by_type.setdefault(vacation_type, {'used_days': 0, 'pending_days': 0})[counter] = float(value)
+        
         return {
             'statusCode': 200,
             'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-            'body': json.dumps({'used_days': 0})
+            'body': json.dumps({
+                'employee_id': employee_id,
+                'fiscal_year': fiscal_year,
+                'used_days': used_days,
+                'pending_days': float(ledger.get('pending_days', 0)),
+                'vacation_days': vacation_days,
+                'remaining_days': vacation_days - used_days,
+                'by_type': by_type
+            })
         }
     except Exception as e:
         return {
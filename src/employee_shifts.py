@@ -1,22 +1,17 @@
 import json
-import boto3
-import os
 from datetime import datetime, timedelta
 import calendar
 
-# Support local dynamodb endpoint
-_dynamodb_endpoint = os.environ.get('DYNAMODB_ENDPOINT')
-if _dynamodb_endpoint:
-    dynamodb = boto3.resource('dynamodb', endpoint_url=_dynamodb_endpoint)
-else:
-    dynamodb = boto3.resource('dynamodb')
+from common.dynamodb import get_table
+from common.repositories import ShiftRepo
+from common.responses import conditional_get
 
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
 
 def get_cors_headers():
     return {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
 
@@ -49,18 +44,8 @@ def lambda_handler(event, context):
             end_date = query_params.get('end_date', 
                 datetime.now().strftime('%Y-%m-%d'))
         
-        response = table.query(
-            IndexName='GSI1',
-            KeyConditionExpression='GSI1PK = :employee_id AND GSI1SK BETWEEN :start_date AND :end_date',
-            ExpressionAttributeValues={
-                ':employee_id': employee_id,
-                ':start_date': start_date,
-                ':end_date': end_date
-            }
-        )
-        
         shifts = []
-        for item in response['Items']:
+        for item in ShiftRepo(table).list_by_employee(employee_id, start_date, end_date):
             shifts.append({
                 'date': item['GSI1SK'],
                 'task_type': item['SK'].split('#')[2],
@@ -71,11 +56,11 @@ def lambda_handler(event, context):
             })
         
         # フロントエンド互換性のため、シンプルにシフトの配列を返す
-        return {
+        return conditional_get(event, {
             'statusCode': 200,
             'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
             'body': json.dumps(shifts, default=str)
-        }
+        }, 'shifts')
         
     except Exception as e:
         return {
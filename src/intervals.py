@@ -0,0 +1,86 @@
+"""整数分の時間区間と1日の占有ビットマップ
+
+"HH:MM" は一度だけ整数の分（0〜1440）に変換し、結果をキャッシュする。
+1日の占有は 1440 ビットの整数で表し、ビット i が「i 分から i+1 分まで」に対応する。
+区間の重なりはビットマップの AND 1回で判定できる（datetime.strptime を比較のたびに呼ばない）。
+
+終了が開始以前の区間は日跨ぎとして扱い、ビットマップ上は夜の部分と同じ日の早朝の部分の両方を占有する
+（同じ日の早朝の作業と重なる可能性がある側に倒す）。開始と終了が同じ区間は丸一日とみなす。
+"""
+from functools import lru_cache
+
+MINUTES_PER_DAY = 24 * 60
+
+FULL_DAY_MASK = (1 << MINUTES_PER_DAY) - 1
+
+
+@lru_cache(maxsize=None)
+def to_minutes(time_str):
+    """"HH:MM" → 0時からの分（"24:00" は 1440）"""
+    hours, minutes = time_str.split(':')
+    value = int(hours) * 60 + int(minutes)
+    if not 0 <= value <= MINUTES_PER_DAY:
+        raise ValueError(f'Invalid time: {time_str}')
+    return value
+
+
+def parse(start_time, end_time):
+    """(開始分, 終了分)。日跨ぎの場合は終了分に 1440 を足す"""
+    start = to_minutes(start_time)
+    end = to_minutes(end_time)
+    if end <= start:
+        end += MINUTES_PER_DAY
+    return start, end
+
+
+def duration(start_time, end_time):
+    """区間の長さ（分）"""
+    start, end = parse(start_time, end_time)
+    return end - start
+
+
+@lru_cache(maxsize=4096)
+def mask(start_time, end_time):
+    """区間が占有する分のビットマップ"""
+    start, end = parse(start_time, end_time)
+    if end - start >= MINUTES_PER_DAY:
+        return FULL_DAY_MASK
+    if end <= MINUTES_PER_DAY:
+        return (1 << end) - (1 << start)
+    # 日跨ぎ: start〜24:00 と 0:00〜(end - 1440)
+    return (FULL_DAY_MASK - ((1 << start) - 1)) | ((1 << (end - MINUTES_PER_DAY)) - 1)
+
+
+def overlaps(start1, end1, start2, end2):
+    """2つの区間が重なるか（端点が接するだけなら重ならない）"""
+    return bool(mask(start1, end1) & mask(start2, end2))
+
+
+class DayOccupancy:
+    """1日分の従業員ごとの占有ビットマップ"""
+
+    def __init__(self):
+        self._masks = {}
+
+    @classmethod
+    def from_shifts(cls, shifts_by_employee):
+        """{従業員ID: [{'start_time', 'end_time'}, ...]} から作る"""
+        occupancy = cls()
+        for employee_id, shifts in shifts_by_employee.items():
+            for shift in shifts:
+                occupancy.add(employee_id, shift['start_time'], shift['end_time'])
+        return occupancy
+
+    def add(self, employee_id, start_time, end_time):
+        self._masks[employee_id] = self._masks.get(employee_id, 0) | mask(start_time, end_time)
+
+    def busy(self, employee_id, start_time, end_time):
+        """その区間に既に占有があるか"""
+        return bool(self._masks.get(employee_id, 0) & mask(start_time, end_time))
+
+    def busy_any(self, employee_id, slots):
+        """slots（(開始, 終了) のリスト）のいずれかに占有があるか"""
+        occupied = self._masks.get(employee_id, 0)
+        if not occupied:
+            return False
+        return any(occupied & mask(start_time, end_time) for start_time, end_time in slots)
@@ -1,24 +1,27 @@
 import json
-import boto3
-import os
+from decimal import Decimal
 
-# Support local dynamodb endpoint
-_dynamodb_endpoint = os.environ.get('DYNAMODB_ENDPOINT')
-if _dynamodb_endpoint:
-    dynamodb = boto3.resource('dynamodb', endpoint_url=_dynamodb_endpoint)
-else:
-    dynamodb = boto3.resource('dynamodb')
+from common.dynamodb import get_table
+from common.repositories import RequirementsRepo, SettingsRepo
+from common.responses import conditional_get, decode_request
 
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
 
 def get_cors_headers():
     return {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
 
+def decimal_default(obj):
+    """JSON serialization for Decimal objects（人数は整数のまま返す）"""
+    if isinstance(obj, Decimal):
+        return int(obj) if obj % 1 == 0 else float(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         http_method = event['httpMethod']
         path = event['path']
@@ -32,11 +35,11 @@ def lambda_handler(event, context):
         
         # Requirements API
         if '/requirements/' in path:
-            return handle_requirements(event, http_method, path)
+            return conditional_get(event, handle_requirements(event, http_method, path), 'requirements')
         
         # Settings API
         elif '/settings/' in path:
-            return handle_settings(event, http_method, path)
+            return conditional_get(event, handle_settings(event, http_method, path), 'settings')
         
         else:
             return {
@@ -66,6 +69,13 @@ def handle_requirements(event, http_method, path):
         elif http_method == 'POST':
             return save_monthly_requirements(month, event)
     
+    elif '/daily-month/' in path:
+        month = path.split('/')[-1]
+        if http_method == 'GET':
+            return get_daily_requirements_for_month(month)
+        elif http_method == 'POST':
+            return save_daily_requirements_for_month(month, event)
+    
     elif '/daily/' in path:
         date = path.split('/')[-1]
         if http_method == 'GET':
@@ -102,14 +112,12 @@ def handle_settings(event, http_method, path):
 # Requirements functions
 def get_global_default_requirements():
     try:
-        response = table.get_item(
-            Key={'PK': 'REQUIREMENTS', 'SK': 'GLOBAL_DEFAULT'}
-        )
-        if 'Item' in response:
+        requirements = RequirementsRepo(table).get_global_default()
+        if requirements is not None:
             return {
                 'statusCode': 200,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-                'body': json.dumps(response['Item']['requirements'])
+                'body': json.dumps(requirements, default=decimal_default)
             }
         else:
             return {
@@ -128,13 +136,7 @@ def save_global_default_requirements(event):
     try:
         data = json.loads(event['body'])
         
-        item = {
-            'PK': 'REQUIREMENTS',
-            'SK': 'GLOBAL_DEFAULT',
-            'requirements': data
-        }
-        
-        table.put_item(Item=item)
+        RequirementsRepo(table).save_global_default(data)
         
         return {
             'statusCode': 200,
@@ -150,14 +152,12 @@ def save_global_default_requirements(event):
 
 def get_monthly_requirements(month):
     try:
-        response = table.get_item(
-            Key={'PK': 'REQUIREMENTS', 'SK': f'MONTH#{month}'}
-        )
-        if 'Item' in response:
+        requirements = RequirementsRepo(table).get_month(month)
+        if requirements is not None:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps(response['Item']['requirements'])
+                'body': json.dumps(requirements, default=decimal_default)
             }
         else:
             return {
@@ -175,13 +175,7 @@ def get_monthly_requirements(month):
 def save_monthly_requirements(month, event):
     data = json.loads(event['body'])
     
-    item = {
-        'PK': 'REQUIREMENTS',
-        'SK': f'MONTH#{month}',
-        'requirements': data
-    }
-    
-    table.put_item(Item=item)
+    RequirementsRepo(table).save_month(month, data)
     
     return {
         'statusCode': 200,
@@ -191,14 +185,12 @@ def save_monthly_requirements(month, event):
 
 def get_daily_requirements(date):
     try:
-        response = table.get_item(
-            Key={'PK': 'REQUIREMENTS', 'SK': f'DAILY#{date}'}
-        )
-        if 'Item' in response:
+        requirements = RequirementsRepo(table).get_daily(date)
+        if requirements is not None:
             return {
                 'statusCode': 200,
                 'headers': {'Content-Type': 'application/json'},
-                'body': json.dumps(response['Item']['requirements'])
+                'body': json.dumps(requirements, default=decimal_default)
             }
         else:
             return {
@@ -216,32 +208,66 @@ def get_daily_requirements(date):
 def save_daily_requirements(date, event):
     data = json.loads(event['body'])
     
-    item = {
-        'PK': 'REQUIREMENTS',
-        'SK': f'DAILY#{date}',
-        'requirements': data
+    RequirementsRepo(table).save_daily(date, data)
+    
+    return {
+        'statusCode': 200,
+        'headers': {'Content-Type': 'application/json'},
+        'body': json.dumps({'message': f'Daily requirements for {date} saved'})
     }
+
+def get_daily_requirements_for_month(month):
+    """月内の日別人数設定をまとめて取得（{日付: 人数設定}）"""
+    try:
+        overrides = RequirementsRepo(table).get_daily_for_month(month)
+        return {
+            'statusCode': 200,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps(overrides, default=decimal_default)
+        }
+    except Exception as e:
+        return {
+            'statusCode': 500,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': str(e)})
+        }
+
+def save_daily_requirements_for_month(month, event):
+    """月内の日別人数設定をまとめて保存（値が null や空の日は日別設定を削除）"""
+    data = json.loads(event['body'])
+    
+    if not isinstance(data, dict):
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': 'Body must be an object of {date: requirements}'})
+        }
+    invalid = [date for date in data if not date.startswith(f'{month}-')]
+    if invalid:
+        return {
+            'statusCode': 400,
+            'headers': {'Content-Type': 'application/json'},
+            'body': json.dumps({'error': f'Dates outside {month}: {invalid}'})
+        }
     
-    table.put_item(Item=item)
+    count = RequirementsRepo(table).save_daily_for_month(data)
     
     return {
         'statusCode': 200,
         'headers': {'Content-Type': 'application/json'},
-        'body': json.dumps({'message': f'Daily requirements for {date} saved'})
+        'body': json.dumps({'message': f'Daily requirements for {month} saved', 'count': count})
     }
 
 # Settings functions
 def get_confirmation_settings():
     try:
-        response = table.get_item(
-            Key={'PK': 'SETTINGS', 'SK': 'CONFIRMATION'}
-        )
-        if 'Item' in response:
+        item = SettingsRepo(table).get_settings('CONFIRMATION')
+        if item:
             return {
                 'statusCode': 200,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                 'body': json.dumps({
-                    'confirmation_day': response['Item'].get('confirmation_day', 25)
+                    'confirmation_day': item.get('confirmation_day', 25)
                 })
             }
         else:
@@ -261,13 +287,9 @@ def save_confirmation_settings(event):
     try:
         data = json.loads(event['body'])
         
-        item = {
-            'PK': 'SETTINGS',
-            'SK': 'CONFIRMATION',
+        SettingsRepo(table).save_settings('CONFIRMATION', {
             'confirmation_day': data['confirmation_day']
-        }
-        
-        table.put_item(Item=item)
+        })
         
         return {
             'statusCode': 200,
@@ -284,19 +306,17 @@ def save_confirmation_settings(event):
 def get_vacation_default():
     """休暇デフォルト設定を取得"""
     try:
-        response = table.get_item(
-            Key={'PK': 'SETTINGS', 'SK': 'VACATION_DEFAULT'}
-        )
-        if 'Item' in response:
+        item = SettingsRepo(table).get_settings('VACATION_DEFAULT')
+        if item:
             return {
                 'statusCode': 200,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                 'body': json.dumps({
-                    'default_vacation_days': int(response['Item'].get('default_vacation_days', 20)),
-                    'annual_vacation_days': int(response['Item'].get('annual_vacation_days', 0)),
-                    'monthly_vacation_limit': int(response['Item'].get('monthly_vacation_limit', 0)),
-                    'paid_monthly_limit': int(response['Item'].get('paid_monthly_limit', 0)),
-                    'custom_vacation_types': response['Item'].get('custom_vacation_types', [])
+                    'default_vacation_days': int(item.get('default_vacation_days', 20)),
+                    'annual_vacation_days': int(item.get('annual_vacation_days', 0)),
+                    'monthly_vacation_limit': int(item.get('monthly_vacation_limit', 0)),
+                    'paid_monthly_limit': int(item.get('paid_monthly_limit', 0)),
+                    'custom_vacation_types': item.get('custom_vacation_types', [])
                 })
             }
         else:
@@ -332,17 +352,13 @@ def save_vacation_default(event):
     try:
         data = json.loads(event['body'])
         
-        item = {
-            'PK': 'SETTINGS',
-            'SK': 'VACATION_DEFAULT',
+        SettingsRepo(table).save_settings('VACATION_DEFAULT', {
             'default_vacation_days': int(data.get('default_vacation_days', 20)),
             'annual_vacation_days': int(data.get('annual_vacation_days', 0)),
             'monthly_vacation_limit': int(data.get('monthly_vacation_limit', 0)),
             'paid_monthly_limit': int(data.get('paid_monthly_limit', 0)),
             'custom_vacation_types': data.get('custom_vacation_types', [])
-        }
-        
-        table.put_item(Item=item)
+        })
         
         return {
             'statusCode': 200,
@@ -1,27 +1,38 @@
 import json
-import boto3
-import os
+import uuid
 from datetime import datetime, timedelta
 from collections import defaultdict
 import calendar
 
-# Support local dynamodb endpoint
-_dynamodb_endpoint = os.environ.get('DYNAMODB_ENDPOINT')
-if _dynamodb_endpoint:
-    dynamodb = boto3.resource('dynamodb', endpoint_url=_dynamodb_endpoint)
-else:
-    dynamodb = boto3.resource('dynamodb')
+import absence
+import intervals
+import shift_planning
+import shift_solver
+import task_slots
+from common.dynamodb import get_table
+from common.repositories import ShiftRepo, EmployeeRepo, RequirementsRepo, ShiftGenerationRepo, ShiftDraftRepo
+from common.responses import conditional_get, decode_request
 
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
+
+# 午前/午後別の人数設定で、作業の時間帯が未定義の場合に使う時間
+DEFAULT_HALF_DAY_TIMES = {
+    'morning': ('05:00', '12:00'),
+    'afternoon': ('13:00', '18:00')
+}
+
+# 作業種別の新旧IDマッピング（フロントエンドと同じ対応）
+TASK_ID_ALIASES = task_slots.TASK_ID_ALIASES
 
 def get_cors_headers():
     return {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
 
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         http_method = event['httpMethod']
         path = event['path']
@@ -35,9 +46,11 @@ def lambda_handler(event, context):
         
         if http_method == 'POST' and path == '/shifts/generate-monthly':
             return generate_monthly_shifts(event)
+        elif http_method == 'POST' and path.startswith('/shifts/drafts/') and path.endswith('/commit'):
+            return commit_draft(event['pathParameters']['id'])
         elif http_method == 'GET' and '/shifts/by-month/' in path:
             month = path.split('/')[-1]
-            return get_shifts_by_month(month)
+            return conditional_get(event, get_shifts_by_month(month), 'shifts')
         elif http_method == 'POST' and path == '/shifts/assign':
             return assign_shifts(event)
         else:
@@ -55,8 +68,11 @@ def lambda_handler(event, context):
 
 def generate_monthly_shifts(event):
     """月間シフト自動生成
-    Supports preview mode: if data['preview'] is True, do not write or delete anything; just return generated shifts for review.
+    Supports preview mode: if data['preview'] is True, no shift is written; the computed plan is stored as a draft
+    (ShiftDraftRepo) and returned with its draft_id, so POST /shifts/drafts/{id}/commit can apply it without re-solving.
     Prevent generation for past months.
+    With overwrite, only days whose input fingerprint changed since the last run are regenerated
+    (data['full'] forces every day to be rebuilt).
     """
     try:
         data = json.loads(event['body'])
@@ -94,9 +110,8 @@ def generate_monthly_shifts(event):
         
         generated_shifts = []
         
-        # Only delete or write when not previewing
-        if not preview and overwrite:
-            delete_existing_shifts_for_month(month)
+        # 月の既存シフトを一度だけ読み込み、重複チェックはメモリ上で行う
+        plan = shift_planning.MonthShiftPlan.load(table, month)
         
         # リクエストに要求人数が含まれていればそれを優先して使用（フロントの設定が未保存の場合にも対応）
         requirements = data.get('requirements') or get_requirements_for_month(month)
@@ -111,33 +126,117 @@ def generate_monthly_shifts(event):
                 'body': json.dumps({'error': '従業員が登録されていません'})
             }
         
-        for day in range(1, days_in_month + 1):
-            date = f"{month}-{day:02d}"
-            
-            # 日別設定があるかチェック
-            daily_reqs = get_daily_requirements(date)
-            if daily_reqs:
-                day_requirements = daily_reqs
-            else:
-                day_requirements = requirements
-            
-            # その日のシフトを生成
-            try:
-                day_shifts = generate_day_shifts(date, day_requirements, employees, not preview)
-                generated_shifts.extend(day_shifts)
-            except Exception as e:
-                print(f"Error generating shifts for {date}: {str(e)}")
-                # Continue with next day instead of failing completely
-                continue
+        days = [f"{month}-{day:02d}" for day in range(1, days_in_month + 1)]
+        # 作業時間帯は作業カタログから（コンテナ内でコンパイル済みの表を使う）
+        slots = task_slots.load(table)
+        # 日別設定は月分を1回で読み込み、日ごとの人数設定に展開する
+        demands = [requirements_to_demands(day_requirements, slots)
+                   for day_requirements in resolve_month_requirements(month, days, requirements)]
+        
+        # 承認済みの休暇を1回のクエリで読み込み、休みの人・時間帯には割り当てない
+        absences = absence.AbsenceMap.load(table, days)
+        
+        solver = data.get('solver') or shift_solver.DEFAULT_SOLVER
+        day_demands = dict(zip(days, demands))
+        
+        def fingerprint(date):
+            absence_bits = {emp['id']: absences.day_bits(emp['id'], date) for emp in employees}
+            return shift_planning.day_fingerprint(
+                day_demands[date], employees, {k: v for k, v in absence_bits.items() if v},
+                plan.day_items(date), solver)
+        
+        # 上書き時は入力のフィンガープリントが前回の生成から変わった日だけ作り直す
+        # （書き込みはプレビューでない場合のみ）
+        regenerate_days = days
+        stored = {}
+        if overwrite:
+            stored = {} if data.get('full') else ShiftGenerationRepo(table).get_days(month)
+            regenerate_days = [date for date in days
+                               if date not in stored or stored[date]['fingerprint'] != fingerprint(date)]
+            plan.clear(regenerate_days)
+        regenerate = set(regenerate_days)
+        kept_days = [date for date in days if date not in regenerate]
+        # 作り直さない日の割り当ても公平性の担当回数に数える
+        prior = []
+        for date in kept_days:
+            for item in plan.day_items(date):
+                _, employee_id, task_type = ShiftRepo.parse_key(item)
+                prior.append({'employee_id': employee_id, 'task_type': task_type})
+        
+        # 対象の日をまとめて解く（残した手動のシフトで埋まっている人数は除く）
+        try:
+            result = shift_solver.solve_month(
+                regenerate_days,
+                [shift_planning.remaining_demands(day_demands[date], plan.day_items(date)) for date in regenerate_days],
+                employees,
+                unavailable=plan.busy_keys() | absences.full_day_keys(),
+                solver=solver,
+                absences=absences,
+                prior=prior
+            )
+        except ValueError as e:
+            return {
+                'statusCode': 400,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'error': str(e)})
+            }
+        
+        for shift in result['assignments']:
+            if plan.add(shift):
+                # 画面の午前/午後の絞り込み用に作業時間帯のラベルを付ける
+                generated_shifts.append({
+                    **shift,
+                    'shift_type': slots.half_of(shift['task_type'], shift['start_time'], shift['end_time'])
+                })
+        
+        unfilled = result['unfilled']
+        fingerprints = None
+        extra_puts = []
+        if overwrite:
+            fingerprints = {date: stored[date] for date in kept_days}
+            for date in regenerate_days:
+                fingerprints[date] = {
+                    'fingerprint': fingerprint(date),
+                    'unfilled': [entry for entry in result['unfilled'] if entry['date'] == date]
+                }
+            unfilled = [entry for date in days for entry in fingerprints[date]['unfilled']]
+            if regenerate_days:
+                extra_puts.append(ShiftGenerationRepo.build_item(month, fingerprints))
+        
+        response = {
+            'message': f'Generated {len(generated_shifts)} shifts for {month}',
+            'shifts': generated_shifts,
+            'unfilled': unfilled,
+            'regenerated_days': len(regenerate_days),
+            'unchanged_days': len(kept_days),
+            'preview': preview
+        }
+        
+        # プレビューモードの場合はシフトを保存せず、計画を下書きとして保存して返す
+        if preview:
+            draft_id = uuid.uuid4().hex
+            response['draft_id'] = draft_id
+            response['expires_at'] = ShiftDraftRepo(table).put_draft(draft_id, month, {
+                'base': plan.base_fingerprint,
+                'overwrite': overwrite,
+                'regenerate_days': regenerate_days,
+                'shifts': generated_shifts,
+                'fingerprints': fingerprints if regenerate_days else None
+            })
+        else:
+            plan.flush(table, extra_puts)
+            # 生成中に手動で作られた日は上書きせず、衝突として返す
+            if plan.conflicts:
+                generated_shifts = plan.without_conflicts(generated_shifts)
+                response['message'] = f'Generated {len(generated_shifts)} shifts for {month}'
+                response['shifts'] = generated_shifts
+            response['conflicts'] = [{'date': date, 'employee_id': employee_id}
+                                     for date, employee_id in sorted(plan.conflict_keys())]
         
         return {
             'statusCode': 200,
             'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-            'body': json.dumps({
-                'message': f'Generated {len(generated_shifts)} shifts for {month}',
-                'shifts': generated_shifts,
-                'preview': preview
-            })
+            'body': json.dumps(response)
         }
     except Exception as e:
         return {
@@ -146,65 +245,84 @@ def generate_monthly_shifts(event):
             'body': json.dumps({'error': f'シフト生成エラー: {str(e)}'})
         }
 
-def delete_existing_shifts_for_month(month):
-    """月の既存シフトを削除"""
-    year, month_num = map(int, month.split('-'))
-    days_in_month = calendar.monthrange(year, month_num)[1]
+def commit_draft(draft_id):
+    """POST /shifts/drafts/{id}/commit: プレビューで保存した計画をそのまま書き込む（再計算しない）
+
+    プレビュー後に月のシフトが変更されていれば、計画が古いので 409 を返す。
+    下書きは書き込みが成功してから削除する（失敗したら同じ下書きで再実行できる）。
+    同じ下書きを2回確定しても、2回目は書き込み後の月と比べて 409 になるか、同じ内容を書くだけになる。
+    """
+    drafts = ShiftDraftRepo(table)
+    draft = drafts.get_draft(draft_id)
+    if not draft:
+        return {
+            'statusCode': 404,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': 'プレビューが見つからないか期限切れです。もう一度生成してください'})
+        }
     
-    for day in range(1, days_in_month + 1):
-        date = f"{month}-{day:02d}"
-        
-        # その日のシフトを取得
-        response = table.query(
-            KeyConditionExpression='PK = :pk',
-            ExpressionAttributeValues={':pk': f'SHIFT#{date}'}
-        )
-        
-        # 一括削除
-        with table.batch_writer() as batch:
-            for item in response['Items']:
-                batch.delete_item(
-                    Key={'PK': item['PK'], 'SK': item['SK']}
-                )
+    month = draft['month']
+    plan = shift_planning.MonthShiftPlan.load(table, month)
+    if plan.base_fingerprint != draft['base']:
+        return {
+            'statusCode': 409,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': 'プレビュー後にシフトが変更されました。もう一度生成してください'})
+        }
+    
+    if draft['overwrite']:
+        plan.clear(draft['regenerate_days'])
+    committed = [shift for shift in draft['shifts'] if plan.add(shift)]
+    extra_puts = []
+    if draft.get('fingerprints'):
+        extra_puts.append(ShiftGenerationRepo.build_item(month, draft['fingerprints']))
+    written = plan.flush(table, extra_puts)
+    drafts.delete_draft(draft_id)
+    # プレビュー後に手動で作られた日は上書きせず、衝突として返す
+    committed = plan.without_conflicts(committed)
+    
+    return {
+        'statusCode': 200,
+        'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+        'body': json.dumps({
+            'message': f'Committed {len(committed)} shifts for {month}',
+            'month': month,
+            'shifts': committed,
+            'written': written,
+            'conflicts': [{'date': date, 'employee_id': employee_id}
+                          for date, employee_id in sorted(plan.conflict_keys())]
+        })
+    }
+
+def delete_existing_shifts_for_month(month):
+    """月の自動生成シフトを削除（手動のシフトとそのロックは残す）"""
+    plan = shift_planning.MonthShiftPlan.load(table, month)
+    plan.clear()
+    plan.flush(table)
 
 def get_shifts_by_month(month):
     """月別シフト取得
-    Also cleans duplicate assignments where same employee has multiple roles on a given date by keeping the first and deleting others.
+    Read-only: if the same employee has several rows on a date, only the first is returned.
+    Duplicate rows are removed by the background reconciler (shift_reconciler), not here.
     """
-    year, month_num = map(int, month.split('-'))
-    days_in_month = calendar.monthrange(year, month_num)[1]
-    
     all_shifts = []
+    seen_employees = set()
     
-    for day in range(1, days_in_month + 1):
-        date = f"{month}-{day:02d}"
-        
-        response = table.query(
-            KeyConditionExpression='PK = :pk',
-            ExpressionAttributeValues={':pk': f'SHIFT#{date}'}
-        )
-        
-        seen_employees = set()
-        for item in response['Items']:
-            employee_id = item['SK'].split('#')[1]
-            task_type = item['SK'].split('#')[2]
-            if employee_id in seen_employees:
-                # Duplicate: delete this entry to clean data
-                try:
-                    table.delete_item(Key={'PK': item['PK'], 'SK': item['SK']})
-                except Exception:
-                    pass
-                continue
-            seen_employees.add(employee_id)
-            shift = {
-                'date': date,
-                'employee_id': employee_id,
-                'task_type': task_type,
-                'start_time': item['start_time'],
-                'end_time': item['end_time'],
-                'status': item.get('status', 'scheduled')
-            }
-            all_shifts.append(shift)
+    # 月別インデックス（GSI3）から1回のページング付きクエリで取得（日付順）
+    for item in ShiftRepo(table).list_by_month(month):
+        date, employee_id, task_type = ShiftRepo.parse_key(item)
+        if (date, employee_id) in seen_employees:
+            continue
+        seen_employees.add((date, employee_id))
+        shift = {
+            'date': date,
+            'employee_id': employee_id,
+            'task_type': task_type,
+            'start_time': item['start_time'],
+            'end_time': item['end_time'],
+            'status': item.get('status', 'scheduled')
+        }
+        all_shifts.append(shift)
     
     return {
         'statusCode': 200,
@@ -214,146 +332,99 @@ def get_shifts_by_month(month):
 
 def get_requirements_for_month(month):
     """月別またはグローバルデフォルト人数設定を取得"""
+    repo = RequirementsRepo(table)
     # 月別設定を試行
     try:
-        response = table.get_item(
-            Key={'PK': 'REQUIREMENTS', 'SK': f'MONTH#{month}'}
-        )
-        if 'Item' in response:
-            return response['Item']['requirements']
+        requirements = repo.get_month(month)
+        if requirements is not None:
+            return requirements
     except:
         pass
     
     # グローバルデフォルト設定を取得
     try:
-        response = table.get_item(
-            Key={'PK': 'REQUIREMENTS', 'SK': 'GLOBAL_DEFAULT'}
-        )
-        if 'Item' in response:
-            return response['Item']['requirements']
+        requirements = repo.get_global_default()
+        if requirements is not None:
+            return requirements
     except:
         pass
     
     # デフォルト値
     return {'milking': 2, 'feeding': 1, 'cleaning': 1, 'patrol': 1}
 
-def get_daily_requirements(date):
-    """日別人数設定を取得"""
+def get_daily_requirements_for_month(month):
+    """月内の日別人数設定を {日付: 人数設定} で取得"""
     try:
-        response = table.get_item(
-            Key={'PK': 'REQUIREMENTS', 'SK': f'DAILY#{date}'}
-        )
-        if 'Item' in response:
-            return response['Item']['requirements']
-    except:
-        pass
-    return None
+        return RequirementsRepo(table).get_daily_for_month(month)
+    except Exception as e:
+        print(f"Error loading daily requirements for {month}: {str(e)}")
+    return {}
+
+def resolve_month_requirements(month, days, requirements=None):
+    """日ごとの人数設定のリストを返す（日別設定 > 指定/月別/グローバルデフォルト）"""
+    if requirements is None:
+        requirements = get_requirements_for_month(month)
+    daily = get_daily_requirements_for_month(month)
+    return [daily.get(date) or requirements for date in days]
+
+def requirements_to_demands(requirements, slots=None):
+    """人数設定をソルバー用の (task_type, start_time, end_time, count) のリストに変換
+
+    人数は数値（先頭の時間帯に割り当て）または {'morning': n, 'afternoon': m} の形式を受け付ける。
+    slots は task_slots.SlotTable（省略時は既定の作業時間帯）。
+    """
+    demands = []
+    if not requirements:
+        return demands
+    slots = slots or task_slots.DEFAULT_TABLE
+    
+    for task_type, count in requirements.items():
+        if isinstance(count, dict):
+            for half in task_slots.HALVES:
+                half_count = int(count.get(half) or 0)
+                if half_count <= 0:
+                    continue
+                slot = slots.for_half(task_type, half)
+                start_time, end_time = (slot.start_time, slot.end_time) if slot else DEFAULT_HALF_DAY_TIMES[half]
+                demands.append((task_type, start_time, end_time, half_count))
+        else:
+            count = int(count or 0)
+            if count <= 0:
+                continue
+            slot = slots.first(task_type)
+            start_time, end_time = (slot.start_time, slot.end_time) if slot else task_slots.FALLBACK_SLOT
+            demands.append((task_type, start_time, end_time, count))
+    
+    return demands
 
 def generate_day_shifts(date, requirements, employees, overwrite=True):
     """1日分のシフトを生成"""
     shifts = []
     
-    task_schedules = {
-        'milking': [('05:00', '07:00')],
-        'feeding': [('08:00', '09:00')],
-        'cleaning': [('10:00', '11:30')],
-        'patrol': [('14:00', '14:30')]
-    }
-    
     if not requirements:
         return shifts
     
-    for task_type, count in requirements.items():
-        if count <= 0:
-            continue
-        
-        try:
-            # スキルを持つ従業員をフィルタ
-            skilled_employees = [emp for emp in employees if task_type in emp.get('skills', [])]
-            
-            # 必要人数分割り当て
-            for i in range(min(count, len(skilled_employees))):
-                employee = skilled_employees[i]
-                times = task_schedules.get(task_type, [('09:00', '17:00')])
-                start_time, end_time = times[0]
-                
-                shift = {
-                    'date': date,
-                    'employee_id': employee['id'],
-                    'task_type': task_type,
-                    'start_time': start_time,
-                    'end_time': end_time
-                }
-                
-                # 冪等性を保つための保存
-                if overwrite:
-                    if save_shift_assignment_safe(shift, True):
-                        shifts.append(shift)
-                else:
-                    # プレビューモードの場合は保存せずに返す
-                    shifts.append(shift)
-        except Exception as e:
-            print(f"Error assigning {task_type} on {date}: {str(e)}")
-            # Continue with next task type
-            continue
+    demands = requirements_to_demands(requirements, task_slots.load(table))
+    result = shift_solver.solve_month([date], [demands], employees)
+    for shift in result['assignments']:
+        # 冪等性を保つための保存
+        if overwrite:
+            if save_shift_assignment_safe(shift, True):
+                shifts.append(shift)
+        else:
+            # プレビューモードの場合は保存せずに返す
+            shifts.append(shift)
     
     return shifts
 
-def employee_has_shift_on_date(date, employee_id):
-    """Return True if the employee already has any shift on the given date."""
-    try:
-        response = table.query(
-            KeyConditionExpression='PK = :pk',
-            ExpressionAttributeValues={':pk': f'SHIFT#{date}'}
-        )
-        for item in response['Items']:
-            if item['SK'].startswith(f'EMP#{employee_id}#'):
-                return True
-        return False
-    except Exception:
-        # Conservatively return True to avoid accidental double assignment on error
-        return True
-
-
 def save_shift_assignment_safe(assignment, overwrite=True):
     """冪等性を保つシフト保存
-    Prevent assigning the same employee to more than one task on the same date.
+    Prevent assigning the same employee to more than one task on the same date:
+    the shift and its (date, employee) lock item are written in one conditional transaction.
+    overwrite is kept for compatibility; an existing shift is never overwritten.
     """
-    # Check duplicate assignment for same employee/date
-    if employee_has_shift_on_date(assignment['date'], assignment['employee_id']):
-        # There's already a shift for this employee this date — skip/save prevented
-        return False
-
-    pk = f"SHIFT#{assignment['date']}"
-    sk = f"EMP#{assignment['employee_id']}#{assignment['task_type']}"
-    
-    item = {
-        'PK': pk,
-        'SK': sk,
-        'GSI1PK': assignment['employee_id'],
-        'GSI1SK': assignment['date'],
-        'GSI2PK': assignment['task_type'],
-        'GSI2SK': f"{assignment['date']}#{assignment['employee_id']}",
-        'start_time': assignment['start_time'],
-        'end_time': assignment['end_time'],
-        'status': 'auto_assigned',
-        'created_at': datetime.now().isoformat()
-    }
-    
     try:
-        if overwrite:
-            # 上書きモード：無条件で保存
-            table.put_item(Item=item)
-        else:
-            # 新規作成モード：既存しない場合のみ保存
-            table.put_item(
-                Item=item,
-                ConditionExpression='attribute_not_exists(PK)'
-            )
-        return True
-    except table.meta.client.exceptions.ConditionalCheckFailedException:
-        # 既に存在する場合はスキップ
-        return False
+        return ShiftRepo(table).create(ShiftRepo.build_item(assignment))
     except Exception as e:
         print(f"Error saving shift: {e}")
         return False
@@ -366,8 +437,10 @@ def assign_shifts(event):
     
     available_employees = get_available_employees()
     existing_shifts = get_existing_shifts(date)
+    absences = absence.AbsenceMap.load(table, [date])
+    slots = task_slots.load(table)
     
-    assignments = auto_assign_shifts(date, required_tasks, available_employees, existing_shifts)
+    assignments = auto_assign_shifts(date, required_tasks, available_employees, existing_shifts, absences, slots)
     
     for assignment in assignments:
         save_shift_assignment(assignment)
@@ -384,17 +457,19 @@ def assign_shifts(event):
 def get_available_employees():
     """利用可能な従業員リストを取得"""
     try:
-        response = table.query(
-            KeyConditionExpression='PK = :pk',
-            ExpressionAttributeValues={':pk': 'EMPLOYEE'}
-        )
-        
         employees = []
-        for item in response['Items']:
+        for item in EmployeeRepo(table).list_all():
+            skills = list(item.get('skills', []))
+            # 新旧どちらの作業種別IDでも一致するように別名を補う
+            for task_id, legacy_name in TASK_ID_ALIASES.items():
+                if task_id in skills and legacy_name not in skills:
+                    skills.append(legacy_name)
+                elif legacy_name in skills and task_id not in skills:
+                    skills.append(task_id)
             employees.append({
                 'id': item['SK'],
                 'name': item.get('name', ''),
-                'skills': item.get('skills', []),
+                'skills': skills,
                 'max_hours_per_day': item.get('max_hours_per_day', 8)
             })
         
@@ -406,33 +481,27 @@ def get_available_employees():
 
 def get_existing_shifts(date):
     """既存のシフトを取得"""
-    response = table.query(
-        KeyConditionExpression='PK = :pk',
-        ExpressionAttributeValues={':pk': f'SHIFT#{date}'}
-    )
-    
     existing = defaultdict(list)
-    for item in response['Items']:
-        employee_id = item['SK'].split('#')[1]
+    for item in ShiftRepo(table).list_by_date(date):
+        _, employee_id, task_type = ShiftRepo.parse_key(item)
         existing[employee_id].append({
-            'task_type': item['SK'].split('#')[2],
+            'task_type': task_type,
             'start_time': item['start_time'],
             'end_time': item['end_time']
         })
     
     return existing
 
-def auto_assign_shifts(date, required_tasks, available_employees, existing_shifts):
-    """シフト自動割り当てロジック"""
+def auto_assign_shifts(date, required_tasks, available_employees, existing_shifts, absences=None, slots=None):
+    """シフト自動割り当てロジック（absences があれば休暇と重なる時間帯には割り当てない）
+
+    作業時間帯は slots（task_slots.SlotTable、省略時は既定の作業時間帯）から取る。
+    """
     assignments = []
+    slots = slots or task_slots.DEFAULT_TABLE
     
-    # 作業時間帯の定義
-    task_schedules = {
-        'milking': [('05:00', '07:00'), ('17:00', '19:00')],
-        'feeding': [('08:00', '10:00'), ('16:00', '17:00')],
-        'cleaning': [('10:00', '12:00'), ('14:00', '16:00')],
-        'patrol': [('13:00', '14:00'), ('20:00', '21:00')]
-    }
+    # 従業員ごとのその日の占有ビットマップ（重なり判定は AND 1回）
+    occupancy = intervals.DayOccupancy.from_shifts(existing_shifts)
     
     for task_req in required_tasks:
         task_type = task_req['task_type']
@@ -443,14 +512,23 @@ def auto_assign_shifts(date, required_tasks, available_employees, existing_shift
                            if task_type in emp.get('skills', [])]
         
         # 既に割り当て済みでない従業員を選択
+        task_times = slots.times(task_type)
         available_for_task = [emp for emp in skilled_employees 
-                            if not is_employee_busy(emp['id'], task_type, existing_shifts, task_schedules)]
+                            if not occupancy.busy_any(emp['id'], task_times)]
+        
+        # 作業のどの時間帯も休暇と重なる従業員は候補から外す
+        if absences:
+            task_times = slots.times(task_type, [task_slots.FALLBACK_SLOT])
+            available_for_task = [emp for emp in available_for_task
+                                  if not all(absences.blocks(emp['id'], date, start, end) for start, end in task_times)]
         
         # 必要人数分割り当て
         assigned_count = 0
         for employee in available_for_task[:required_count]:
-            for start_time, end_time in task_schedules.get(task_type, [('09:00', '17:00')]):
-                if not has_time_conflict(employee['id'], start_time, end_time, existing_shifts):
+            for start_time, end_time in slots.times(task_type, [task_slots.FALLBACK_SLOT]):
+                if absences and absences.blocks(employee['id'], date, start_time, end_time):
+                    continue
+                if not occupancy.busy(employee['id'], start_time, end_time):
                     assignment = {
                         'date': date,
                         'employee_id': employee['id'],
@@ -462,6 +540,7 @@ def auto_assign_shifts(date, required_tasks, available_employees, existing_shift
                     assignments.append(assignment)
                     
                     # 既存シフトに追加（重複チェック用）
+                    occupancy.add(employee['id'], start_time, end_time)
                     existing_shifts[employee['id']].append({
                         'task_type': task_type,
                         'start_time': start_time,
@@ -478,32 +557,17 @@ def auto_assign_shifts(date, required_tasks, available_employees, existing_shift
 
 def is_employee_busy(employee_id, task_type, existing_shifts, task_schedules):
     """従業員が忙しいかチェック"""
-    employee_shifts = existing_shifts.get(employee_id, [])
-    task_times = task_schedules.get(task_type, [])
-    
-    for shift in employee_shifts:
-        for start_time, end_time in task_times:
-            if has_time_overlap(shift['start_time'], shift['end_time'], start_time, end_time):
-                return True
-    return False
+    occupancy = intervals.DayOccupancy.from_shifts({employee_id: existing_shifts.get(employee_id, [])})
+    return occupancy.busy_any(employee_id, task_schedules.get(task_type, []))
 
 def has_time_conflict(employee_id, start_time, end_time, existing_shifts):
     """時間の重複をチェック"""
-    employee_shifts = existing_shifts.get(employee_id, [])
-    
-    for shift in employee_shifts:
-        if has_time_overlap(shift['start_time'], shift['end_time'], start_time, end_time):
-            return True
-    return False
+    occupancy = intervals.DayOccupancy.from_shifts({employee_id: existing_shifts.get(employee_id, [])})
+    return occupancy.busy(employee_id, start_time, end_time)
 
 def has_time_overlap(start1, end1, start2, end2):
-    """時間の重複判定"""
-    start1_dt = datetime.strptime(start1, '%H:%M').time()
-    end1_dt = datetime.strptime(end1, '%H:%M').time()
-    start2_dt = datetime.strptime(start2, '%H:%M').time()
-    end2_dt = datetime.strptime(end2, '%H:%M').time()
-    
-    return not (end1_dt <= start2_dt or end2_dt <= start1_dt)
+    """時間の重複判定（日跨ぎの区間にも対応）"""
+    return intervals.overlaps(start1, end1, start2, end2)
 
 def save_shift_assignment(assignment):
     """シフト割り当てをDynamoDBに保存（互換性のため保持）"""
@@ -1,27 +1,31 @@
 import json
-import boto3
-import os
 from datetime import datetime
 from decimal import Decimal
 from urllib.parse import unquote
 
-# Support using a local DynamoDB endpoint during development
-_dynamodb_endpoint = os.environ.get('DYNAMODB_ENDPOINT')
-if _dynamodb_endpoint:
-    dynamodb = boto3.resource('dynamodb', endpoint_url=_dynamodb_endpoint)
-else:
-    dynamodb = boto3.resource('dynamodb')
+from common.dynamodb import get_table, query_all, error_code
+from common.repositories import ShiftRepo
+from common.responses import conditional_get, decode_request
 
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
+
+# POST /shifts/batch で1回に受け付ける操作の上限
+MAX_BATCH_OPERATIONS = 1000
+
+BATCH_OPERATIONS = ('create', 'update', 'move', 'delete')
+
+# update / move で変更できる属性（キー以外）
+SHIFT_ATTRIBUTES = ('start_time', 'end_time', 'status')
 
 def get_cors_headers():
     return {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
 
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         method = event['httpMethod']
         path = event['path']
@@ -33,10 +37,12 @@ def lambda_handler(event, context):
                 'body': ''
             }
         
-        if method == 'GET' and '/shifts/' in path:
-            return get_shifts_by_date(event)
+        if method == 'POST' and path == '/shifts/batch':
+            return batch_shifts(event)
+        elif method == 'GET' and '/shifts/' in path:
+            return conditional_get(event, get_shifts_by_date(event), 'shifts')
         elif method == 'GET' and '/employees/' in path and '/shifts' in path:
-            return get_shifts_for_employee(event)
+            return conditional_get(event, get_shifts_for_employee(event), 'shifts')
         elif method == 'POST' and path == '/shifts':
             return create_shift(event)
         elif method == 'PUT' and '/shifts/' in path:
@@ -59,15 +65,9 @@ def lambda_handler(event, context):
 def get_shifts_by_date(event):
     date = event['pathParameters']['date']
     
-    response = table.query(
-        KeyConditionExpression='PK = :pk',
-        ExpressionAttributeValues={':pk': f'SHIFT#{date}'}
-    )
-    
     shifts = []
-    for item in response['Items']:
-        employee_id = item['SK'].split('#')[1]
-        task_type = item['SK'].split('#')[2]
+    for item in ShiftRepo(table).list_by_date(date):
+        _, employee_id, task_type = ShiftRepo.parse_key(item)
         shifts.append({
             'shift_id': f"SHIFT#{date}#{employee_id}#{task_type}",
             'employee_id': employee_id,
@@ -97,16 +97,17 @@ def get_shifts_for_employee(event):
         # Prefer querying GSI1 for employee-based lookup
         from boto3.dynamodb.conditions import Key
         if month:
-            resp = table.query(
+            items = query_all(
+                table,
                 IndexName='GSI1',
                 KeyConditionExpression=Key('GSI1PK').eq(employee_id) & Key('GSI1SK').begins_with(month)
             )
         else:
-            resp = table.query(
+            items = query_all(
+                table,
                 IndexName='GSI1',
                 KeyConditionExpression=Key('GSI1PK').eq(employee_id)
             )
-        items = resp.get('Items', [])
     except Exception:
         # Fallback for tests using DummyTable: iterate over in-memory items
         items = []
@@ -144,33 +145,21 @@ def create_shift(event):
     employee_id = data['employee_id']
     task_type = data['task_type']
 
-    # Prevent assigning same employee multiple tasks on same date
-    response = table.query(
-        KeyConditionExpression='PK = :pk',
-        ExpressionAttributeValues={':pk': f'SHIFT#{date}'}
-    )
-    for item in response['Items']:
-        if item['SK'].startswith(f'EMP#{employee_id}#'):
-            return {
-                'statusCode': 400,
-                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-                'body': json.dumps({'error': 'Employee already has a shift on this date'})
-            }
-
-    item = {
-        'PK': f"SHIFT#{date}",
-        'SK': f"EMP#{employee_id}#{task_type}",
-        'GSI1PK': employee_id,
-        'GSI1SK': date,
-        'GSI2PK': task_type,
-        'GSI2SK': f"{date}#{employee_id}",
+    # The lock item for (date, employee) is written in the same transaction,
+    # so the same employee can never get a second task on the same date
+    created = ShiftRepo(table).create(ShiftRepo.build_item({
+        'date': date,
+        'employee_id': employee_id,
+        'task_type': task_type,
         'start_time': data['start_time'],
-        'end_time': data['end_time'],
-        'status': 'scheduled',
-        'created_at': datetime.now().isoformat()
-    }
-    
-    table.put_item(Item=item)
+        'end_time': data['end_time']
+    }, status='scheduled'))
+    if not created:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': 'Employee already has a shift on this date'})
+        }
     
     return {
         'statusCode': 201,
@@ -197,48 +186,39 @@ def update_shift(event):
         current_employee = parts[2]
         task_type = parts[3]
         
-        pk = f"SHIFT#{date}"
-        sk = f"EMP#{current_employee}#{task_type}"
+        repo = ShiftRepo(table)
+        key = ShiftRepo.key(date, current_employee, task_type)
         
         # If employee change requested, perform copy+delete to move the item
         if 'employee_id' in data and data['employee_id'] != current_employee:
             new_employee = data['employee_id']
             # Fetch existing item
-            resp = table.get_item(Key={'PK': pk, 'SK': sk})
-            if 'Item' not in resp:
+            item = repo.get(key)
+            if not item:
                 return {
                     'statusCode': 404,
                     'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                     'body': json.dumps({'error': 'Shift not found'})
                 }
-            # Prevent reassign if target employee already has a shift that day
-            # Query shifts for the date and check
-            check_resp = table.query(
-                KeyConditionExpression='PK = :pk',
-                ExpressionAttributeValues={':pk': pk}
-            )
-            for it in check_resp['Items']:
-                if it['SK'].startswith(f'EMP#{new_employee}#'):
-                    return {
-                        'statusCode': 400,
-                        'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-                        'body': json.dumps({'error': 'Target employee already has a shift on this date'})
-                    }
-
-            item = resp['Item']
+
             # Build new item with updated employee
-            new_sk = f"EMP#{new_employee}#{task_type}"
             new_item = item.copy()
-            new_item['SK'] = new_sk
-            new_item['GSI1PK'] = new_employee
-            new_item['GSI1SK'] = parts[1]
-            new_item['GSI2PK'] = task_type
-            new_item['GSI2SK'] = f"{parts[1]}#{new_employee}"
+            new_item.update(ShiftRepo.key(date, new_employee, task_type))
+            new_item.update(ShiftRepo.index_keys(date, new_employee, task_type))
             new_item['created_at'] = datetime.now().isoformat()
             new_item['status'] = data.get('status', new_item.get('status', 'scheduled'))
-            # Overwrite/put new item and delete old
-            table.put_item(Item=new_item)
-            table.delete_item(Key={'PK': pk, 'SK': sk})
+            # Put the new item and delete the old one in a single transaction; the lock
+            # item of the target employee rejects the move if they already have a shift that day
+            try:
+                repo.write_changes([ShiftRepo.replace_change(item, new_item)])
+            except Exception as e:
+                if error_code(e) != 'TransactionCanceledException':
+                    raise
+                return {
+                    'statusCode': 400,
+                    'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                    'body': json.dumps({'error': 'Target employee already has a shift on this date'})
+                }
             return {
                 'statusCode': 200,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
@@ -261,7 +241,7 @@ def update_shift(event):
             }
         
         table.update_item(
-            Key={'PK': pk, 'SK': sk},
+            Key=key,
             UpdateExpression=update_expression,
             ExpressionAttributeValues=expression_values
         )
@@ -298,10 +278,12 @@ def delete_shift(event):
         employee_id = parts[2]
         task_type = parts[3]
         
-        pk = f"SHIFT#{date}"
-        sk = f"EMP#{employee_id}#{task_type}"
-        
-        table.delete_item(Key={'PK': pk, 'SK': sk})
+        if not ShiftRepo(table).delete_shift(date, employee_id, task_type):
+            return {
+                'statusCode': 404,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'error': 'Shift not found'})
+            }
         
         return {
             'statusCode': 200,
@@ -313,4 +295,169 @@ def delete_shift(event):
             'statusCode': 500,
             'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
             'body': json.dumps({'error': str(e)})
-        }
\ No newline at end of file
+        }
+
+
+def parse_shift_id(shift_id):
+    """shift_id（SHIFT#date#employee_id#task_type）を (date, employee_id, task_type) に分解する"""
+    parts = (shift_id or '').split('#')
+    if len(parts) < 4 or parts[0] != 'SHIFT':
+        raise ValueError(f'Invalid shift_id format: {shift_id}')
+    return parts[1], parts[2], '#'.join(parts[3:])
+
+
+def validate_date(date):
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid date: {date}')
+    return date
+
+
+def batch_dates(operation):
+    """操作が読み書きする日付"""
+    dates = set()
+    if operation.get('op') != 'create':
+        dates.add(parse_shift_id(operation.get('shift_id'))[0])
+    if 'date' in operation:
+        dates.add(validate_date(operation['date']))
+    return dates
+
+
+def plan_operation(operation, day_index):
+    """1件の操作を日別インデックスに適用し、(変更, 結果) を返す。不正な操作は ValueError"""
+    kind = operation.get('op')
+    if kind not in BATCH_OPERATIONS:
+        raise ValueError(f'Unknown op: {kind}')
+
+    old_item = None
+    if kind == 'create':
+        missing = [f for f in ('date', 'employee_id', 'task_type', 'start_time', 'end_time') if not operation.get(f)]
+        if missing:
+            raise ValueError(f"Missing fields: {', '.join(missing)}")
+        new_item = ShiftRepo.build_item(operation, status=operation.get('status', 'scheduled'))
+    else:
+        date, employee_id, task_type = parse_shift_id(operation.get('shift_id'))
+        old_item = day_index[date].get(f'EMP#{employee_id}#{task_type}')
+        if not old_item:
+            raise ValueError(f"Shift not found: {operation['shift_id']}")
+        new_item = None
+        if kind != 'delete':
+            new_date = operation.get('date', date)
+            new_employee = operation.get('employee_id', employee_id)
+            new_task = operation.get('task_type', task_type)
+            new_item = dict(old_item)
+            new_item.update(ShiftRepo.key(new_date, new_employee, new_task))
+            new_item.update(ShiftRepo.index_keys(new_date, new_employee, new_task))
+            for attribute in SHIFT_ATTRIBUTES:
+                if attribute in operation:
+                    new_item[attribute] = operation[attribute]
+            if new_item['SK'] != old_item['SK'] or new_item['PK'] != old_item['PK']:
+                new_item['created_at'] = datetime.now().isoformat()
+
+    if new_item:
+        new_date, new_employee, _ = ShiftRepo.parse_key(new_item)
+        for sk in day_index[new_date]:
+            if not sk.startswith(f'EMP#{new_employee}#'):
+                continue
+            if old_item and old_item['PK'] == new_item['PK'] and old_item['SK'] == sk:
+                continue
+            raise ValueError(f'Employee {new_employee} already has a shift on {new_date}')
+
+    if old_item:
+        del day_index[ShiftRepo.parse_key(old_item)[0]][old_item['SK']]
+    if new_item:
+        day_index[ShiftRepo.parse_key(new_item)[0]][new_item['SK']] = new_item
+
+    if old_item is None:
+        change = ShiftRepo.create_change(new_item)
+    elif new_item is None:
+        # 同じ日に同じ従業員の別のシフト（古い重複データ）が残るならロックはそのシフトのために残す
+        date, employee_id, _ = ShiftRepo.parse_key(old_item)
+        keep_lock = any(sk.startswith(f'EMP#{employee_id}#') for sk in day_index[date])
+        change = ShiftRepo.delete_change(old_item, keep_lock)
+    else:
+        change = ShiftRepo.replace_change(old_item, new_item)
+    result = {'op': kind, 'shift_id': None}
+    if new_item:
+        result['shift_id'] = 'SHIFT#{}#{}#{}'.format(*ShiftRepo.parse_key(new_item))
+    return change, result
+
+
+def batch_shifts(event):
+    """POST /shifts/batch
+
+    本文は {"operations": [...]}（配列だけでもよい）。各操作は
+    {"op": "create", "date", "employee_id", "task_type", "start_time", "end_time"} /
+    {"op": "update" | "move", "shift_id", 変更する項目} / {"op": "delete", "shift_id"}。
+    対象日のシフトを1回ずつ読んで日別インデックスを作り、操作を順に適用して1日1シフトを検証する。
+    1件でも不正な操作があれば何も書き込まずに 400 を返す。
+    書き込みは TransactWriteItems を100件ごとに分けて行い、途中で失敗した場合は書き込み済みの分を取り消す。
+    """
+    data = json.loads(event.get('body') or '{}')
+    operations = data.get('operations') if isinstance(data, dict) else data
+    if not isinstance(operations, list) or not operations:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': 'operations must be a non-empty list'})
+        }
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': f'Too many operations (max {MAX_BATCH_OPERATIONS})'})
+        }
+
+    errors = []
+    dates = set()
+    for index, operation in enumerate(operations):
+        try:
+            if not isinstance(operation, dict):
+                raise ValueError('Operation must be an object')
+            dates |= batch_dates(operation)
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+
+    changes = []
+    results = []
+    if not errors:
+        repo = ShiftRepo(table)
+        day_index = {date: {item['SK']: item for item in repo.list_by_date(date)} for date in sorted(dates)}
+        for index, operation in enumerate(operations):
+            try:
+                change, result = plan_operation(operation, day_index)
+            except ValueError as e:
+                errors.append({'index': index, 'error': str(e)})
+                continue
+            changes.append(change)
+            results.append(result)
+
+    if errors:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': 'Invalid operations', 'errors': errors}, ensure_ascii=False)
+        }
+
+    try:
+        transactions = repo.write_changes(changes)
+    except Exception as e:
+        if error_code(e) != 'TransactionCanceledException':
+            raise
+        return {
+            'statusCode': 409,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': 'Shifts were changed by another request; nothing was applied'})
+        }
+
+    return {
+        'statusCode': 200,
+        'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+        'body': json.dumps({
+            'message': 'Shifts updated successfully',
+            'applied': len(changes),
+            'transactions': transactions,
+            'results': results
+        })
+    }
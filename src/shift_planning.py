@@ -0,0 +1,227 @@
+"""月間シフトの計画モデル
+
+月の既存シフトを一度だけ読み込み、(日付, 従業員ID) をキーにしたメモリ上のインデックスを作る。
+重複チェックはこのインデックスに対して行い、書き込みは flush() でまとめて batch_writer に流す。
+これにより、割り当てごとのクエリ + put_item が、読み込み1回と 25 件単位のバッチ書き込みになる。
+
+上書き生成は差分で書き込む。clear() は自動生成のシフト（status=auto_assigned）を「置き換え候補」にするだけで、
+add() で同じ従業員・同じ日に同じ割り当てが来れば何も書かず、時間だけ違えば上書き、作業種別が違えば入れ替える。
+最後まで置き換えられなかった候補だけを flush() で削除する。手動のシフトは clear() でも残す。
+追加するシフトには1日1シフトのロックアイテム（ShiftRepo.lock_item）も一緒に書き、削除するシフトのロックも消す。
+
+月の読み込みは GSI3（GSI3PK=SHIFTMONTH#YYYY-MM, GSI3SK=日付#EMP#従業員ID#作業種別）への
+1回のページング付きクエリで行う。
+
+day_fingerprint は1日分の生成の入力（必要人数・従業員・休暇・その日のシフト）のハッシュで、
+上書き生成では前回から変わった日だけを作り直すのに使う（ShiftGenerationRepo に保存する）。
+"""
+import hashlib
+import json
+
+from common.repositories import ShiftRepo
+
+
+def day_fingerprint(demands, employees, absence_bits, shifts, solver):
+    """1日分の生成の入力のハッシュ
+
+    demands: その日の (task_type, start_time, end_time, count) のリスト
+    employees: 従業員のリスト（ID・スキル・1日の上限時間だけを使う）
+    absence_bits: その日の {従業員ID: 不在ビット}（0 の従業員は含めない）
+    shifts: その日のシフトのアイテム（手動のシフトや、前回の生成結果）
+    """
+    payload = {
+        'demands': sorted([task_type, start_time, end_time, int(count)]
+                          for task_type, start_time, end_time, count in demands if int(count) > 0),
+        'employees': sorted([employee['id'], sorted(employee.get('skills', [])),
+                             str(employee.get('max_hours_per_day', 8))] for employee in employees),
+        'absences': sorted(absence_bits.items()),
+        'shifts': sorted(list(ShiftRepo.parse_key(item)[1:]) + [item.get('start_time', ''), item.get('end_time', ''),
+                                                                 item.get('status', '')] for item in shifts),
+        'solver': solver
+    }
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:32]
+
+
+def month_fingerprint(items):
+    """月のシフトの状態のハッシュ（下書きの作成後に変更されていないかの確認用）"""
+    rows = sorted([item['PK'], item['SK'], item.get('start_time', ''), item.get('end_time', ''), item.get('status', '')]
+                  for item in items)
+    encoded = json.dumps(rows, separators=(',', ':'), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:32]
+
+
+def remaining_demands(demands, shifts):
+    """残す（手動の）シフトで埋まっている分を差し引いた必要人数
+
+    同じ作業種別・同じ時間帯の枠から、無ければ同じ作業種別の残りがある枠から1人ずつ引く。
+    """
+    counts = [int(count) for _, _, _, count in demands]
+    for item in shifts:
+        _, _, task_type = ShiftRepo.parse_key(item)
+        times = (item.get('start_time'), item.get('end_time'))
+        candidates = [index for index, (demand_task, start_time, end_time, _) in enumerate(demands)
+                      if demand_task == task_type and counts[index] > 0]
+        exact = [index for index in candidates if (demands[index][1], demands[index][2]) == times]
+        if exact or candidates:
+            counts[(exact or candidates)[0]] -= 1
+    return [(task_type, start_time, end_time, count)
+            for (task_type, start_time, end_time, _), count in zip(demands, counts) if count > 0]
+
+
+class MonthShiftPlan:
+    """1か月分のシフトを (日付, 従業員ID) で索引したメモリ上の計画"""
+
+    GENERATED_STATUS = 'auto_assigned'
+
+    def __init__(self, month, items=()):
+        self.month = month
+        self._index = {}
+        self._replaceable = {}  # (日付, 従業員ID) -> 置き換え候補の自動生成シフト
+        self._creates = []  # シフトの無かった (日付, 従業員ID) に作るシフト（ロックは条件つきで作る）
+        self._puts = []  # 置き換え候補のある (日付, 従業員ID) の新しいキーのシフト
+        self._updates = []  # 既存のキーで時間が変わるシフト
+        self._lock_puts = []
+        self._deletes = []
+        self._inserted = set()  # まだ保存されていないシフトのキー
+        self.conflicts = []  # flush() の時点で他の書き込みが同じ日に入っていて作れなかったシフト
+        items = list(items)
+        self.base_fingerprint = month_fingerprint(items)
+        for item in items:
+            date, employee_id, _ = ShiftRepo.parse_key(item)
+            self._index.setdefault((date, employee_id), []).append(item)
+
+    @classmethod
+    def load(cls, table, month):
+        """月の既存シフトを読み込んで計画を作る"""
+        return cls(month, ShiftRepo(table).list_by_month(month))
+
+    def has_shift(self, date, employee_id):
+        return (date, employee_id) in self._index
+
+    def busy_keys(self):
+        """既にシフトがある (日付, 従業員ID) の集合"""
+        return set(self._index)
+
+    def day_items(self, date):
+        """その日のシフト（追加予定を含む）"""
+        return [item for (day, _), items in self._index.items() if day == date for item in items]
+
+    def clear(self, days=None):
+        """自動生成のシフトを置き換え候補にする（上書き生成用）。days を指定した場合はその日だけ
+
+        手動のシフト（status が auto_assigned 以外）は残し、その従業員は引き続きその日に割り当てない。
+        """
+        def cleared(item):
+            return days is None or ShiftRepo.parse_key(item)[0] in days
+
+        days = set(days) if days is not None else None
+        # まだ書き込んでいない差分は取り消し、保存済みのシフトは置き換え候補に戻す
+        self._creates = [item for item in self._creates if not cleared(item)]
+        self._puts = [item for item in self._puts if not cleared(item)]
+        self._updates = [item for item in self._updates if not cleared(item)]
+        self._lock_puts = [item for item in self._lock_puts if not cleared(item)]
+        candidates = [item for item in self._deletes if cleared(item)]
+        self._deletes = [item for item in self._deletes if not cleared(item)]
+        for key in list(self._index):
+            if days is not None and key[0] not in days:
+                continue
+            items = self._index.pop(key)
+            kept = [item for item in items if item.get('status') != self.GENERATED_STATUS]
+            for item in items:
+                if item.get('status') != self.GENERATED_STATUS:
+                    continue
+                item_key = (item['PK'], item['SK'])
+                if item_key in self._inserted:
+                    self._inserted.discard(item_key)
+                else:
+                    candidates.append(item)
+            if kept:
+                self._index[key] = kept
+        for item in candidates:
+            date, employee_id, _ = ShiftRepo.parse_key(item)
+            self._replaceable.setdefault((date, employee_id), []).append(item)
+
+    def add(self, assignment, status=GENERATED_STATUS):
+        """割り当てを追加する。同じ日に既にシフトがある従業員なら False を返す
+
+        置き換え候補に同じ割り当てがあればそれを残し（書き込みなし）、違う場合だけ書き込む。
+        """
+        key = (assignment['date'], assignment['employee_id'])
+        if key in self._index:
+            return False
+        item = ShiftRepo.build_item(assignment, status)
+        candidates = self._replaceable.pop(key, [])
+        same_key = next((old for old in candidates
+                         if (old['PK'], old['SK']) == (item['PK'], item['SK'])), None)
+        others = [old for old in candidates if old is not same_key]
+        # ロックは (日付, 従業員ID) ごとなので消さずに使い回す。作業種別が変わるときだけ書き直す
+        self._deletes.extend(others)
+        if same_key is not None:
+            if all(same_key.get(field) == item[field] for field in ('start_time', 'end_time', 'status')):
+                item = same_key
+            else:
+                item = {**item, 'created_at': same_key.get('created_at', item['created_at'])}
+                self._updates.append(item)
+            if others:
+                self._lock_puts.append(ShiftRepo.lock_item(item))
+        elif others:
+            self._puts.append(item)
+            self._inserted.add((item['PK'], item['SK']))
+            self._lock_puts.append(ShiftRepo.lock_item(item))
+        else:
+            self._creates.append(item)
+            self._inserted.add((item['PK'], item['SK']))
+        self._index[key] = [item]
+        return True
+
+    def _stale(self):
+        return [item for items in self._replaceable.values() for item in items]
+
+    def pending_writes(self):
+        """flush() で書き込むシフトの件数（追加・更新・削除。ロックは含まない）"""
+        return len(self._deletes) + len(self._stale()) + len(self._creates) + len(self._puts) + len(self._updates)
+
+    def conflict_keys(self):
+        """直前の flush() で作れなかった (日付, 従業員ID)"""
+        return {ShiftRepo.parse_key(item)[:2] for item in self.conflicts}
+
+    def without_conflicts(self, shifts):
+        """直前の flush() で作れなかった (日付, 従業員ID) のシフトを除く"""
+        keys = self.conflict_keys()
+        return [shift for shift in shifts if (shift['date'], shift['employee_id']) not in keys]
+
+    def flush(self, table, extra_puts=()):
+        """溜まった差分をまとめて書き込む
+
+        置き換え・更新・削除は ShiftRepo.batch_write でまとめて書く。置き換えられなかった候補は削除し、
+        その日にシフトが残らない従業員のロックも消す。
+        extra_puts は同じバッチで書く他のアイテム（生成のフィンガープリントなど）。
+        シフトの無かった (日付, 従業員ID) へのシフトは ShiftRepo.create_all でロックが無い場合だけ作る。
+        読み込み後に同じ日のシフトが作られていた分は書かずに conflicts に入れ、計画からも外す。
+        """
+        stale = self._stale()
+        deletes = [{'PK': item['PK'], 'SK': item['SK']} for item in self._deletes + stale]
+        lock_keys = {}
+        for item in stale:
+            date, employee_id, _ = ShiftRepo.parse_key(item)
+            if (date, employee_id) not in self._index:
+                lock_keys[(date, employee_id)] = ShiftRepo.lock_key(date, employee_id)
+        deletes += list(lock_keys.values())
+        puts = self._puts + self._updates + self._lock_puts + list(extra_puts)
+        repo = ShiftRepo(table)
+        written = repo.batch_write(puts=puts, deletes=deletes)
+        conflicts = repo.create_all(self._creates)
+        written += 2 * (len(self._creates) - len(conflicts))
+        for item in conflicts:
+            date, employee_id, _ = ShiftRepo.parse_key(item)
+            self._index.pop((date, employee_id), None)
+        self.conflicts = conflicts
+        self._replaceable = {}
+        self._creates = []
+        self._deletes = []
+        self._puts = []
+        self._updates = []
+        self._lock_puts = []
+        self._inserted = set()
+        return written
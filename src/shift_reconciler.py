@@ -0,0 +1,106 @@
+"""重複シフトの整合ジョブ
+
+同じ日に同じ従業員のシフトが複数ある状態（1日1シフトの違反）を検出し、
+先頭の1件（SK順。GET /shifts/by-month が返すもの）を残して残りを削除し、
+1日1シフトのロックアイテムを残したシフトの作業種別に合わせる。
+
+定期実行の Lambda（lambda_handler）としても、scripts/reconcile_shifts.py から CLI としても実行できる。
+テーブルは並列セグメントでスキャンし、削除は batch_writer でまとめて行う。
+dry_run の場合は削除せずにレポートだけを返す。
+"""
+import json
+import os
+import calendar
+from datetime import datetime
+
+from common.dynamodb import get_table, scan_all
+from common.repositories import ShiftRepo
+
+table = get_table()
+
+DEFAULT_SEGMENTS = int(os.environ.get('RECONCILE_SEGMENTS', '4'))
+
+
+def lambda_handler(event, context):
+    """定期実行用ハンドラー
+
+    event で start_date / end_date / dry_run / segments を指定できる。
+    期間の指定がなければ当月1日から翌月末日までを対象にする。
+    """
+    event = event or {}
+    default_start, default_end = default_date_range()
+    report = reconcile_duplicates(
+        event.get('start_date', default_start),
+        event.get('end_date', default_end),
+        dry_run=bool(event.get('dry_run', False)),
+        segments=int(event.get('segments', DEFAULT_SEGMENTS))
+    )
+    print(json.dumps({k: v for k, v in report.items() if k != 'groups'}))
+    return report
+
+
+def default_date_range(today=None):
+    """当月1日から翌月末日まで"""
+    today = today or datetime.now()
+    start = f"{today.year}-{today.month:02d}-01"
+    year, month = (today.year + 1, 1) if today.month == 12 else (today.year, today.month + 1)
+    end = f"{year}-{month:02d}-{calendar.monthrange(year, month)[1]:02d}"
+    return start, end
+
+
+def scan_shift_items(start_date, end_date, segments=DEFAULT_SEGMENTS):
+    """期間内の SHIFT# アイテムを並列セグメントスキャンで取得"""
+    return scan_all(
+        table,
+        segments=segments,
+        FilterExpression='PK BETWEEN :start AND :end',
+        ExpressionAttributeValues={
+            ':start': f'SHIFT#{start_date}',
+            ':end': f'SHIFT#{end_date}'
+        }
+    )
+
+
+def find_duplicates(items):
+    """(日付, 従業員ID) ごとに2件目以降のアイテムをまとめる
+
+    戻り値は {'date', 'employee_id', 'kept', 'removed'} のリスト（日付・従業員順）。
+    """
+    groups = {}
+    for item in items:
+        date, employee_id, _ = ShiftRepo.parse_key(item)
+        groups.setdefault((date, employee_id), []).append(item)
+
+    duplicates = []
+    for (date, employee_id), group in sorted(groups.items()):
+        if len(group) < 2:
+            continue
+        group.sort(key=lambda item: item['SK'])
+        duplicates.append({
+            'date': date,
+            'employee_id': employee_id,
+            'kept': group[0]['SK'],
+            'removed': [{'PK': item['PK'], 'SK': item['SK']} for item in group[1:]]
+        })
+    return duplicates
+
+
+def reconcile_duplicates(start_date, end_date, dry_run=True, segments=DEFAULT_SEGMENTS):
+    """期間内の重複シフトを検出し、dry_run でなければ削除する"""
+    items = scan_shift_items(start_date, end_date, segments)
+    duplicates = find_duplicates(items)
+    removed = [key for group in duplicates for key in group['removed']]
+
+    if removed and not dry_run:
+        locks = [ShiftRepo.lock_item({'PK': f"SHIFT#{group['date']}", 'SK': group['kept']}) for group in duplicates]
+        ShiftRepo(table).batch_write(puts=locks, deletes=removed)
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'dry_run': dry_run,
+        'scanned': len(items),
+        'duplicate_groups': len(duplicates),
+        'deleted': 0 if dry_run else len(removed),
+        'groups': duplicates
+    }
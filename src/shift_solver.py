@@ -0,0 +1,284 @@
+"""月間シフト最適化ソルバー
+
+従業員×日×作業スロットのメモリ上の行列を組み立て、1か月分の割り当てを一度に解く。
+
+制約:
+- カバレッジ: 各日の各スロットに必要人数を割り当てる（不足分は unfilled として返す）
+- 1日1シフト: 同じ従業員は同じ日に1つのシフトまで
+- スキル: 作業種別のスキルを持つ従業員のみ割り当て可能
+- 休暇: 承認済みの休暇（午前休・午後休を含む）と重なるスロットには割り当てない
+- max_hours_per_day: スロットの勤務時間が上限を超える従業員には割り当てない
+- 公平性: 月内の担当回数（全体・作業種別ごと）に凸コストを課し、同じ人に偏らないようにする
+
+ソルバーは SOLVERS に名前で登録されており、リクエストまたは環境変数 SHIFT_SOLVER で切り替えられる。
+"""
+import os
+from collections import deque
+
+import intervals
+
+# 公平性コストの重み（全体の担当回数 / 作業種別ごとの担当回数）
+LOAD_WEIGHT = 4
+TASK_WEIGHT = 1
+
+DEFAULT_SOLVER = os.environ.get('SHIFT_SOLVER', 'mincost')
+
+_INF = float('inf')
+
+
+def slot_minutes(start_time, end_time):
+    """スロットの勤務時間（分）。終了が開始以前なら日跨ぎとして扱う"""
+    return intervals.duration(start_time, end_time)
+
+
+def build_problem(days, demands, employees, unavailable=None, absences=None, prior=None):
+    """ソルバー共通の入力を組み立てる
+
+    days: 日付文字列のリスト
+    demands: days と同じ長さのリスト。各要素は (task_type, start_time, end_time, count) のリスト
+    employees: {'id', 'skills', 'max_hours_per_day'} のリスト
+    unavailable: 割り当て不可の (date, employee_id) の集合（既存シフトなど）
+    absences: blocks(employee_id, date, start_time, end_time) を持つ休暇情報（absence.AbsenceMap）
+    prior: 解かない日に既にある割り当て（{'employee_id', 'task_type'} のリスト）。公平性の担当回数に含める
+
+    スロットの種類（作業種別と時間帯）ごとに割り当て可能な従業員を一度だけ計算し、
+    日ごとの判定は集合の参照だけで済むようにする。
+    """
+    unavailable = unavailable or set()
+    slot_kinds = {}
+    eligible = []
+    day_slots = []
+
+    for day_demands in demands:
+        slots = []
+        for task_type, start_time, end_time, count in day_demands:
+            if count <= 0:
+                continue
+            kind = (task_type, start_time, end_time)
+            if kind not in slot_kinds:
+                slot_kinds[kind] = len(eligible)
+                max_minutes = slot_minutes(start_time, end_time)
+                eligible.append([
+                    index for index, employee in enumerate(employees)
+                    if task_type in employee.get('skills', [])
+                    and float(employee.get('max_hours_per_day', 8)) * 60 >= max_minutes
+                ])
+            slots.append((slot_kinds[kind], task_type, start_time, end_time, int(count)))
+        day_slots.append(slots)
+
+    available = []
+    for date in days:
+        available.append([
+            (date, employee['id']) not in unavailable for employee in employees
+        ])
+
+    # 休暇と重なる (日, スロットの種類, 従業員) の組
+    blocked = set()
+    if absences:
+        for day_index, date in enumerate(days):
+            for kind, task_type, start_time, end_time, count in day_slots[day_index]:
+                for employee_index in eligible[kind]:
+                    if absences.blocks(employees[employee_index]['id'], date, start_time, end_time):
+                        blocked.add((day_index, kind, employee_index))
+
+    employee_indexes = {employee['id']: index for index, employee in enumerate(employees)}
+    prior_load = [0] * len(employees)
+    prior_task_load = [dict() for _ in employees]
+    for shift in prior or ():
+        index = employee_indexes.get(shift['employee_id'])
+        if index is None:
+            continue
+        prior_load[index] += 1
+        prior_task_load[index][shift['task_type']] = prior_task_load[index].get(shift['task_type'], 0) + 1
+
+    return {
+        'days': list(days),
+        'employees': employees,
+        'day_slots': day_slots,
+        'eligible': eligible,
+        'available': available,
+        'blocked': blocked,
+        'prior_load': prior_load,
+        'prior_task_load': prior_task_load
+    }
+
+
+def solve_greedy(problem):
+    """従来の貪欲法（スキルを持つ先頭の従業員から順に割り当てる）"""
+    assignments = []
+    unfilled = []
+    employees = problem['employees']
+
+    for day_index, date in enumerate(problem['days']):
+        assigned_today = set()
+        for kind, task_type, start_time, end_time, count in problem['day_slots'][day_index]:
+            filled = 0
+            for employee_index in problem['eligible'][kind]:
+                if filled >= count:
+                    break
+                if employee_index in assigned_today or not problem['available'][day_index][employee_index]:
+                    continue
+                if (day_index, kind, employee_index) in problem['blocked']:
+                    continue
+                assigned_today.add(employee_index)
+                assignments.append(_make_shift(date, employees[employee_index], task_type, start_time, end_time))
+                filled += 1
+            if filled < count:
+                unfilled.append(_make_unfilled(date, task_type, start_time, end_time, count - filled))
+
+    return {'assignments': assignments, 'unfilled': unfilled}
+
+
+def solve_min_cost_flow(problem):
+    """最小費用流による割り当て
+
+    日ごとに「スロット → 従業員」の二部グラフを作り、最小費用最大流で解く。
+    従業員ノードの容量を1にすることで1日1シフトを保証し、
+    辺のコストに月内の担当回数に応じた凸コストを載せることで、月全体で負荷を平準化する。
+    """
+    assignments = []
+    unfilled = []
+    employees = problem['employees']
+    employee_count = len(employees)
+    load = list(problem['prior_load'])
+    task_load = [dict(counts) for counts in problem['prior_task_load']]
+
+    for day_index, date in enumerate(problem['days']):
+        slots = problem['day_slots'][day_index]
+        if not slots:
+            continue
+        available = problem['available'][day_index]
+
+        # ノード: 0=始点, 1..S=スロット, S+1..S+E=従業員, S+E+1=終点
+        slot_count = len(slots)
+        sink = slot_count + employee_count + 1
+        edges = []
+        slot_employee_edges = []
+        used_employees = set()
+
+        for slot_index, (kind, task_type, start_time, end_time, count) in enumerate(slots):
+            edges.append((0, 1 + slot_index, count, 0))
+            for employee_index in problem['eligible'][kind]:
+                if not available[employee_index] or (day_index, kind, employee_index) in problem['blocked']:
+                    continue
+                cost = (
+                    LOAD_WEIGHT * (2 * load[employee_index] + 1)
+                    + TASK_WEIGHT * (2 * task_load[employee_index].get(task_type, 0) + 1)
+                ) * employee_count
+                # 同点時に毎日同じ人が選ばれないよう、日ごとにずらした小さな係数を加える
+                cost += (employee_index + day_index) % employee_count
+                slot_employee_edges.append((len(edges), slot_index, employee_index))
+                edges.append((1 + slot_index, 1 + slot_count + employee_index, 1, cost))
+                used_employees.add(employee_index)
+
+        for employee_index in used_employees:
+            edges.append((1 + slot_count + employee_index, sink, 1, 0))
+
+        flows = _min_cost_flow(sink + 1, edges, 0, sink)
+
+        filled = [0] * slot_count
+        for edge_index, slot_index, employee_index in slot_employee_edges:
+            if flows[edge_index] <= 0:
+                continue
+            kind, task_type, start_time, end_time, count = slots[slot_index]
+            filled[slot_index] += 1
+            load[employee_index] += 1
+            task_load[employee_index][task_type] = task_load[employee_index].get(task_type, 0) + 1
+            assignments.append(_make_shift(date, employees[employee_index], task_type, start_time, end_time))
+
+        for slot_index, (kind, task_type, start_time, end_time, count) in enumerate(slots):
+            if filled[slot_index] < count:
+                unfilled.append(_make_unfilled(date, task_type, start_time, end_time, count - filled[slot_index]))
+
+    return {'assignments': assignments, 'unfilled': unfilled}
+
+
+SOLVERS = {
+    'greedy': solve_greedy,
+    'mincost': solve_min_cost_flow
+}
+
+
+def solve_month(days, demands, employees, unavailable=None, solver=None, absences=None, prior=None):
+    """1か月分（または days に指定した日だけ）のシフトを解く
+
+    戻り値は {'assignments': [...], 'unfilled': [...]}。
+    未登録のソルバー名を指定した場合は ValueError を送出する。
+    """
+    name = solver or DEFAULT_SOLVER
+    if name not in SOLVERS:
+        raise ValueError(f'Unknown solver: {name}')
+    problem = build_problem(days, demands, employees, unavailable, absences, prior)
+    return SOLVERS[name](problem)
+
+
+def _make_shift(date, employee, task_type, start_time, end_time):
+    return {
+        'date': date,
+        'employee_id': employee['id'],
+        'task_type': task_type,
+        'start_time': start_time,
+        'end_time': end_time
+    }
+
+
+def _make_unfilled(date, task_type, start_time, end_time, missing):
+    return {
+        'date': date,
+        'task_type': task_type,
+        'start_time': start_time,
+        'end_time': end_time,
+        'missing': missing
+    }
+
+
+def _min_cost_flow(node_count, edges, source, sink):
+    """逐次最短路法（SPFA）による最小費用最大流
+
+    edges は (from, to, capacity, cost) のリスト。各辺に流れた量を同じ順序で返す。
+    """
+    graph = [[] for _ in range(node_count)]
+    handles = []
+    for u, v, capacity, cost in edges:
+        graph[u].append([v, capacity, cost, len(graph[v])])
+        graph[v].append([u, 0, -cost, len(graph[u]) - 1])
+        handles.append((u, len(graph[u]) - 1, capacity))
+
+    while True:
+        dist = [_INF] * node_count
+        in_queue = [False] * node_count
+        prev_node = [-1] * node_count
+        prev_edge = [-1] * node_count
+        dist[source] = 0
+        queue = deque([source])
+        while queue:
+            u = queue.popleft()
+            in_queue[u] = False
+            du = dist[u]
+            for index, edge in enumerate(graph[u]):
+                v = edge[0]
+                if edge[1] > 0 and du + edge[2] < dist[v]:
+                    dist[v] = du + edge[2]
+                    prev_node[v] = u
+                    prev_edge[v] = index
+                    if not in_queue[v]:
+                        in_queue[v] = True
+                        queue.append(v)
+
+        if dist[sink] == _INF:
+            break
+
+        amount = _INF
+        v = sink
+        while v != source:
+            amount = min(amount, graph[prev_node[v]][prev_edge[v]][1])
+            v = prev_node[v]
+
+        v = sink
+        while v != source:
+            edge = graph[prev_node[v]][prev_edge[v]]
+            edge[1] -= amount
+            graph[v][edge[3]][1] += amount
+            v = prev_node[v]
+
+    return [capacity - graph[u][index][1] for u, index, capacity in handles]
@@ -1,21 +1,16 @@
 import json
-import boto3
-import os
 from decimal import Decimal
 
-# Support local dynamodb endpoint
-_dynamodb_endpoint = os.environ.get('DYNAMODB_ENDPOINT')
-if _dynamodb_endpoint:
-    dynamodb = boto3.resource('dynamodb', endpoint_url=_dynamodb_endpoint)
-else:
-    dynamodb = boto3.resource('dynamodb')
+from common.dynamodb import get_table
+from common.repositories import TaskRepo
+from common.responses import conditional_get, decode_request
 
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+table = get_table()
 
 def get_cors_headers():
     return {
         'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token',
+        'Access-Control-Allow-Headers': 'Content-Type,X-Amz-Date,Authorization,X-Api-Key,X-Amz-Security-Token,If-None-Match',
         'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
     }
 
@@ -26,6 +21,7 @@ def decimal_default(obj):
     raise TypeError
 
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         method = event['httpMethod']
         path = event.get('path', '')
@@ -41,10 +37,10 @@ def lambda_handler(event, context):
             if '/tasks/' in path:
                 # 個別作業種別取得
                 task_id = path.split('/')[-1]
-                return get_task(task_id)
+                return conditional_get(event, get_task(task_id), 'tasks')
             else:
                 # 作業種別一覧取得
-                return get_tasks()
+                return conditional_get(event, get_tasks(), 'tasks')
         elif method == 'POST':
             return create_task(json.loads(event['body']))
         elif method == 'PUT':
@@ -68,14 +64,9 @@ def lambda_handler(event, context):
         }
 
 def get_tasks():
-    """作業種別一覧を取得"""
-    response = table.scan(
-        FilterExpression='begins_with(PK, :pk)',
-        ExpressionAttributeValues={':pk': 'TASK#'}
-    )
-    
+    """作業種別一覧を取得（作業カタログの GSI1 を1回クエリする）"""
     tasks = []
-    for item in response['Items']:
+    for item in TaskRepo(table).list_all():
         if item['SK'] == 'CONFIG':
             # デバッグ用ログ
             print(f"Processing item: {item}")
@@ -115,21 +106,15 @@ def get_tasks():
 def get_task(task_id):
     """個別作業種別を取得"""
     try:
-        response = table.get_item(
-            Key={
-                'PK': f'TASK#{task_id}',
-                'SK': 'CONFIG'
-            }
-        )
+        item = TaskRepo(table).get_task(task_id)
         
-        if 'Item' not in response:
+        if not item:
             return {
                 'statusCode': 404,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
                 'body': json.dumps({'error': 'Task not found'})
             }
         
-        item = response['Item']
         task = {
             'task_type': item.get('task_type', task_id),
             'name': item['name'],
@@ -164,8 +149,7 @@ def create_task(data):
         task_type = data['task_type']
         
         item = {
-            'PK': f'TASK#{task_type}',
-            'SK': 'CONFIG',
+            **TaskRepo.key(task_type),
             'task_type': task_type,
             'name': data['name'],
             'description': data.get('description', ''),
@@ -182,7 +166,7 @@ def create_task(data):
             'updated_at': data.get('updated_at', '')
         }
         
-        table.put_item(Item=item)
+        TaskRepo(table).put(item)
         
         return {
             'statusCode': 201,
@@ -201,14 +185,9 @@ def update_task(task_id, data):
     """作業種別を更新"""
     try:
         # 既存データを取得
-        response = table.get_item(
-            Key={
-                'PK': f'TASK#{task_id}',
-                'SK': 'CONFIG'
-            }
-        )
+        item = TaskRepo(table).get_task(task_id)
         
-        if 'Item' not in response:
+        if not item:
             return {
                 'statusCode': 404,
                 'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
@@ -216,7 +195,6 @@ def update_task(task_id, data):
             }
         
         # 既存データとマージ
-        item = response['Item']
         item.update({
             'name': data.get('name', item.get('name')),
             'description': data.get('description', item.get('description', '')),
@@ -231,7 +209,7 @@ def update_task(task_id, data):
             'afternoon_end_time': data.get('afternoon_end_time', item.get('afternoon_end_time', ''))
         })
         
-        table.put_item(Item=item)
+        TaskRepo(table).put(item)
         
         return {
             'statusCode': 200,
@@ -249,12 +227,7 @@ def update_task(task_id, data):
 def delete_task(task_id):
     """作業種別を削除"""
     try:
-        table.delete_item(
-            Key={
-                'PK': f'TASK#{task_id}',
-                'SK': 'CONFIG'
-            }
-        )
+        TaskRepo(table).delete_task(task_id)
         
         return {
             'statusCode': 200,
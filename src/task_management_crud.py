@@ -1,10 +1,11 @@
 import json
-import boto3
-import os
 from decimal import Decimal
 
-dynamodb = boto3.resource('dynamodb')
-table = dynamodb.Table(os.environ['TABLE_NAME'])
+from common.dynamodb import get_table
+from common.repositories import TaskRepo
+from common.responses import decode_request
+
+table = get_table()
 
 def decimal_default(obj):
     """JSON serialization for Decimal objects"""
@@ -13,6 +14,7 @@ def decimal_default(obj):
     raise TypeError
 
 def lambda_handler(event, context):
+    event = decode_request(event)
     try:
         http_method = event['httpMethod']
         path = event['path']
@@ -45,14 +47,9 @@ def lambda_handler(event, context):
 
 def get_all_tasks():
     try:
-        # 新しいデータ構造に対応: TASK#で始まるPKをスキャン
-        response = table.scan(
-            FilterExpression='begins_with(PK, :pk)',
-            ExpressionAttributeValues={':pk': 'TASK#'}
-        )
-        
+        # 作業カタログ（疎な GSI1）から1回のクエリで取得
         tasks = []
-        for item in response['Items']:
+        for item in TaskRepo(table).list_all():
             if item['SK'] == 'CONFIG':
                 task = {
                     'task_type': item.get('task_type', item['PK'].split('#')[1]),
@@ -98,8 +95,7 @@ def create_task(event):
             }
         
         item = {
-            'PK': f'TASK#{task_type}',
-            'SK': 'CONFIG',
+            **TaskRepo.key(task_type),
             'task_type': task_type,
             'name': data['name'],
             'description': data.get('description', ''),
@@ -114,7 +110,7 @@ def create_task(event):
             'afternoon_end_time': data.get('afternoon_end_time', '')
         }
         
-        table.put_item(Item=item)
+        TaskRepo(table).put(item)
         
         return {
             'statusCode': 201,
@@ -130,18 +126,15 @@ def create_task(event):
 
 def get_task(task_type):
     try:
-        response = table.get_item(
-            Key={'PK': f'TASK#{task_type}', 'SK': 'CONFIG'}
-        )
+        item = TaskRepo(table).get_task(task_type)
         
-        if 'Item' not in response:
+        if not item:
             return {
                 'statusCode': 404,
                 'headers': {'Content-Type': 'application/json'},
                 'body': json.dumps({'error': '作業種別が見つかりません'})
             }
         
-        item = response['Item']
         task = {
             'task_type': item.get('task_type', task_type),
             'name': item.get('name', ''),
@@ -174,18 +167,15 @@ def update_task(task_type, event):
         data = json.loads(event['body'])
         
         # 既存データを取得してマージ
-        response = table.get_item(
-            Key={'PK': f'TASK#{task_type}', 'SK': 'CONFIG'}
-        )
+        item = TaskRepo(table).get_task(task_type)
         
-        if 'Item' not in response:
+        if not item:
             return {
                 'statusCode': 404,
                 'headers': {'Content-Type': 'application/json'},
                 'body': json.dumps({'error': '作業種別が見つかりません'})
             }
         
-        item = response['Item']
         item.update({
             'name': data.get('name', item.get('name')),
             'description': data.get('description', item.get('description', '')),
@@ -200,7 +190,7 @@ def update_task(task_type, event):
             'afternoon_end_time': data.get('afternoon_end_time', item.get('afternoon_end_time', ''))
         })
         
-        table.put_item(Item=item)
+        TaskRepo(table).put(item)
         
         return {
             'statusCode': 200,
@@ -216,9 +206,7 @@ def update_task(task_type, event):
 
 def delete_task(task_type):
     try:
-        table.delete_item(
-            Key={'PK': f'TASK#{task_type}', 'SK': 'CONFIG'}
-        )
+        TaskRepo(table).delete_task(task_type)
         
         return {
             'statusCode': 200,
@@ -0,0 +1,172 @@
+"""作業カタログから作る作業時間帯（スロット）の表
+
+作業設定（PK=TASK#作業種別, SK=CONFIG）の morning_* / afternoon_*（無ければ recommended_*）の時間を
+スロットとして読み、分単位の区間と勤務時間を前計算した変更不可の表にまとめる。
+日別の自動割り当て（POST /shifts/assign）と月間生成の両方がこの表を使う。
+
+カタログは TaskRepo の参照キャッシュから読み、同じ内容なら前回コンパイルした表をそのまま返す。
+作業種別を追加・変更すればキャッシュのバージョンが上がり、次の呼び出しで表が作り直される。
+カタログに時間の無い作業種別は DEFAULT_SLOTS を使う。
+"""
+import threading
+from types import MappingProxyType
+from typing import NamedTuple
+
+import intervals
+from common.repositories import TaskRepo
+
+# カタログに時間が無い場合の作業時間帯（午前, 午後）
+DEFAULT_SLOTS = {
+    'milking': [('05:00', '07:00'), ('17:00', '19:00')],
+    'feeding': [('08:00', '09:00'), ('16:00', '17:00')],
+    'cleaning': [('10:00', '11:30'), ('14:00', '16:00')],
+    'patrol': [('14:00', '14:30'), ('20:00', '21:00')]
+}
+
+# 作業種別の新旧IDマッピング（フロントエンドと同じ対応）
+TASK_ID_ALIASES = {
+    '1': 'milking',
+    '2': 'feeding',
+    '3': 'cleaning',
+    '4': 'patrol'
+}
+
+HALVES = ('morning', 'afternoon')
+
+# 作業種別も時間帯も分からない場合の時間
+FALLBACK_SLOT = ('09:00', '17:00')
+
+
+class Slot(NamedTuple):
+    start_time: str
+    end_time: str
+    start: int  # 0時からの分
+    end: int  # 日跨ぎなら 1440 を超える
+    minutes: int
+    half: str = None  # 'morning' | 'afternoon' | None
+
+
+def make_slot(start_time, end_time, half=None):
+    start, end = intervals.parse(start_time, end_time)
+    return Slot(start_time, end_time, start, end, end - start, half)
+
+
+class SlotTable:
+    """作業種別 → スロットのタプル（変更不可）"""
+
+    def __init__(self, slots_by_task):
+        self._slots = MappingProxyType({task_type: tuple(slots) for task_type, slots in slots_by_task.items()})
+
+    def __contains__(self, task_type):
+        return task_type in self._slots
+
+    def task_types(self):
+        return list(self._slots)
+
+    def slots(self, task_type):
+        return self._slots.get(task_type, ())
+
+    def times(self, task_type, default=None):
+        """(開始, 終了) のリスト。スロットが無ければ default"""
+        slots = self._slots.get(task_type)
+        if not slots:
+            return list(default or [])
+        return [(slot.start_time, slot.end_time) for slot in slots]
+
+    def first(self, task_type):
+        slots = self._slots.get(task_type)
+        return slots[0] if slots else None
+
+    def for_half(self, task_type, half):
+        """午前/午後のスロット。ラベルが無ければ定義順（午前が先）で選ぶ"""
+        slots = self._slots.get(task_type, ())
+        for slot in slots:
+            if slot.half == half:
+                return slot
+        index = HALVES.index(half)
+        if index < len(slots) and slots[index].half is None:
+            return slots[index]
+        return None
+
+    def half_of(self, task_type, start_time, end_time):
+        """時間帯の午前/午後（shift_type）。ラベルの無いスロットは開始時刻が12時より前なら午前"""
+        for slot in self._slots.get(task_type, ()):
+            if slot.half and (slot.start_time, slot.end_time) == (start_time, end_time):
+                return slot.half
+        return HALVES[0] if intervals.to_minutes(start_time) < 12 * 60 else HALVES[1]
+
+
+def catalog_slots(item):
+    """作業設定1件のスロット。時間が無ければ空のリスト"""
+    slots = []
+    for half in HALVES:
+        start_time, end_time = item.get(f'{half}_start_time'), item.get(f'{half}_end_time')
+        if start_time and end_time:
+            slots.append(make_slot(start_time, end_time, half))
+    if not slots and item.get('recommended_start_time') and item.get('recommended_end_time'):
+        slots.append(make_slot(item['recommended_start_time'], item['recommended_end_time']))
+    return slots
+
+
+def compile_slots(items=()):
+    """作業カタログのアイテムから SlotTable を作る
+
+    新旧どちらの作業種別IDでも引けるよう別名も登録する（カタログの時間が既定より優先）。
+    時刻の形式が不正な作業設定は既定のスロットを使う。
+    """
+    slots_by_task = {
+        task_type: [make_slot(start_time, end_time, half) for (start_time, end_time), half in zip(times, HALVES)]
+        for task_type, times in DEFAULT_SLOTS.items()
+    }
+    from_catalog = set()
+    for item in items:
+        task_type = str(item.get('task_type') or item['PK'].split('#', 1)[1])
+        try:
+            slots = catalog_slots(item)
+        except ValueError as e:
+            print(f"Invalid slot times for task {task_type}: {str(e)}")
+            continue
+        if slots:
+            slots_by_task[task_type] = slots
+            from_catalog.add(task_type)
+
+    for task_id, legacy_name in TASK_ID_ALIASES.items():
+        if task_id in from_catalog and legacy_name not in from_catalog:
+            slots_by_task[legacy_name] = slots_by_task[task_id]
+        elif task_id not in from_catalog and legacy_name in slots_by_task:
+            slots_by_task[task_id] = slots_by_task[legacy_name]
+    return SlotTable(slots_by_task)
+
+
+DEFAULT_TABLE = compile_slots()
+
+_compiled = {}
+_lock = threading.Lock()
+
+
+def _fingerprint(items):
+    fields = ('task_type', 'morning_start_time', 'morning_end_time', 'afternoon_start_time',
+              'afternoon_end_time', 'recommended_start_time', 'recommended_end_time')
+    return tuple(sorted(
+        (item.get('PK', ''),) + tuple(str(item.get(field) or '') for field in fields) for item in items
+    ))
+
+
+def load(table):
+    """作業カタログから SlotTable を読み込む（内容が同じなら前回の表を返す）
+
+    カタログを読めない場合は既定のスロットを使う。
+    """
+    try:
+        items = TaskRepo(table).list_all()
+    except Exception as e:
+        print(f"Error loading task catalog for slots: {str(e)}")
+        return DEFAULT_TABLE
+    fingerprint = _fingerprint(items)
+    with _lock:
+        slot_table = _compiled.get(fingerprint)
+        if slot_table is None:
+            # カタログが変わったら古い表は不要
+            _compiled.clear()
+            slot_table = _compiled[fingerprint] = compile_slots(items)
+    return slot_table
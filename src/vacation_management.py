@@ -1,13 +1,16 @@
 import json
-import boto3
 import os
 from datetime import datetime
 from decimal import Decimal
 
-# DynamoDBクライアント
-dynamodb = boto3.resource('dynamodb')
+from common.dynamodb import get_table, error_code
+from common.repositories import VacationRepo, VacationLedgerRepo
+from common.pagination import page_request, page_body
+from common.responses import decode_request
+
+# DynamoDBテーブル
 table_name = os.environ.get('TABLE_NAME', 'DairyShiftManagement')
-table = dynamodb.Table(table_name)
+table = get_table(table_name)
 
 def get_cors_headers():
     return {
@@ -26,6 +29,7 @@ def lambda_handler(event, context):
     """
     休暇申請管理のメインハンドラー
     """
+    event = decode_request(event)
     print(f"Event: {json.dumps(event)}")
     
     http_method = event.get('httpMethod', '')
@@ -43,10 +47,24 @@ def lambda_handler(event, context):
             # 休暇申請一覧取得
             query_params = event.get('queryStringParameters') or {}
             employee_id = query_params.get('employee_id')
+            try:
+                paging = page_request(event)
+            except ValueError as e:
+                return {
+                    'statusCode': 400,
+                    'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                    'body': json.dumps({'error': str(e)})
+                }
+            if query_params.get('from') or query_params.get('to'):
+                return get_vacation_requests_in_range(
+                    query_params.get('from') or query_params.get('to'),
+                    query_params.get('to') or query_params.get('from'),
+                    query_params.get('status')
+                )
             if employee_id:
-                return get_vacation_requests_by_employee(employee_id)
+                return get_vacation_requests_by_employee(employee_id, paging)
             else:
-                return get_all_vacation_requests()
+                return get_all_vacation_requests(paging)
         
         elif http_method == 'POST' and '/vacation-requests' in path:
             # 休暇申請作成
@@ -77,31 +95,21 @@ def lambda_handler(event, context):
             'body': json.dumps({'error': str(e)})
         }
 
-def get_all_vacation_requests():
-    """全ての休暇申請を取得"""
+def get_all_vacation_requests(paging=None):
+    """全ての休暇申請を取得（paging=(limit, cursor) 指定時は開始日順の1ページ分）"""
     try:
-        response = table.query(
-            IndexName='GSI1',
-            KeyConditionExpression='GSI1PK = :gsi1pk',
-            ExpressionAttributeValues={':gsi1pk': 'VACATION_REQUEST'}
-        )
-        
-        items = response.get('Items', [])
-        
-        # 各itemにrequest_idを確実に設定
-        for item in items:
-            if 'request_id' not in item:
-                # PKとSKからrequest_idを生成（_区切り）
-                pk = item.get('PK', '')
-                sk = item.get('SK', '')
-                employee_id = pk.replace('EMPLOYEE#', '')
-                timestamp = sk.replace('VACATION#', '')
-                item['request_id'] = f'{employee_id}_{timestamp}'
+        # request_id のない古いアイテムには PK/SK から補う
+        repo = VacationRepo(table)
+        if paging:
+            items, next_cursor = repo.page_all(*paging)
+            body = page_body(items, next_cursor)
+        else:
+            body = repo.list_all()
         
         return {
             'statusCode': 200,
             'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-            'body': json.dumps(items, cls=DecimalEncoder)
+            'body': json.dumps(body, cls=DecimalEncoder)
         }
     except Exception as e:
         print(f"Error in get_all_vacation_requests: {str(e)}")
@@ -111,34 +119,23 @@ def get_all_vacation_requests():
             'body': json.dumps({'error': str(e)})
         }
 
-def get_vacation_requests_by_employee(employee_id):
-    """特定従業員の休暇申請を取得"""
+def get_vacation_requests_by_employee(employee_id, paging=None):
+    """特定従業員の休暇申請を取得（paging=(limit, cursor) 指定時は新しい申請順の1ページ分）"""
     try:
-        response = table.query(
-            KeyConditionExpression='PK = :pk AND begins_with(SK, :sk_prefix)',
-            ExpressionAttributeValues={
-                ':pk': f'EMPLOYEE#{employee_id}',
-                ':sk_prefix': 'VACATION#'
-            }
-        )
-        
-        items = response.get('Items', [])
-        
-        # 各itemにrequest_idを確実に設定
-        for item in items:
-            if 'request_id' not in item:
-                # SKからタイムスタンプを抽出してrequest_idを生成（_区切り）
-                sk = item.get('SK', '')
-                timestamp = sk.replace('VACATION#', '')
-                item['request_id'] = f'{employee_id}_{timestamp}'
-        
-        # 日付でソート（降順）
-        items.sort(key=lambda x: x.get('start_date', ''), reverse=True)
+        # request_id のない古いアイテムには SK から補う
+        repo = VacationRepo(table)
+        if paging:
+            items, next_cursor = repo.page_by_employee(employee_id, *paging)
+            body = page_body(items, next_cursor)
+        else:
+            body = repo.list_by_employee(employee_id)
+            # 日付でソート（降順）
+            body.sort(key=lambda x: x.get('start_date', ''), reverse=True)
         
         return {
             'statusCode': 200,
             'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
-            'body': json.dumps(items, cls=DecimalEncoder)
+            'body': json.dumps(body, cls=DecimalEncoder)
         }
     except Exception as e:
         print(f"Error in get_vacation_requests_by_employee: {str(e)}")
@@ -148,6 +145,34 @@ def get_vacation_requests_by_employee(employee_id):
             'body': json.dumps({'error': str(e)})
         }
 
+def get_vacation_requests_in_range(date_from, date_to, status=None):
+    """期間と重なる休暇申請を取得（?from=YYYY-MM-DD&to=YYYY-MM-DD&status=approved）"""
+    try:
+        datetime.strptime(date_from, '%Y-%m-%d')
+        datetime.strptime(date_to, '%Y-%m-%d')
+        if date_from > date_to:
+            raise ValueError('from は to 以前の日付を指定してください')
+        items = VacationRepo(table).list_overlapping(date_from, date_to, status)
+    except ValueError as e:
+        return {
+            'statusCode': 400,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': str(e)})
+        }
+    except Exception as e:
+        print(f"Error in get_vacation_requests_in_range: {str(e)}")
+        return {
+            'statusCode': 500,
+            'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+            'body': json.dumps({'error': str(e)})
+        }
+    
+    return {
+        'statusCode': 200,
+        'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+        'body': json.dumps(items, cls=DecimalEncoder)
+    }
+
 def create_vacation_request(event):
     """休暇申請を作成"""
     try:
@@ -155,8 +180,8 @@ def create_vacation_request(event):
         
         employee_id = data.get('employee_id')
         start_date = data.get('start_date')
-        end_date = data.get('end_date', start_date)
-        vacation_type = data.get('type', 'full')
+        end_date = data.get('end_date') or start_date
+        vacation_type = data.get('type') or VacationRepo.DEFAULT_TYPE
         time_type = data.get('time_type', 'full')  # 時間区分を追加
         reason = data.get('reason', '')
         status = data.get('status', 'applying')  # デフォルトは申請中
@@ -168,14 +193,20 @@ def create_vacation_request(event):
                 'body': json.dumps({'error': '従業員IDと開始日は必須です'})
             }
         
+        if end_date < start_date:
+            return {
+                'statusCode': 400,
+                'headers': {**{'Content-Type': 'application/json'}, **get_cors_headers()},
+                'body': json.dumps({'error': '終了日は開始日以降の日付を指定してください'})
+            }
+        
         # タイムスタンプをリクエストIDとして使用（#の代わりに_を使用）
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S%f')
-        request_id = f'{employee_id}_{timestamp}'
+        request_id = VacationRepo.request_id(employee_id, timestamp)
         
         item = {
-            'PK': f'EMPLOYEE#{employee_id}',
-            'SK': f'VACATION#{timestamp}',
-            'GSI1PK': 'VACATION_REQUEST',
+            **VacationRepo.key(employee_id, timestamp),
+            'GSI1PK': VacationRepo.INDEX_PK,
             'GSI1SK': f'{start_date}#{request_id}',
             'request_id': request_id,
             'employee_id': employee_id,
@@ -189,7 +220,10 @@ def create_vacation_request(event):
             'updated_at': datetime.now().isoformat()
         }
         
-        table.put_item(Item=item)
+        # 申請・月別のコピー・休暇台帳を同時に保存
+        VacationRepo(table).save_request(
+            item, extra_actions=VacationLedgerRepo.update_actions(employee_id, new_item=item)
+        )
         
         return {
             'statusCode': 201,
@@ -213,52 +247,53 @@ def update_vacation_request(request_id, event):
         data = json.loads(event.get('body', '{}'))
         
         # request_idから従業員IDとタイムスタンプを抽出（_区切り）
-        parts = request_id.split('_')
-        if len(parts) < 2:
+        parsed = VacationRepo.parse_request_id(request_id)
+        if not parsed:
             return {
                 'statusCode': 400,
                 'headers': {'Content-Type': 'application/json'},
                 'body': json.dumps({'error': '無効なリクエストIDです'})
             }
         
-        employee_id = parts[0]
-        timestamp = parts[1]
-        
-        # 更新する属性を準備
-        update_expression = 'SET updated_at = :updated_at'
-        expression_values = {':updated_at': datetime.now().isoformat()}
-        
-        if 'status' in data:
-            update_expression += ', #status = :status'
-            expression_values[':status'] = data['status']
-        
-        if 'reason' in data:
-            update_expression += ', reason = :reason'
-            expression_values[':reason'] = data['reason']
+        employee_id, timestamp = parsed
         
-        expression_names = {'#status': 'status'} if 'status' in data else None
-        
-        update_params = {
-            'Key': {
-                'PK': f'EMPLOYEE#{employee_id}',
-                'SK': f'VACATION#{timestamp}'
-            },
-            'UpdateExpression': update_expression,
-            'ExpressionAttributeValues': expression_values,
-            'ReturnValues': 'ALL_NEW'
-        }
+        repo = VacationRepo(table)
+        old_item = repo.get(VacationRepo.key(employee_id, timestamp))
+        if not old_item:
+            return {
+                'statusCode': 404,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': '休暇申請が見つかりません'})
+            }
         
-        if expression_names:
-            update_params['ExpressionAttributeNames'] = expression_names
+        # 更新する属性を反映
+        item = VacationRepo.with_request_id(dict(old_item))
+        item.setdefault('employee_id', employee_id)
+        item['updated_at'] = datetime.now().isoformat()
+        for name in ('status', 'reason'):
+            if name in data:
+                item[name] = data[name]
         
-        response = table.update_item(**update_params)
+        try:
+            repo.save_request(
+                item, old_item,
+                extra_actions=VacationLedgerRepo.update_actions(employee_id, old_item, item)
+            )
+        except Exception as e:
+            if error_code(e) != 'TransactionCanceledException':
+                raise
+            return {
+                'statusCode': 409,
+                'headers': {'Content-Type': 'application/json'},
+                'body': json.dumps({'error': '休暇申請が同時に更新されました。再読み込みしてください'})
+            }
         
         return {
             'statusCode': 200,
             'headers': {'Content-Type': 'application/json'},
             'body': json.dumps({
                 'message': '休暇申請を更新しました',
-                'item': response.get('Attributes', {})
+                'item': item
             }, cls=DecimalEncoder)
         }
     except Exception as e:
@@ -273,23 +308,32 @@ def delete_vacation_request(request_id):
     """休暇申請を削除"""
     try:
         # request_idから従業員IDとタイムスタンプを抽出（_区切り）
-        parts = request_id.split('_')
-        if len(parts) < 2:
+        parsed = VacationRepo.parse_request_id(request_id)
+        if not parsed:
             return {
                 'statusCode': 400,
                 'headers': {'Content-Type': 'application/json'},
                 'body': json.dumps({'error': '無効なリクエストIDです'})
             }
         
-        employee_id = parts[0]
-        timestamp = parts[1]
+        employee_id, timestamp = parsed
         
-        table.delete_item(
-            Key={
-                'PK': f'EMPLOYEE#{employee_id}',
-                'SK': f'VACATION#{timestamp}'
-            }
-        )
+        repo = VacationRepo(table)
+        item = repo.get(VacationRepo.key(employee_id, timestamp))
+        if item:
+            # 申請・月別のコピーの削除と休暇台帳の差し引きを同時に行う
+            item = VacationRepo.with_request_id(item)
+            item.setdefault('employee_id', employee_id)
+            try:
+                repo.delete_request(item, extra_actions=VacationLedgerRepo.update_actions(employee_id, old_item=item))
+            except Exception as e:
+                if error_code(e) != 'TransactionCanceledException':
+                    raise
+                return {
+                    'statusCode': 409,
+                    'headers': {'Content-Type': 'application/json'},
+                    'body': json.dumps({'error': '休暇申請が同時に更新されました。再読み込みしてください'})
+                }
         
         return {
             'statusCode': 200,
@@ -2,6 +2,18 @@ import json
 import os
 import base64
 
+from common.responses import conditional_get
+
+# 読み込んだ HTML（ファイル名 → 本文）。コンテナ内で1回だけ読み、
+# 圧縮結果も conditional_get(memoize=True) がコンテナ内に保持する
+_pages = {}
+
+def load_page(filename):
+    if filename not in _pages:
+        with open(os.path.join(os.path.dirname(__file__), filename), 'r', encoding='utf-8') as f:
+            _pages[filename] = f.read()
+    return _pages[filename]
+
 def get_cors_headers():
     return {
         'Access-Control-Allow-Origin': '*',
@@ -56,21 +68,18 @@ def lambda_handler(event, context):
     else:
         filename = 'index.html'  # デフォルト
     
-    # HTMLファイルの内容を読み込み
-    html_file_path = os.path.join(os.path.dirname(__file__), filename)
-    
+    # HTMLファイルの内容を読み込み（ETag で再検証し、Accept-Encoding に応じて圧縮済みの本文を返す）
     try:
-        with open(html_file_path, 'r', encoding='utf-8') as f:
-            html_content = f.read()
+        html_content = load_page(filename)
         
-        return {
+        return conditional_get(event, {
             'statusCode': 200,
             'headers': {
-                **{'Content-Type': 'text/html; charset=utf-8', 'Cache-Control': 'no-cache'},
+                **{'Content-Type': 'text/html; charset=utf-8'},
                 **get_cors_headers()
             },
             'body': html_content
-        }
+        }, 'pages', memoize=True)
     except FileNotFoundError:
         return {
             'statusCode': 404,
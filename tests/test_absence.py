@@ -0,0 +1,62 @@
+import sys, os
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import absence
+import shift_solver
+from common.repositories import VacationRepo
+
+
+class VacationTable:
+    """VACMONTH# partitions built from the request list; applies the overlap filter like DynamoDB would"""
+    def __init__(self, items):
+        self.items = [month for item in items for month in VacationRepo.month_items(item)]
+        self.calls = []
+    def query(self, KeyConditionExpression, FilterExpression, ExpressionAttributeValues, ExpressionAttributeNames=None):
+        values = ExpressionAttributeValues
+        self.calls.append(values[':pk'])
+        items = [item for item in self.items
+                 if item['PK'] == values[':pk'] and item['start_date'] <= values[':to']
+                 and item['end_date'] >= values[':from'] and item['status'] == values.get(':status', item['status'])]
+        return {'Items': items}
+
+
+def vacation(employee_id, start, end, time_type='full', status='approved'):
+    return {'request_id': f'{employee_id}_1', 'employee_id': employee_id, 'start_date': start,
+            'end_date': end, 'time_type': time_type, 'status': status}
+
+
+def test_load_expands_approved_vacations_into_bitmap():
+    days = [f'2025-12-{d:02d}' for d in range(1, 32)]
+    table = VacationTable([
+        vacation('E1', '2025-11-28', '2025-12-02'),
+        vacation('E2', '2025-12-10', '2025-12-10', 'morning'),
+        vacation('E3', '2025-12-15', '2025-12-15', status='applying'),
+        vacation('E4', '2025-11-01', '2025-11-30'),
+    ])
+    absences = absence.AbsenceMap.load(table, days)
+    assert table.calls == ['VACMONTH#2025-12']
+
+    assert absences.full_day_keys() == {('2025-12-01', 'E1'), ('2025-12-02', 'E1')}
+    assert absences.blocks('E2', '2025-12-10', '05:00', '07:00')
+    assert not absences.blocks('E2', '2025-12-10', '14:00', '14:30')
+    assert not absences.blocks('E3', '2025-12-15', '05:00', '07:00')
+    assert not absences.blocks('E4', '2025-12-01', '05:00', '07:00')
+
+
+def test_solvers_skip_absent_employees():
+    days = ['2025-12-01', '2025-12-02']
+    employees = [{'id': 'E1', 'skills': ['milking', 'patrol']}, {'id': 'E2', 'skills': ['milking', 'patrol']}]
+    demands = [[('milking', '05:00', '07:00', 1), ('patrol', '14:00', '14:30', 1)]] * 2
+    absences = absence.AbsenceMap(days)
+    absences.add('E1', '2025-12-01', '2025-12-01', 'full')
+    absences.add('E2', '2025-12-02', '2025-12-02', 'morning')
+
+    for solver in shift_solver.SOLVERS:
+        result = shift_solver.solve_month(days, demands, employees, unavailable=absences.full_day_keys(),
+                                          solver=solver, absences=absences)
+        got = {(s['date'], s['task_type']): s['employee_id'] for s in result['assignments']}
+        assert got[('2025-12-01', 'milking')] == 'E2'
+        assert ('2025-12-01', 'patrol') not in got
+        assert got[('2025-12-02', 'milking')] == 'E1'
+        assert got[('2025-12-02', 'patrol')] == 'E2'
@@ -0,0 +1,71 @@
+import sys, os, json, importlib, threading
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import bootstrap
+importlib.reload(bootstrap)
+
+
+class DummyTable:
+    """Answers each partition the bootstrap reads; records which threads served the queries"""
+    def __init__(self):
+        self.threads = set()
+        self.partitions = {
+            'EMPLOYEE': [{'PK': 'EMPLOYEE', 'SK': '001', 'name': '佐藤', 'skills': ['milking']}],
+            'TASK_CATALOG': [{'PK': 'TASK#1', 'SK': 'CONFIG', 'GSI1PK': 'TASK_CATALOG', 'name': '搾乳'}],
+            'REQUIREMENTS': [{'PK': 'REQUIREMENTS', 'SK': 'DAILY#2025-12-24', 'requirements': {'milking': 3}}],
+            'VACMONTH#2025-12': [{'PK': 'VACMONTH#2025-12', 'SK': 'EMP#001#001_1', 'request_id': '001_1',
+                                  'employee_id': '001', 'start_date': '2025-12-10', 'end_date': '2025-12-10',
+                                  'status': 'approved'}],
+            'SHIFTMONTH#2025-12': [{'PK': 'SHIFT#2025-12-01', 'SK': 'EMP#001#1', 'start_time': '05:00',
+                                    'end_time': '07:00', 'status': 'scheduled'}],
+        }
+        self.items = {
+            ('REQUIREMENTS', 'GLOBAL_DEFAULT'): {'requirements': {'milking': 2}},
+            ('SETTINGS', 'CONFIRMATION'): {'confirmation_day': 20},
+        }
+    def get_item(self, Key):
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': dict(item)} if item else {}
+    def query(self, ExpressionAttributeValues, **kwargs):
+        self.threads.add(threading.get_ident())
+        values = ExpressionAttributeValues
+        items = self.partitions.get(values.get(':pk') or values.get(':gsi1pk'), [])
+        if ':prefix' in values:
+            items = [item for item in items if item['SK'].startswith(values[':prefix'])]
+        if ':to' in values:
+            items = [item for item in items if item['start_date'] <= values[':to'] and item['end_date'] >= values[':from']]
+        return {'Items': [dict(item) for item in items]}
+
+
+def request(month, headers=None):
+    return bootstrap.lambda_handler({'httpMethod': 'GET', 'path': '/bootstrap/shift-calendar',
+                                     'queryStringParameters': {'month': month}, 'headers': headers}, None)
+
+
+def test_shift_calendar_combines_reads_and_honours_etag(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(bootstrap, 'table', dummy)
+
+    res = request('2025-12')
+    assert res['statusCode'] == 200
+    body = json.loads(res['body'])
+    assert body['month'] == '2025-12'
+    assert [e['employee_id'] for e in body['employees']] == ['001']
+    assert body['tasks'][0]['task_type'] == '1'
+    assert body['requirements']['default'] == {'milking': 2}
+    assert body['requirements']['daily'] == {'2025-12-24': {'milking': 3}}
+    assert [v['request_id'] for v in body['vacations']] == ['001_1']
+    assert body['confirmation'] == {'confirmation_day': 20}
+    assert body['shifts'] == [{'date': '2025-12-01', 'employee_id': '001', 'task_type': '1',
+                               'start_time': '05:00', 'end_time': '07:00', 'status': 'scheduled'}]
+    assert threading.get_ident() not in dummy.threads
+
+    etag = res['headers']['ETag']
+    assert request('2025-12', {'If-None-Match': etag})['statusCode'] == 304
+    assert request('2025-12', {'if-none-match': '"stale"'})['statusCode'] == 200
+
+    dummy.partitions['SHIFTMONTH#2025-12'][0]['status'] = 'confirmed'
+    assert request('2025-12', {'If-None-Match': etag})['headers']['ETag'] != etag
+
+    assert request('2025-13')['statusCode'] == 400
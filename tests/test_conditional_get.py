@@ -0,0 +1,71 @@
+import sys, os, json, importlib, base64, gzip
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import task_management
+import web_app
+from common import responses
+importlib.reload(task_management)
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = [{'PK': 'TASK#1', 'SK': 'CONFIG', 'GSI1PK': 'TASK_CATALOG', 'name': '搾乳'}]
+    def query(self, ExpressionAttributeValues, **kwargs):
+        return {'Items': [dict(item) for item in self.items]}
+
+
+def get(headers=None):
+    return task_management.lambda_handler({'httpMethod': 'GET', 'path': '/tasks', 'headers': headers}, None)
+
+
+def test_get_tasks_revalidates_with_etag(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(task_management, 'table', dummy)
+
+    res = get()
+    assert res['statusCode'] == 200
+    etag = res['headers']['ETag']
+    assert res['headers']['Cache-Control'] == 'private, no-cache'
+    assert 'ETag' in res['headers']['Access-Control-Expose-Headers']
+
+    not_modified = get({'If-None-Match': etag})
+    assert (not_modified['statusCode'], not_modified['body'], not_modified['headers']['ETag']) == (304, '', etag)
+    assert get({'if-none-match': f'"other", W/{etag}'})['statusCode'] == 304
+
+    dummy.items[0]['name'] = '給餌'
+    changed = get({'If-None-Match': etag})
+    assert changed['statusCode'] == 200
+    assert json.loads(changed['body'])[0]['name'] == '給餌'
+
+    monkeypatch.setenv('HTTP_CACHE_MAX_AGE_TASKS', '60')
+    assert get()['headers']['Cache-Control'] == 'private, max-age=60'
+
+    # writes are never answered from the ETag
+    res = task_management.lambda_handler({'httpMethod': 'DELETE', 'path': '/tasks/1', 'headers': {'If-None-Match': '*'}}, None)
+    assert res['statusCode'] != 304
+
+
+def test_pages_are_gzipped_once_and_revalidated():
+    responses._compressed.clear()
+    page = lambda headers: web_app.lambda_handler({'httpMethod': 'GET', 'path': '/shifts.html', 'headers': headers}, None)
+
+    res = page({'Accept-Encoding': 'gzip, deflate, br;q=0'})
+    assert res['isBase64Encoded'] is True
+    assert res['headers']['Content-Encoding'] == 'gzip'
+    assert res['headers']['Vary'] == 'Accept-Encoding'
+    assert gzip.decompress(base64.b64decode(res['body'])).decode('utf-8') == web_app.load_page('shifts.html')
+    assert res['headers']['ETag'].endswith('-gz"')
+
+    assert page({'Accept-Encoding': 'gzip'})['body'] == res['body']
+    assert len(responses._compressed) == 1
+    assert page({'Accept-Encoding': 'gzip', 'If-None-Match': res['headers']['ETag']})['statusCode'] == 304
+
+    plain = page({})
+    assert 'Content-Encoding' not in plain['headers'] and not plain.get('isBase64Encoded')
+
+    # small JSON bodies stay uncompressed; base64 request bodies are decoded before parsing
+    small = {'statusCode': 200, 'headers': {}, 'body': '[]'}
+    assert responses.compress({'headers': {'Accept-Encoding': 'gzip'}}, small) == small
+    event = {'isBase64Encoded': True, 'body': base64.b64encode('{"名前": 1}'.encode('utf-8')).decode('ascii')}
+    assert json.loads(responses.decode_request(event)['body']) == {'名前': 1}
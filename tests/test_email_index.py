@@ -0,0 +1,121 @@
+import sys, os, json, importlib
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from common import repositories
+import auth_service
+import cognite_user_management
+importlib.reload(auth_service)
+importlib.reload(cognite_user_management)
+
+
+class Cancelled(Exception):
+    def __init__(self, reasons):
+        super().__init__('TransactionCanceledException')
+        self.response = {'Error': {'Code': 'TransactionCanceledException'},
+                         'CancellationReasons': [{'Code': r} for r in reasons]}
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = {}
+    def get_item(self, Key):
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': dict(item)} if item else {}
+    def put_item(self, Item):
+        self.items[(Item['PK'], Item['SK'])] = Item
+    def scan(self, **kwargs):
+        raise AssertionError('email lookups must not scan the table')
+    def transact(self, actions):
+        reasons = []
+        for action in actions:
+            (kind, params), = action.items()
+            key = params.get('Item') or params['Key']
+            exists = (key['PK'], key['SK']) in self.items
+            condition = params.get('ConditionExpression', '')
+            ok = True
+            if condition == 'attribute_not_exists(PK)':
+                ok = not exists
+            elif condition.startswith('cognite_user_id'):
+                ok = exists and self.items[(key['PK'], key['SK'])].get('cognite_user_id') == params['ExpressionAttributeValues'][':uid']
+            reasons.append('None' if ok else 'ConditionalCheckFailed')
+        if 'ConditionalCheckFailed' in reasons:
+            raise Cancelled(reasons)
+        for action in actions:
+            (kind, params), = action.items()
+            if kind == 'Put':
+                self.put_item(params['Item'])
+            else:
+                self.items.pop((params['Key']['PK'], params['Key']['SK']), None)
+
+
+def install(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(auth_service, 'table', dummy)
+    monkeypatch.setattr(cognite_user_management, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+    return dummy
+
+
+def test_register_then_login_uses_email_pointer(monkeypatch):
+    dummy = install(monkeypatch)
+    res = auth_service.cognite_register({'email': 'Taro@Example.com ', 'name': '太郎', 'password': 'pw'})
+    assert res['statusCode'] == 201
+    user_id = json.loads(res['body'])['cognite_user_id']
+    assert dummy.items[('EMAIL#taro@example.com', 'USER')]['cognite_user_id'] == user_id
+
+    res = auth_service.cognite_login({'email': 'taro@example.com', 'password': 'pw'})
+    assert res['statusCode'] == 200
+    assert json.loads(res['body'])['user']['cognite_user_id'] == user_id
+
+    res = auth_service.cognite_register({'email': 'TARO@example.com', 'name': '別人', 'password': 'x'})
+    assert res['statusCode'] == 409
+
+
+def test_email_change_moves_pointer_and_rejects_taken_email(monkeypatch):
+    dummy = install(monkeypatch)
+    a = json.loads(cognite_user_management.create_cognite_user({'email': 'a@example.com', 'name': 'A'})['body'])['cognite_user_id']
+    cognite_user_management.create_cognite_user({'email': 'b@example.com', 'name': 'B'})
+
+    res = cognite_user_management.update_cognite_user(a, {'email': 'b@example.com'})
+    assert res['statusCode'] == 409
+    assert dummy.items[('EMAIL#a@example.com', 'USER')]['cognite_user_id'] == a
+
+    res = cognite_user_management.update_cognite_user(a, {'email': 'c@example.com'})
+    assert res['statusCode'] == 200
+    assert ('EMAIL#a@example.com', 'USER') not in dummy.items
+    assert dummy.items[('EMAIL#c@example.com', 'USER')]['cognite_user_id'] == a
+
+    cognite_user_management.delete_cognite_user(a)
+    assert ('EMAIL#c@example.com', 'USER') not in dummy.items
+    assert json.loads(auth_service.check_user_exists({'email': 'c@example.com'})['body'])['exists'] is False
+
+
+def test_employee_register_retries_taken_employee_id(monkeypatch):
+    dummy = install(monkeypatch)
+    dummy.put_item({'PK': 'EMPLOYEE', 'SK': '001', 'name': '手動登録'})
+    ids = iter([['001'], ['002']])
+    monkeypatch.setattr(repositories.EmployeeRepo, 'allocate_ids', lambda self, count=1: next(ids))
+    monkeypatch.setattr(repositories.EmployeeRepo, 'invalidate_cache', lambda self: None)
+    data = {'email': 'new@example.com', 'name': '新人', 'kana_name': 'シンジン', 'phone': '000', 'password': 'pw'}
+
+    res = auth_service.employee_register(data)
+    assert res['statusCode'] == 201
+    assert json.loads(res['body'])['employee_id'] == '002'
+    assert dummy.items[('EMPLOYEE', '001')]['name'] == '手動登録'
+
+    res = auth_service.employee_register(data)
+    assert res['statusCode'] == 409
+    assert json.loads(res['body'])['error'] == 'User already exists'
+
+
+def test_user_lookups_by_id_use_the_user_key(monkeypatch):
+    dummy = install(monkeypatch)
+    user_id = json.loads(auth_service.cognite_register({'email': 'c@example.com', 'name': 'C', 'password': 'pw'})['body'])['cognite_user_id']
+
+    res = auth_service.get_user_by_sub(user_id)
+    assert res['statusCode'] == 200
+    assert json.loads(res['body'])['email'] == 'c@example.com'
+    assert auth_service.get_cognite_user_by_id(user_id)['cognite_user_id'] == user_id
+    assert auth_service.get_user_by_sub('missing')['statusCode'] == 404
+    assert auth_service.get_cognite_user_by_id('missing') is None
@@ -0,0 +1,125 @@
+import sys, os, json, importlib
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from common import repositories
+import employee_management
+importlib.reload(employee_management)
+
+
+class ConditionFailed(Exception):
+    response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+
+
+class Cancelled(Exception):
+    def __init__(self, reasons):
+        super().__init__('TransactionCanceledException')
+        self.response = {'Error': {'Code': 'TransactionCanceledException'},
+                         'CancellationReasons': [{'Code': r} for r in reasons]}
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = {}
+        self.put_item_count = 0
+        self.batched = 0
+        self.transacted = 0
+    def get_item(self, Key):
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': dict(item)} if item else {}
+    def put_item(self, Item, ConditionExpression=None):
+        key = (Item['PK'], Item['SK'])
+        if ConditionExpression == 'attribute_not_exists(PK)' and key in self.items:
+            raise ConditionFailed()
+        self.put_item_count += 1
+        self.items[key] = Item
+    def update_item(self, Key, ExpressionAttributeValues, ConditionExpression=None, **kwargs):
+        key = (Key['PK'], Key['SK'])
+        if ConditionExpression == 'attribute_exists(PK)' and key not in self.items:
+            raise ConditionFailed()
+        item = self.items.setdefault(key, dict(Key))
+        name = 'value' if Key['PK'] == 'SEQUENCE' else 'version'
+        item[name] = item.get(name, 0) + list(ExpressionAttributeValues.values())[0]
+        return {'Attributes': {name: item[name]}}
+    def query(self, KeyConditionExpression=None, ExpressionAttributeValues=None, ProjectionExpression=None):
+        pk = ExpressionAttributeValues[':pk']
+        return {'Items': [dict(v) for (k_pk, _), v in sorted(self.items.items()) if k_pk == pk]}
+    def transact(self, actions):
+        items = [action['Put']['Item'] for action in actions]
+        reasons = ['ConditionalCheckFailed' if (item['PK'], item['SK']) in self.items else 'None' for item in items]
+        if 'ConditionalCheckFailed' in reasons:
+            raise Cancelled(reasons)
+        self.transacted += len(items)
+        for item in items:
+            self.items[(item['PK'], item['SK'])] = item
+    def batch_writer(self, overwrite_by_pkeys=None):
+        table = self
+        class BW:
+            def __enter__(self): return self
+            def __exit__(self, *a): pass
+            def put_item(self, Item):
+                table.batched += 1
+                table.items[(Item['PK'], Item['SK'])] = Item
+        return BW()
+
+
+def test_bulk_import_csv_then_export_round_trip(monkeypatch):
+    dummy = DummyTable()
+    dummy.items[('EMPLOYEE', '001')] = {'PK': 'EMPLOYEE', 'SK': '001', 'name': '既存', 'skills': ['milking'], 'phone': '090'}
+    dummy.items[('EMPLOYEE', '002')] = {'PK': 'EMPLOYEE', 'SK': '002', 'name': '手動'}
+    dummy.items[('SEQUENCE', 'EMPLOYEE')] = {'PK': 'SEQUENCE', 'SK': 'EMPLOYEE', 'value': 1}
+    monkeypatch.setattr(employee_management, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    csv_body = (
+        'employee_id,name,kana_name,skills,vacation_days\n'
+        ',山田太郎,やまだ たろう,milking;feeding,15\n'
+        ',,名前なし,,\n'
+        '001,既存,,patrol,\n'
+        ',佐藤花子,さとう はなこ,,abc\n'
+        ',鈴木一郎,,cleaning,\n'
+        '999,存在しない,,,\n'
+    )
+    res = employee_management.bulk_import_employees({'body': csv_body, 'headers': {'Content-Type': 'text/csv'}})
+    body = json.loads(res['body'])
+    assert res['statusCode'] == 200
+    assert (body['format'], body['created'], body['updated']) == ('csv', 2, 1)
+    # ID 002 is already taken, so the block skips it
+    assert body['employee_ids'] == ['003', '004']
+    assert [e['line'] for e in body['errors']] == [3, 5, 7]
+    assert dummy.put_item_count == 0 and (dummy.transacted, dummy.batched) == (2, 1)
+    assert dummy.items[('EMPLOYEE', '003')]['skills'] == ['milking', 'feeding']
+    assert dummy.items[('EMPLOYEE', '001')]['skills'] == ['patrol']
+    assert dummy.items[('EMPLOYEE', '001')]['phone'] == '090'
+
+    res = employee_management.export_employees({'queryStringParameters': {'format': 'ndjson'}})
+    rows = [json.loads(line) for line in res['body'].splitlines()]
+    assert [r['employee_id'] for r in rows] == ['001', '002', '003', '004']
+
+    res = employee_management.export_employees({'queryStringParameters': None})
+    lines = res['body'].splitlines()
+    assert lines[0].startswith('employee_id,name')
+    assert '003,山田太郎,やまだ たろう,,,milking;feeding,15' in lines[3]
+
+    ndjson = '{"name": "田中"}\nnot json\n'
+    res = employee_management.bulk_import_employees({'body': ndjson, 'queryStringParameters': {'dry_run': 'true'}})
+    body = json.loads(res['body'])
+    assert (body['format'], body['dry_run'], body['created'], len(body['errors'])) == ('ndjson', True, 1, 1)
+    assert ('EMPLOYEE', '005') not in dummy.items
+
+
+def test_bulk_import_never_overwrites_an_employee_missing_from_the_listing(monkeypatch):
+    dummy = DummyTable()
+    dummy.items[('EMPLOYEE', '001')] = {'PK': 'EMPLOYEE', 'SK': '001', 'name': '既存'}
+    dummy.items[('SEQUENCE', 'EMPLOYEE')] = {'PK': 'SEQUENCE', 'SK': 'EMPLOYEE', 'value': 0}
+    monkeypatch.setattr(employee_management, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+    # 一覧（キャッシュ）に 001 がまだ載っていない
+    monkeypatch.setattr(repositories.EmployeeRepo, 'list_all', lambda self: [])
+
+    res = employee_management.bulk_import_employees({'body': '[{"name": "新人A"}, {"name": "新人B"}]'})
+    body = json.loads(res['body'])
+    assert res['statusCode'] == 200
+    assert body['employee_ids'] == ['003', '002']
+    assert dummy.items[('EMPLOYEE', '001')]['name'] == '既存'
+    assert dummy.items[('EMPLOYEE', '003')]['name'] == '新人A'
@@ -0,0 +1,60 @@
+import sys, os, json, importlib
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from common.repositories import EmployeeRepo
+import employee_management
+importlib.reload(employee_management)
+
+
+class ConditionFailed(Exception):
+    response = {'Error': {'Code': 'ConditionalCheckFailedException'}}
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = {}
+        self.queries = 0
+    def get_item(self, Key):
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': dict(item)} if item else {}
+    def put_item(self, Item, ConditionExpression=None):
+        key = (Item['PK'], Item['SK'])
+        if ConditionExpression == 'attribute_not_exists(PK)' and key in self.items:
+            raise ConditionFailed()
+        self.items[key] = Item
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeValues, ExpressionAttributeNames=None,
+                    ConditionExpression=None, ReturnValues=None):
+        key = (Key['PK'], Key['SK'])
+        if ConditionExpression == 'attribute_exists(PK)' and key not in self.items:
+            raise ConditionFailed()
+        item = self.items.setdefault(key, dict(Key))
+        name = ExpressionAttributeNames['#value'] if ExpressionAttributeNames and '#value' in ExpressionAttributeNames else 'version'
+        item[name] = item.get(name, 0) + list(ExpressionAttributeValues.values())[0]
+        return {'Attributes': {name: item[name]}}
+    def query(self, KeyConditionExpression=None, ExpressionAttributeValues=None, ProjectionExpression=None):
+        self.queries += 1
+        pk = ExpressionAttributeValues[':pk']
+        return {'Items': [dict(v) for (k_pk, _), v in sorted(self.items.items()) if k_pk == pk]}
+
+
+def test_ids_come_from_counter_seeded_once(monkeypatch):
+    dummy = DummyTable()
+    for employee_id in ('003', '007', 'abc'):
+        dummy.items[('EMPLOYEE', employee_id)] = {'PK': 'EMPLOYEE', 'SK': employee_id, 'name': employee_id}
+    monkeypatch.setattr(employee_management, 'table', dummy)
+
+    res = employee_management.create_employee({'body': json.dumps({'name': '新人'})})
+    assert json.loads(res['body'])['employee_id'] == '008'
+    assert dummy.items[('SEQUENCE', 'EMPLOYEE')]['value'] == 8
+    assert dummy.queries == 1
+
+    # block reservation for bulk imports
+    assert EmployeeRepo(dummy).allocate_ids(3) == ['009', '010', '011']
+
+    # an ID taken outside the counter is never overwritten
+    dummy.items[('EMPLOYEE', '012')] = {'PK': 'EMPLOYEE', 'SK': '012', 'name': 'manual'}
+    res = employee_management.create_employee({'body': json.dumps({'name': '次'})})
+    assert json.loads(res['body'])['employee_id'] == '013'
+    assert dummy.items[('EMPLOYEE', '012')]['name'] == 'manual'
+    assert dummy.queries == 1
@@ -0,0 +1,36 @@
+import sys, os
+from collections import defaultdict
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import intervals
+import shift_assignment
+
+
+def test_masks_handle_touching_and_overnight_intervals():
+    assert intervals.to_minutes('05:30') == 330
+    assert intervals.duration('22:00', '02:00') == 240
+    assert intervals.duration('09:00', '09:00') == 24 * 60
+    assert not intervals.overlaps('05:00', '07:00', '07:00', '08:00')
+    assert intervals.overlaps('05:00', '07:00', '06:59', '08:00')
+    # overnight slots occupy the evening and the early morning of the same day
+    assert intervals.overlaps('22:00', '02:00', '23:00', '23:30')
+    assert intervals.overlaps('22:00', '02:00', '01:00', '03:00')
+    assert not intervals.overlaps('22:00', '02:00', '02:00', '21:59')
+
+    occupancy = intervals.DayOccupancy.from_shifts({'E1': [{'start_time': '05:00', 'end_time': '07:00'}]})
+    assert occupancy.busy('E1', '06:00', '06:30')
+    assert not occupancy.busy('E2', '06:00', '06:30')
+    assert not occupancy.busy_any('E1', [('08:00', '10:00'), ('16:00', '17:00')])
+    assert occupancy.busy_any('E1', [('08:00', '10:00'), ('04:00', '05:01')])
+
+
+def test_auto_assign_uses_day_occupancy():
+    employees = [{'id': 'E1', 'name': 'a', 'skills': ['milking', 'feeding']},
+                 {'id': 'E2', 'name': 'b', 'skills': ['milking', 'feeding']}]
+    existing = defaultdict(list, {'E1': [{'task_type': 'patrol', 'start_time': '04:30', 'end_time': '05:30'}]})
+    assignments = shift_assignment.auto_assign_shifts(
+        '2030-01-01', [{'task_type': 'milking', 'count': 1}, {'task_type': 'feeding', 'count': 2}], employees, existing)
+    got = [(a['task_type'], a['employee_id'], a['start_time']) for a in assignments]
+    # E1's early patrol overlaps a milking slot, so E2 milks; both are still free for feeding
+    assert got == [('milking', 'E2', '05:00'), ('feeding', 'E1', '08:00'), ('feeding', 'E2', '08:00')]
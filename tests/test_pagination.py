@@ -0,0 +1,76 @@
+import sys, os, json, importlib
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from common import dynamodb
+import employee_management
+importlib.reload(employee_management)
+
+
+class PagedTable:
+    """Returns at most `page` evaluated items per call; filtered-out items leave holes (empty pages)."""
+    def __init__(self, items, page=2, keep=lambda item: True):
+        self.items = sorted(items, key=lambda item: (item['PK'], item['SK']))
+        self.page = page
+        self.keep = keep
+        self.calls = 0
+    def _run(self, Limit=None, ExclusiveStartKey=None, **kwargs):
+        self.calls += 1
+        start = 0
+        if ExclusiveStartKey:
+            start = next(i for i, item in enumerate(self.items)
+                         if (item['PK'], item['SK']) == (ExclusiveStartKey['PK'], ExclusiveStartKey['SK'])) + 1
+        size = min(self.page, Limit or self.page)
+        evaluated = self.items[start:start + size]
+        response = {'Items': [item for item in evaluated if self.keep(item)]}
+        if start + size < len(self.items):
+            last = evaluated[-1]
+            response['LastEvaluatedKey'] = {'PK': last['PK'], 'SK': last['SK']}
+        return response
+    def query(self, **kwargs):
+        return self._run(**kwargs)
+    def scan(self, **kwargs):
+        return self._run(**kwargs)
+
+
+def employees(n):
+    return [{'PK': 'EMPLOYEE', 'SK': f'{i:03d}', 'name': f'emp{i}'} for i in range(1, n + 1)]
+
+
+def test_iter_scan_reads_past_empty_filtered_pages():
+    table = PagedTable(employees(9), page=2, keep=lambda item: item['SK'] in ('001', '009'))
+    items = list(dynamodb.iter_scan(table, FilterExpression='x'))
+    assert [item['SK'] for item in items] == ['001', '009']
+    assert table.calls == 5
+
+
+def test_query_page_cursor_round_trip():
+    table = PagedTable(employees(7), page=2, keep=lambda item: item['SK'] != '003')
+    seen = []
+    cursor = None
+    while True:
+        items, cursor = dynamodb.query_page(table, 3, cursor, KeyConditionExpression='PK = :pk')
+        assert len(items) <= 3
+        seen.extend(item['SK'] for item in items)
+        if not cursor:
+            break
+    assert seen == ['001', '002', '004', '005', '006', '007']
+
+
+def test_get_all_employees_paging(monkeypatch):
+    monkeypatch.setattr(employee_management, 'table', PagedTable(employees(5), page=10))
+
+    res = employee_management.get_all_employees({'queryStringParameters': {'limit': '2'}})
+    body = json.loads(res['body'])
+    assert [e['employee_id'] for e in body['items']] == ['001', '002']
+    res = employee_management.get_all_employees({'queryStringParameters': {'limit': '10', 'cursor': body['next_cursor']}})
+    body = json.loads(res['body'])
+    assert [e['employee_id'] for e in body['items']] == ['003', '004', '005']
+    assert body['next_cursor'] is None
+
+    # without limit/cursor the full list is returned as before
+    res = employee_management.get_all_employees({'queryStringParameters': None})
+    assert len(json.loads(res['body'])) == 5
+
+    res = employee_management.get_all_employees({'queryStringParameters': {'cursor': 'not-a-cursor'}})
+    assert res['statusCode'] == 400
@@ -0,0 +1,65 @@
+import sys, os
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from common import cache, repositories
+from common.repositories import EmployeeRepo, RequirementsRepo
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = {}
+        self.reads = []
+    def get_item(self, Key):
+        self.reads.append(Key['SK'])
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': dict(item)} if item else {}
+    def put_item(self, Item):
+        self.items[(Item['PK'], Item['SK'])] = Item
+    def update_item(self, Key, UpdateExpression, ExpressionAttributeNames, ExpressionAttributeValues):
+        item = self.items.setdefault((Key['PK'], Key['SK']), dict(Key))
+        item['version'] = item.get('version', 0) + ExpressionAttributeValues[':one']
+    def query(self, KeyConditionExpression=None, ExpressionAttributeValues=None, **kwargs):
+        self.reads.append('query')
+        pk = ExpressionAttributeValues[':pk']
+        return {'Items': [dict(v) for k, v in sorted(self.items.items()) if k[0] == pk]}
+
+
+def test_hits_until_version_bump(monkeypatch):
+    shared = cache.ReferenceCache(ttl=300, max_entries=10, version_check_interval=0)
+    monkeypatch.setattr(repositories, 'reference_cache', shared)
+    table = DummyTable()
+    table.put_item({'PK': 'EMPLOYEE', 'SK': '001', 'name': 'A'})
+
+    assert [e['SK'] for e in EmployeeRepo(table).list_all()] == ['001']
+    table.reads.clear()
+    employees = EmployeeRepo(table).list_all()
+    employees[0]['name'] = 'changed by caller'
+    assert EmployeeRepo(table).list_all()[0]['name'] == 'A'
+    # ウォームな読み込みはバージョン確認だけ
+    assert table.reads == ['employees', 'employees']
+
+    # 別コンテナからの書き込み（カウンターだけ上がる）も検知する
+    table.put_item({'PK': 'EMPLOYEE', 'SK': '002', 'name': 'B'})
+    other = cache.ReferenceCache(version_check_interval=0)
+    other.bump(table, cache.EMPLOYEES)
+    assert [e['SK'] for e in EmployeeRepo(table).list_all()] == ['001', '002']
+
+    RequirementsRepo(table).save_daily('2025-12-01', {'milking': 3})
+    assert RequirementsRepo(table).get_daily('2025-12-01') == {'milking': 3}
+    RequirementsRepo(table).save_daily('2025-12-01', {'milking': 1})
+    assert RequirementsRepo(table).get_daily('2025-12-01') == {'milking': 1}
+    assert table.items[('CACHE_VERSION', 'requirements')]['version'] == 2
+
+
+def test_bypasses_cache_without_version_item_access():
+    shared = cache.ReferenceCache(max_entries=2)
+    calls = []
+
+    class NoGetItem:
+        pass
+
+    table = NoGetItem()
+    for _ in range(3):
+        assert shared.get(table, cache.TASKS, 'catalog', lambda: calls.append(1) or ['t']) == ['t']
+    assert len(calls) == 3
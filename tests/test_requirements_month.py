@@ -0,0 +1,77 @@
+import sys, os, json, importlib
+from decimal import Decimal
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import settings_management
+import shift_assignment
+importlib.reload(settings_management)
+importlib.reload(shift_assignment)
+
+
+def as_stored(value):
+    """DynamoDB と同じく数値を Decimal にして返す"""
+    if isinstance(value, dict):
+        return {k: as_stored(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [as_stored(v) for v in value]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return Decimal(value)
+    return value
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = {}
+        self.gets = 0
+        self.queries = 0
+    def get_item(self, Key):
+        if Key['PK'] != 'CACHE_VERSION':
+            self.gets += 1
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': dict(item)} if item else {}
+    def put_item(self, Item):
+        self.items[(Item['PK'], Item['SK'])] = as_stored(Item)
+    def delete_item(self, Key):
+        self.items.pop((Key['PK'], Key['SK']), None)
+    def update_item(self, Key, **kwargs):
+        item = self.items.setdefault((Key['PK'], Key['SK']), dict(Key))
+        item['version'] = item.get('version', 0) + 1
+    def query(self, KeyConditionExpression=None, ExpressionAttributeValues=None):
+        self.queries += 1
+        assert 'begins_with(SK, :prefix)' in KeyConditionExpression
+        pk, prefix = ExpressionAttributeValues[':pk'], ExpressionAttributeValues[':prefix']
+        return {'Items': [dict(v) for (k_pk, k_sk), v in sorted(self.items.items())
+                          if k_pk == pk and k_sk.startswith(prefix)]}
+    def batch_writer(self, overwrite_by_pkeys=None):
+        table = self
+        class BW:
+            def __enter__(self): return self
+            def __exit__(self, *a): pass
+            def put_item(self, Item): table.put_item(Item)
+            def delete_item(self, Key): table.delete_item(Key)
+        return BW()
+
+
+def test_bulk_daily_requirements_and_month_resolver(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(settings_management, 'table', dummy)
+    monkeypatch.setattr(shift_assignment, 'table', dummy)
+    dummy.put_item({'PK': 'REQUIREMENTS', 'SK': 'DAILY#2025-12-03', 'requirements': {'milking': 9}})
+    dummy.put_item({'PK': 'REQUIREMENTS', 'SK': 'DAILY#2026-01-01', 'requirements': {'milking': 7}})
+    dummy.put_item({'PK': 'REQUIREMENTS', 'SK': 'MONTH#2025-12', 'requirements': {'milking': 2}})
+
+    event = {'body': json.dumps({'2025-12-01': {'milking': 4}, '2025-12-03': None})}
+    res = settings_management.save_daily_requirements_for_month('2025-12', event)
+    assert res['statusCode'] == 200
+    res = settings_management.get_daily_requirements_for_month('2025-12')
+    assert json.loads(res['body']) == {'2025-12-01': {'milking': 4}}
+
+    res = settings_management.save_daily_requirements_for_month('2025-12', {'body': json.dumps({'2026-01-02': {}})})
+    assert res['statusCode'] == 400
+
+    dummy.gets = dummy.queries = 0
+    days = ['2025-12-01', '2025-12-02', '2025-12-03']
+    resolved = shift_assignment.resolve_month_requirements('2025-12', days)
+    assert resolved == [{'milking': 4}, {'milking': 2}, {'milking': 2}]
+    assert dummy.queries <= 1 and dummy.gets <= 1
@@ -1,4 +1,7 @@
 import sys, os, json, importlib
+from datetime import datetime
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
 import shift_assignment
 importlib.reload(shift_assignment)
@@ -6,10 +9,13 @@ importlib.reload(shift_assignment)
 class DummyTable:
     def __init__(self):
         self.items = {}
-    def query(self, KeyConditionExpression=None, ExpressionAttributeValues=None, IndexName=None):
+    def query(self, KeyConditionExpression=None, ExpressionAttributeValues=None, IndexName=None, **kwargs):
         pk = ExpressionAttributeValues[':pk']
         items = [v for (k,v) in self.items.items() if k[0] == pk]
         return {'Items': items}
+    def get_item(self, Key):
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': item} if item else {}
     def put_item(self, Item, ConditionExpression=None):
         self.items[(Item['PK'], Item['SK'])] = Item
     def delete_item(self, Key):
@@ -26,14 +32,22 @@ class DummyTable:
         return BW()
 
 
+def next_month():
+    now = datetime.now()
+    return f"{now.year + 1}-{now.month:02d}"
+
+
 def test_preview_does_not_write(monkeypatch):
     dummy = DummyTable()
+    dummy.items[('EMPLOYEE', 'E1')] = {'PK': 'EMPLOYEE', 'SK': 'E1', 'name': 'E1', 'skills': ['milking']}
     monkeypatch.setattr(shift_assignment, 'table', dummy)
     # Call preview - should not write
-    event = {'body': json.dumps({'month': '2025-12', 'overwrite': False, 'preview': True})}
+    event = {'body': json.dumps({'month': next_month(), 'overwrite': False, 'preview': True})}
     res = shift_assignment.generate_monthly_shifts(event)
     body = json.loads(res['body'])
     assert body['preview'] is True
     assert 'shifts' in body
-    assert dummy.items == {}  # nothing written
+    # no shift is written; only the draft document is stored
+    assert [k for k in dummy.items if not k[0].startswith(('SHIFTDRAFT#', 'EMPLOYEE'))] == []
+    assert body['draft_id']
 
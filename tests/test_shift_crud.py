@@ -1,9 +1,16 @@
 import sys, os, json, importlib
 os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from common import repositories
 import shift_crud
 importlib.reload(shift_crud)
 
+
+class TransactionCanceled(Exception):
+    response = {'Error': {'Code': 'TransactionCanceledException'}}
+
+
 class DummyTable:
     def __init__(self):
         self.items = {}
@@ -17,7 +24,8 @@ class DummyTable:
         self.delete_called = False
     def query(self, KeyConditionExpression=None, ExpressionAttributeValues=None, IndexName=None):
         pk = ExpressionAttributeValues[':pk']
-        items = [v for k,v in self.items.items() if k[0] == pk]
+        prefix = ExpressionAttributeValues.get(':sk', '')
+        items = [v for k,v in self.items.items() if k[0] == pk and k[1].startswith(prefix)]
         return {'Items': items}
     def get_item(self, Key):
         k = (Key['PK'], Key['SK'])
@@ -29,6 +37,29 @@ class DummyTable:
         k = (Key['PK'], Key['SK'])
         if k in self.items: del self.items[k]
         self.delete_called = True
+    def transact(self, actions):
+        self.transactions = getattr(self, 'transactions', 0) + 1
+        for action in actions:
+            (kind, params), = action.items()
+            item = params.get('Item') or params['Key']
+            current = self.items.get((item['PK'], item['SK']))
+            condition = params.get('ConditionExpression')
+            if condition == 'attribute_exists(PK)':
+                ok = current is not None
+            elif condition == 'attribute_not_exists(PK)':
+                ok = current is None
+            elif condition == 'attribute_not_exists(PK) OR task_type = :task':
+                ok = current is None or current.get('task_type') == params['ExpressionAttributeValues'][':task']
+            else:
+                ok = not condition
+            if not ok:
+                raise TransactionCanceled()
+        for action in actions:
+            (kind, params), = action.items()
+            if kind == 'Put':
+                self.put_item(params['Item'])
+            else:
+                self.delete_item(params['Key'])
     def update_item(self, Key, UpdateExpression, ExpressionAttributeValues):
         k = (Key['PK'], Key['SK'])
         item = self.items.get(k)
@@ -53,11 +84,120 @@ def test_get_shifts_by_date_returns_shift_id(monkeypatch):
 def test_update_shift_reassigns_employee(monkeypatch):
     dummy = DummyTable()
     monkeypatch.setattr(shift_crud, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
     event = {'pathParameters': {'id': 'SHIFT#2025-12-01#E1#milking'}, 'body': json.dumps({'employee_id': 'E2'})}
     res = shift_crud.update_shift(event)
     assert res['statusCode'] == 200
-    assert dummy.put_called is True
-    assert dummy.delete_called is True
+    assert dummy.transactions == 1
+    assert sorted(dummy.items) == [('SHIFT#2025-12-01', 'EMP#E2#milking'), ('SHIFTLOCK#2025-12-01', 'EMP#E2')]
+
+    # E2 now holds the lock for the day, so no other shift can be moved onto E2
+    shift_crud.create_shift({'body': json.dumps({'date': '2025-12-01', 'employee_id': 'E1', 'task_type': 'feeding',
+                                                 'start_time': '08:00', 'end_time': '09:00'})})
+    event = {'pathParameters': {'id': 'SHIFT#2025-12-01#E1#feeding'}, 'body': json.dumps({'employee_id': 'E2'})}
+    assert shift_crud.update_shift(event)['statusCode'] == 400
+    assert ('SHIFT#2025-12-01', 'EMP#E1#feeding') in dummy.items
+
+
+def test_create_shift_is_guarded_by_lock_item(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(shift_crud, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    def create(employee_id, task_type):
+        return shift_crud.create_shift({'body': json.dumps({'date': '2025-12-02', 'employee_id': employee_id,
+                                                            'task_type': task_type, 'start_time': '05:00',
+                                                            'end_time': '07:00'})})['statusCode']
+
+    assert create('E1', 'milking') == 201
+    assert dummy.items[('SHIFTLOCK#2025-12-02', 'EMP#E1')]['task_type'] == 'milking'
+    # a concurrent writer that the day query would not see still loses on the lock item
+    dummy.query = lambda **kwargs: {'Items': []}
+    assert create('E1', 'feeding') == 400
+    assert ('SHIFT#2025-12-02', 'EMP#E1#feeding') not in dummy.items
+
+    shift_crud.delete_shift({'pathParameters': {'id': 'SHIFT#2025-12-02#E1#milking'}})
+    assert create('E1', 'feeding') == 201
+
+
+def test_delete_shift_keeps_a_lock_that_guards_another_shift(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(shift_crud, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+    lock = ('SHIFTLOCK#2025-12-01', 'EMP#E1')
+    dummy.items[lock] = {'PK': lock[0], 'SK': lock[1], 'task_type': 'milking'}
+
+    def delete(shift_id):
+        return shift_crud.delete_shift({'pathParameters': {'id': shift_id}})['statusCode']
+
+    # a stale id (wrong task_type) is a 404 and leaves E1's lock alone
+    assert delete('SHIFT#2025-12-01#E1#feeding') == 404
+    assert lock in dummy.items
+
+    # deleting one of two legacy duplicates keeps the lock for the other
+    dummy.items[('SHIFT#2025-12-01', 'EMP#E1#feeding')] = {'PK': 'SHIFT#2025-12-01', 'SK': 'EMP#E1#feeding'}
+    assert delete('SHIFT#2025-12-01#E1#milking') == 200
+    assert lock in dummy.items
+
+    # the last shift of the day takes the lock with it only if the lock points at it
+    assert delete('SHIFT#2025-12-01#E1#feeding') == 200
+    assert lock in dummy.items
+    dummy.items[('SHIFT#2025-12-01', 'EMP#E1#milking')] = {'PK': 'SHIFT#2025-12-01', 'SK': 'EMP#E1#milking'}
+    assert delete('SHIFT#2025-12-01#E1#milking') == 200
+    assert lock not in dummy.items
+
+
+def test_batch_applies_operations_and_rolls_back_on_conflict(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(shift_crud, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+    monkeypatch.setattr(repositories.ShiftRepo, 'TRANSACT_MAX_ITEMS', 4)
+
+    def batch(operations):
+        res = shift_crud.lambda_handler({'httpMethod': 'POST', 'path': '/shifts/batch',
+                                         'body': json.dumps({'operations': operations})}, None)
+        return res['statusCode'], json.loads(res['body'])
+
+    def create(day, employee_id, task_type='milking'):
+        return {'op': 'create', 'date': f'2025-12-0{day}', 'employee_id': employee_id,
+                'task_type': task_type, 'start_time': '05:00', 'end_time': '07:00'}
+
+    # one shift per employee per day is checked against the day index as operations apply
+    status, body = batch([create(1, 'E2'), create(1, 'E2', 'feeding'), create(2, 'E1'),
+                          {'op': 'delete', 'shift_id': 'SHIFT#2025-12-03#E9#milking'}])
+    assert status == 400
+    assert [error['index'] for error in body['errors']] == [1, 3]
+    assert len(dummy.items) == 1
+
+    # E1 moves to another task on the same day; touching the same key twice splits the chunk
+    status, body = batch([
+        {'op': 'move', 'shift_id': 'SHIFT#2025-12-01#E1#milking', 'employee_id': 'E3', 'start_time': '06:00'},
+        create(1, 'E1', 'feeding'), create(2, 'E1'),
+        {'op': 'delete', 'shift_id': 'SHIFT#2025-12-02#E1#milking'}, create(2, 'E1'),
+    ])
+    assert status == 200
+    assert body['applied'] == 5 and body['transactions'] == 4
+    assert body['results'][0]['shift_id'] == 'SHIFT#2025-12-01#E3#milking'
+    assert dummy.items[('SHIFT#2025-12-01', 'EMP#E3#milking')]['start_time'] == '06:00'
+    assert sorted(dummy.items) == [('SHIFT#2025-12-01', 'EMP#E1#feeding'), ('SHIFT#2025-12-01', 'EMP#E3#milking'),
+                                   ('SHIFT#2025-12-02', 'EMP#E1#milking'), ('SHIFTLOCK#2025-12-01', 'EMP#E1'),
+                                   ('SHIFTLOCK#2025-12-01', 'EMP#E3'), ('SHIFTLOCK#2025-12-02', 'EMP#E1')]
+
+    # a later chunk that loses a race undoes the chunks already written
+    before = {key: dict(item) for key, item in dummy.items.items()}
+    dummy.transactions = 0
+    original = dummy.transact
+    def racing(actions):
+        if dummy.transactions == 1:
+            dummy.items[('SHIFT#2025-12-05', 'EMP#E5#milking')] = {'PK': 'SHIFT#2025-12-05', 'SK': 'EMP#E5#milking'}
+        return original(actions)
+    dummy.transact = racing
+    status, body = batch([{'op': 'delete', 'shift_id': 'SHIFT#2025-12-01#E1#feeding'},
+                          {'op': 'update', 'shift_id': 'SHIFT#2025-12-01#E3#milking', 'end_time': '08:00'},
+                          create(4, 'E4'), create(5, 'E5')])
+    assert status == 409
+    del dummy.items[('SHIFT#2025-12-05', 'EMP#E5#milking')]
+    assert dummy.items == before
 
 
 def test_get_shifts_for_employee_by_month(monkeypatch):
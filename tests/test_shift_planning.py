@@ -0,0 +1,276 @@
+import sys, os, json, importlib
+from datetime import datetime
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import shift_planning
+import shift_assignment
+from common import repositories
+from common.repositories import ShiftRepo
+importlib.reload(shift_assignment)
+
+
+class Cancelled(Exception):
+    def __init__(self, reasons):
+        super().__init__('TransactionCanceledException')
+        self.response = {'Error': {'Code': 'TransactionCanceledException'},
+                         'CancellationReasons': [{'Code': r} for r in reasons]}
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = {}
+        self.query_count = 0
+        self.put_item_count = 0
+        self.batches = []
+        self.transactions = []
+    def query(self, KeyConditionExpression=None, ExpressionAttributeValues=None, IndexName=None, ExclusiveStartKey=None, **kwargs):
+        self.query_count += 1
+        pk = ExpressionAttributeValues[':pk']
+        if IndexName == 'GSI3':
+            items = sorted((v for v in self.items.values() if v.get('GSI3PK') == pk), key=lambda v: v['GSI3SK'])
+            # serve two items per page to exercise LastEvaluatedKey handling
+            start = int(ExclusiveStartKey['offset']) if ExclusiveStartKey else 0
+            page = {'Items': items[start:start + 2]}
+            if start + 2 < len(items):
+                page['LastEvaluatedKey'] = {'offset': start + 2}
+            return page
+        return {'Items': [v for k, v in self.items.items() if k[0] == pk]}
+    def get_item(self, Key):
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': item} if item else {}
+    def put_item(self, Item, ConditionExpression=None):
+        self.put_item_count += 1
+        self.items[(Item['PK'], Item['SK'])] = Item
+    def delete_item(self, Key, ReturnValues=None):
+        item = self.items.pop((Key['PK'], Key['SK']), None)
+        return {'Attributes': item} if item and ReturnValues == 'ALL_OLD' else {}
+    def transact(self, actions):
+        items = [action['Put']['Item'] for action in actions]
+        reasons = ['ConditionalCheckFailed' if (item['PK'], item['SK']) in self.items else 'None' for item in items]
+        if 'ConditionalCheckFailed' in reasons:
+            raise Cancelled(reasons)
+        self.transactions.append([('put', item['PK'], item['SK']) for item in items])
+        for item in items:
+            self.items[(item['PK'], item['SK'])] = item
+    def ops(self):
+        return [op for writes in self.batches + self.transactions for op in writes]
+    def batch_writer(self, overwrite_by_pkeys=None):
+        table = self
+        class BW:
+            def __enter__(self_inner):
+                table.batches.append([])
+                return self_inner
+            def __exit__(self_inner, *a): pass
+            def put_item(self_inner, Item):
+                table.batches[-1].append(('put', Item['PK'], Item['SK']))
+                table.items[(Item['PK'], Item['SK'])] = Item
+            def delete_item(self_inner, Key):
+                table.batches[-1].append(('delete', Key['PK'], Key['SK']))
+                table.items.pop((Key['PK'], Key['SK']), None)
+        return BW()
+
+
+def next_month():
+    now = datetime.now()
+    return f"{now.year + 1}-{now.month:02d}"
+
+
+def test_plan_rejects_second_shift_same_day():
+    month = next_month()
+    existing = {'PK': f'SHIFT#{month}-03', 'SK': 'EMP#E1#milking', 'start_time': '05:00', 'end_time': '07:00'}
+    plan = shift_planning.MonthShiftPlan(month, [existing])
+    assert plan.has_shift(f'{month}-03', 'E1')
+    assert not plan.add({'date': f'{month}-03', 'employee_id': 'E1', 'task_type': 'feeding', 'start_time': '08:00', 'end_time': '09:00'})
+    assert plan.add({'date': f'{month}-04', 'employee_id': 'E1', 'task_type': 'feeding', 'start_time': '08:00', 'end_time': '09:00'})
+    assert plan.pending_writes() == 1
+
+
+def test_generate_writes_through_batch_writer(monkeypatch):
+    dummy = DummyTable()
+    month = next_month()
+    for emp_id, skill in [('E1', 'milking'), ('E2', 'milking'), ('E3', 'feeding')]:
+        dummy.items[('EMPLOYEE', emp_id)] = {'PK': 'EMPLOYEE', 'SK': emp_id, 'name': emp_id, 'skills': [skill]}
+    old = {'PK': f'SHIFT#{month}-01', 'SK': 'EMP#E3#patrol', 'start_time': '14:00', 'end_time': '14:30',
+           'status': 'auto_assigned', 'GSI3PK': f'SHIFTMONTH#{month}', 'GSI3SK': f'{month}-01#EMP#E3#patrol'}
+    dummy.items[(old['PK'], old['SK'])] = old
+    monkeypatch.setattr(shift_assignment, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    event = {'body': json.dumps({'month': month, 'overwrite': True, 'preview': False, 'requirements': {'milking': 1, 'feeding': 1}})}
+    res = shift_assignment.generate_monthly_shifts(event)
+    assert res['statusCode'] == 200
+    body = json.loads(res['body'])
+
+    # the overwrite went through one batch writer and the new days through conditional transactions, no single puts
+    assert dummy.put_item_count == 0
+    assert len(dummy.batches) == 1 and dummy.transactions
+    assert all(len(writes) <= ShiftRepo.TRANSACT_MAX_ITEMS for writes in dummy.transactions)
+    assert ('delete', old['PK'], old['SK']) in dummy.batches[0]
+    assert len([op for op in dummy.ops() if op[0] == 'put' and op[1].startswith('SHIFT#')]) == len(body['shifts'])
+    assert (old['PK'], old['SK']) not in dummy.items
+    assert body['conflicts'] == []
+    # each new shift carries its one-shift-per-day lock; E3 keeps the day-1 lock, rewritten for the new task
+    assert len([op for op in dummy.ops() if op[0] == 'put' and op[1].startswith('SHIFTLOCK#')]) == len(body['shifts'])
+    assert ('delete', f'SHIFTLOCK#{month}-01', 'EMP#E3') not in dummy.batches[0]
+    assert dummy.items[(f'SHIFTLOCK#{month}-01', 'EMP#E3')]['task_type'] == 'feeding'
+
+
+def test_overwrite_commits_only_the_diff_and_keeps_manual_shifts(monkeypatch):
+    month = next_month()
+    day1, day2 = f'{month}-01', f'{month}-02'
+
+    def stored(date, emp, task, start, end, status='auto_assigned'):
+        return {**ShiftRepo.build_item({'date': date, 'employee_id': emp, 'task_type': task,
+                                        'start_time': start, 'end_time': end}, status), 'created_at': 'then'}
+
+    same = stored(day1, 'E1', 'milking', '05:00', '07:00')
+    moved = stored(day1, 'E2', 'feeding', '08:00', '09:00')
+    dropped = stored(day2, 'E3', 'patrol', '14:00', '14:30')
+    manual = stored(day2, 'E4', 'cleaning', '10:00', '11:30', status='scheduled')
+    plan = shift_planning.MonthShiftPlan(month, [same, moved, dropped, manual])
+    plan.clear()
+    assert not plan.has_shift(day1, 'E1') and plan.has_shift(day2, 'E4')
+
+    assert plan.add({'date': day1, 'employee_id': 'E1', 'task_type': 'milking', 'start_time': '05:00', 'end_time': '07:00'})
+    assert plan.add({'date': day1, 'employee_id': 'E2', 'task_type': 'feeding', 'start_time': '08:00', 'end_time': '10:00'})
+    assert plan.add({'date': day2, 'employee_id': 'E5', 'task_type': 'patrol', 'start_time': '14:00', 'end_time': '14:30'})
+    assert not plan.add({'date': day2, 'employee_id': 'E4', 'task_type': 'patrol', 'start_time': '14:00', 'end_time': '14:30'})
+    # one attribute update, one insert, one delete; the identical milking shift is not rewritten
+    assert plan.pending_writes() == 3
+
+    dummy = DummyTable()
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+    plan.flush(dummy)
+    ops = sorted(dummy.ops())
+    assert ops == sorted([
+        ('put', moved['PK'], moved['SK']),
+        ('put', f'SHIFT#{day2}', 'EMP#E5#patrol'), ('put', f'SHIFTLOCK#{day2}', 'EMP#E5'),
+        ('delete', dropped['PK'], dropped['SK']), ('delete', f'SHIFTLOCK#{day2}', 'EMP#E3'),
+    ])
+    assert dummy.items[(moved['PK'], moved['SK'])]['end_time'] == '10:00'
+    assert dummy.items[(moved['PK'], moved['SK'])]['created_at'] == 'then'
+    # the new E5 day is inserted together with its lock, only if no lock exists yet
+    assert dummy.transactions == [[('put', f'SHIFT#{day2}', 'EMP#E5#patrol'), ('put', f'SHIFTLOCK#{day2}', 'EMP#E5')]]
+
+
+def test_flush_reports_days_created_after_loading_as_conflicts(monkeypatch):
+    month = next_month()
+    day1, day2 = f'{month}-01', f'{month}-02'
+    plan = shift_planning.MonthShiftPlan(month, [])
+    assert plan.add({'date': day1, 'employee_id': 'E1', 'task_type': 'milking', 'start_time': '05:00', 'end_time': '07:00'})
+    assert plan.add({'date': day2, 'employee_id': 'E1', 'task_type': 'milking', 'start_time': '05:00', 'end_time': '07:00'})
+
+    # someone creates a manual shift for E1 on day 2 after the plan was loaded
+    dummy = DummyTable()
+    manual = ShiftRepo.build_item({'date': day2, 'employee_id': 'E1', 'task_type': 'cleaning',
+                                   'start_time': '10:00', 'end_time': '11:00'}, 'scheduled')
+    dummy.items[(manual['PK'], manual['SK'])] = manual
+    dummy.items[(f'SHIFTLOCK#{day2}', 'EMP#E1')] = ShiftRepo.lock_item(manual)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    assert plan.flush(dummy) == 2
+    assert plan.conflict_keys() == {(day2, 'E1')}
+    assert not plan.has_shift(day2, 'E1') and plan.has_shift(day1, 'E1')
+    # the manual day is left as it was; its lock is not put over
+    assert (f'SHIFT#{day2}', 'EMP#E1#milking') not in dummy.items
+    assert dummy.items[(f'SHIFTLOCK#{day2}', 'EMP#E1')]['task_type'] == 'cleaning'
+    assert dummy.items[(f'SHIFTLOCK#{day1}', 'EMP#E1')]['task_type'] == 'milking'
+    shifts = [{'date': day1, 'employee_id': 'E1'}, {'date': day2, 'employee_id': 'E1'}]
+    assert plan.without_conflicts(shifts) == shifts[:1]
+
+
+def test_overwrite_regenerates_only_days_whose_inputs_changed(monkeypatch):
+    dummy = DummyTable()
+    month = next_month()
+    for emp_id in ('E1', 'E2'):
+        dummy.items[('EMPLOYEE', emp_id)] = {'PK': 'EMPLOYEE', 'SK': emp_id, 'name': emp_id, 'skills': ['milking']}
+    monkeypatch.setattr(shift_assignment, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    def generate(**extra):
+        dummy.batches, dummy.transactions = [], []
+        event = {'body': json.dumps({'month': month, 'overwrite': True, 'requirements': {'milking': 1}, **extra})}
+        return json.loads(shift_assignment.generate_monthly_shifts(event)['body'])
+
+    first = generate()
+    days = first['regenerated_days']
+    assert first['unchanged_days'] == 0 and len(first['shifts']) == days
+    assert dummy.items[(f'SHIFTGEN#{month}', 'FINGERPRINTS')]['days'].keys() == {s['date'] for s in first['shifts']}
+
+    # nothing changed: no day is rebuilt and nothing is written
+    again = generate()
+    assert (again['regenerated_days'], again['unchanged_days'], again['shifts']) == (0, days, [])
+    assert dummy.batches == [] and dummy.transactions == []
+
+    # a manual edit on day 3 changes only that day's fingerprint; the manual shift is kept and covers the demand
+    day3 = next(item for item in dummy.items.values()
+                if item['PK'] == f'SHIFT#{month}-03' and item.get('status') == 'auto_assigned')
+    day3['status'] = 'confirmed'
+    edited = generate()
+    assert (edited['regenerated_days'], edited['shifts']) == (1, [])
+    assert dummy.items[(day3['PK'], day3['SK'])]['status'] == 'confirmed'
+
+    assert generate(full=True)['regenerated_days'] == days
+
+
+def test_preview_draft_is_committed_without_resolving(monkeypatch):
+    dummy = DummyTable()
+    month = next_month()
+    for emp_id in ('E1', 'E2'):
+        dummy.items[('EMPLOYEE', emp_id)] = {'PK': 'EMPLOYEE', 'SK': emp_id, 'name': emp_id, 'skills': ['milking']}
+    monkeypatch.setattr(shift_assignment, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    def preview():
+        event = {'body': json.dumps({'month': month, 'overwrite': True, 'preview': True, 'requirements': {'milking': 1}})}
+        return json.loads(shift_assignment.generate_monthly_shifts(event)['body'])
+
+    def commit(draft_id):
+        event = {'httpMethod': 'POST', 'path': f'/shifts/drafts/{draft_id}/commit', 'pathParameters': {'id': draft_id}}
+        return shift_assignment.lambda_handler(event, None)
+
+    draft = preview()
+    assert {s['shift_type'] for s in draft['shifts']} == {'morning'}
+    stored = dummy.items[(f'SHIFTDRAFT#{draft["draft_id"]}', 'DRAFT')]
+    assert isinstance(stored['document'], bytes) and stored['expires_at'] == draft['expires_at']
+    assert not [key for key in dummy.items if key[0].startswith(('SHIFT#', 'SHIFTLOCK#'))]
+
+    # the commit applies the stored plan; the solver is not run again
+    monkeypatch.setattr(shift_assignment.shift_solver, 'solve_month', lambda *a, **k: 1 / 0)
+    # a failed write keeps the draft so the same commit can be retried
+    flush = shift_planning.MonthShiftPlan.flush
+    monkeypatch.setattr(shift_planning.MonthShiftPlan, 'flush', lambda *a, **k: 1 / 0)
+    assert commit(draft['draft_id'])['statusCode'] == 500
+    assert (f'SHIFTDRAFT#{draft["draft_id"]}', 'DRAFT') in dummy.items
+    monkeypatch.setattr(shift_planning.MonthShiftPlan, 'flush', flush)
+    res = commit(draft['draft_id'])
+    assert res['statusCode'] == 200
+    assert json.loads(res['body'])['shifts'] == draft['shifts']
+    saved = sorted((item['PK'][6:], item['SK']) for item in dummy.items.values() if item['PK'].startswith('SHIFT#'))
+    assert saved == sorted((s['date'], f"EMP#{s['employee_id']}#milking") for s in draft['shifts'])
+    assert (f'SHIFTGEN#{month}', 'FINGERPRINTS') in dummy.items
+    assert commit(draft['draft_id'])['statusCode'] == 404
+
+    # a draft made before someone edited the month is rejected
+    monkeypatch.undo()
+    monkeypatch.setattr(shift_assignment, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+    stale = preview()
+    next(item for item in dummy.items.values() if item['PK'].startswith('SHIFT#'))['status'] = 'confirmed'
+    assert commit(stale['draft_id'])['statusCode'] == 409
+
+
+def test_get_shifts_by_month_reads_month_index_pages(monkeypatch):
+    dummy = DummyTable()
+    month = next_month()
+    for day, emp in [('02', 'E2'), ('01', 'E1'), ('03', 'E3'), ('01', 'E4'), ('05', 'E1')]:
+        item = ShiftRepo.build_item({'date': f'{month}-{day}', 'employee_id': emp, 'task_type': 'milking', 'start_time': '05:00', 'end_time': '07:00'}, status='scheduled')
+        dummy.items[(item['PK'], item['SK'])] = item
+    monkeypatch.setattr(shift_assignment, 'table', dummy)
+
+    res = shift_assignment.get_shifts_by_month(month)
+    body = json.loads(res['body'])
+    assert [(s['date'][-2:], s['employee_id']) for s in body] == [('01', 'E1'), ('01', 'E4'), ('02', 'E2'), ('03', 'E3'), ('05', 'E1')]
+    # one paginated query instead of one per day
+    assert dummy.query_count == 3
@@ -0,0 +1,64 @@
+import sys, os, importlib
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import shift_reconciler
+importlib.reload(shift_reconciler)
+
+
+class DummyTable:
+    def __init__(self, items):
+        self.items = {(i['PK'], i['SK']): i for i in items}
+        self.segments_seen = set()
+        self.deleted = []
+    def scan(self, FilterExpression=None, ExpressionAttributeValues=None, Segment=0, TotalSegments=1, ExclusiveStartKey=None):
+        self.segments_seen.add(Segment)
+        start, end = ExpressionAttributeValues[':start'], ExpressionAttributeValues[':end']
+        keys = sorted(k for k in self.items if start <= k[0] <= end)
+        return {'Items': [self.items[k] for i, k in enumerate(keys) if i % TotalSegments == Segment]}
+    def batch_writer(self, overwrite_by_pkeys=None):
+        table = self
+        class BW:
+            def __enter__(self_inner): return self_inner
+            def __exit__(self_inner, *a): pass
+            def put_item(self_inner, Item):
+                table.items[(Item['PK'], Item['SK'])] = Item
+            def delete_item(self_inner, Key):
+                table.deleted.append((Key['PK'], Key['SK']))
+                table.items.pop((Key['PK'], Key['SK']), None)
+        return BW()
+
+
+ITEMS = [
+    {'PK': 'SHIFT#2030-01-01', 'SK': 'EMP#E1#milking'},
+    {'PK': 'SHIFT#2030-01-01', 'SK': 'EMP#E1#feeding'},
+    {'PK': 'SHIFT#2030-01-01', 'SK': 'EMP#E2#milking'},
+    {'PK': 'SHIFT#2030-01-02', 'SK': 'EMP#E1#patrol'},
+    {'PK': 'SHIFT#2030-02-01', 'SK': 'EMP#E3#milking'},
+    {'PK': 'SHIFT#2030-02-01', 'SK': 'EMP#E3#patrol'},
+]
+
+
+def test_dry_run_reports_without_deleting(monkeypatch):
+    dummy = DummyTable(ITEMS)
+    monkeypatch.setattr(shift_reconciler, 'table', dummy)
+    report = shift_reconciler.reconcile_duplicates('2030-01-01', '2030-01-31', dry_run=True, segments=3)
+    assert dummy.segments_seen == {0, 1, 2}
+    assert report['scanned'] == 4
+    assert report['duplicate_groups'] == 1
+    assert report['groups'][0]['kept'] == 'EMP#E1#feeding'
+    assert report['groups'][0]['removed'] == [{'PK': 'SHIFT#2030-01-01', 'SK': 'EMP#E1#milking'}]
+    assert report['deleted'] == 0
+    assert dummy.deleted == []
+
+
+def test_apply_deletes_only_duplicates_in_range(monkeypatch):
+    dummy = DummyTable(ITEMS)
+    monkeypatch.setattr(shift_reconciler, 'table', dummy)
+    report = shift_reconciler.reconcile_duplicates('2030-01-01', '2030-01-31', dry_run=False, segments=2)
+    assert report['deleted'] == 1
+    assert dummy.deleted == [('SHIFT#2030-01-01', 'EMP#E1#milking')]
+    # the day's lock follows the kept row
+    assert dummy.items[('SHIFTLOCK#2030-01-01', 'EMP#E1')]['task_type'] == 'feeding'
+    # February duplicate is outside the range and left alone
+    assert ('SHIFT#2030-02-01', 'EMP#E3#patrol') in dummy.items
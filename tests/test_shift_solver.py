@@ -0,0 +1,80 @@
+import sys, os, time
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import shift_solver
+
+
+def make_month(employee_count, task_count, day_count=31, per_task=2):
+    tasks = [f'task{t}' for t in range(task_count)]
+    employees = [
+        {'id': f'{e:03d}', 'skills': [tasks[e % task_count], tasks[(e + 1) % task_count], tasks[(e + 3) % task_count]], 'max_hours_per_day': 8}
+        for e in range(employee_count)
+    ]
+    days = [f'2030-01-{d:02d}' for d in range(1, day_count + 1)]
+    demands = [[(task, f'{5 + i:02d}:00', f'{6 + i:02d}:00', per_task) for i, task in enumerate(tasks)] for _ in days]
+    return days, demands, employees
+
+
+def test_one_shift_per_day_and_skills():
+    days, demands, employees = make_month(12, 3)
+    result = shift_solver.solve_month(days, demands, employees)
+    skills = {e['id']: e['skills'] for e in employees}
+    seen = set()
+    for shift in result['assignments']:
+        key = (shift['date'], shift['employee_id'])
+        assert key not in seen
+        seen.add(key)
+        assert shift['task_type'] in skills[shift['employee_id']]
+    assert result['unfilled'] == []
+    assert len(result['assignments']) == 31 * 3 * 2
+
+
+def test_load_is_spread_across_skilled_employees():
+    employees = [{'id': f'E{i}', 'skills': ['milking']} for i in range(4)]
+    days = [f'2030-01-{d:02d}' for d in range(1, 29)]
+    demands = [[('milking', '05:00', '07:00', 1)] for _ in days]
+    result = shift_solver.solve_month(days, demands, employees)
+    counts = {}
+    for shift in result['assignments']:
+        counts[shift['employee_id']] = counts.get(shift['employee_id'], 0) + 1
+    # 28 days / 4 people -> everyone takes exactly 7 milking shifts
+    assert sorted(counts.values()) == [7, 7, 7, 7]
+
+
+def test_max_hours_and_unavailable_are_respected():
+    employees = [
+        {'id': 'E1', 'skills': ['cleaning'], 'max_hours_per_day': 1},
+        {'id': 'E2', 'skills': ['cleaning'], 'max_hours_per_day': 8},
+    ]
+    days = ['2030-01-01', '2030-01-02']
+    demands = [[('cleaning', '10:00', '11:30', 1)] for _ in days]
+    result = shift_solver.solve_month(days, demands, employees, unavailable={('2030-01-02', 'E2')})
+    assert [(s['date'], s['employee_id']) for s in result['assignments']] == [('2030-01-01', 'E2')]
+    assert result['unfilled'] == [{'date': '2030-01-02', 'task_type': 'cleaning', 'start_time': '10:00', 'end_time': '11:30', 'missing': 1}]
+
+
+def test_prior_assignments_count_towards_fairness():
+    employees = [{'id': 'E1', 'skills': ['milking']}, {'id': 'E2', 'skills': ['milking']}]
+    demands = [[('milking', '05:00', '07:00', 1)]]
+    prior = [{'employee_id': 'E1', 'task_type': 'milking'}] * 3
+    result = shift_solver.solve_month(['2030-01-05'], demands, employees, prior=prior)
+    assert [s['employee_id'] for s in result['assignments']] == ['E2']
+    prior = [{'employee_id': 'E2', 'task_type': 'milking'}] * 3
+    result = shift_solver.solve_month(['2030-01-05'], demands, employees, prior=prior)
+    assert [s['employee_id'] for s in result['assignments']] == ['E1']
+
+
+def test_unknown_solver_rejected():
+    try:
+        shift_solver.solve_month([], [], [], solver='nope')
+        assert False, 'expected ValueError'
+    except ValueError:
+        pass
+
+
+def test_sixty_employee_ten_task_month_is_fast():
+    days, demands, employees = make_month(60, 10)
+    started = time.perf_counter()
+    result = shift_solver.solve_month(days, demands, employees)
+    elapsed = time.perf_counter() - started
+    assert result['unfilled'] == []
+    assert elapsed < 10
@@ -0,0 +1,37 @@
+import sys, os, json, importlib
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import task_management
+importlib.reload(task_management)
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = {}
+    def put_item(self, Item):
+        self.items[(Item['PK'], Item['SK'])] = Item
+    def query(self, IndexName=None, KeyConditionExpression=None, ExpressionAttributeValues=None):
+        assert IndexName == 'GSI1'
+        pk = ExpressionAttributeValues[':pk']
+        items = [item for item in self.items.values() if item.get('GSI1PK') == pk]
+        return {'Items': sorted(items, key=lambda item: item['GSI1SK'])}
+    def scan(self, **kwargs):
+        raise AssertionError('task list must not scan the table')
+
+
+def test_tasks_are_listed_from_catalog_index(monkeypatch):
+    dummy = DummyTable()
+    # unrelated rows that a scan would have to read
+    dummy.put_item({'PK': 'SHIFT#2025-12-01', 'SK': 'EMP#001#1', 'GSI1PK': '001', 'GSI1SK': '2025-12-01'})
+    dummy.put_item({'PK': 'EMPLOYEE#001', 'SK': 'VACATION#1', 'GSI1PK': 'VACATION_REQUEST', 'GSI1SK': '2025-12-01#001_1'})
+    monkeypatch.setattr(task_management, 'table', dummy)
+
+    for task_type, name in [('10', '巡回'), ('2', '給餌'), ('1', '搾乳')]:
+        res = task_management.create_task({'task_type': task_type, 'name': name})
+        assert res['statusCode'] == 201
+    assert dummy.items[('TASK#2', 'CONFIG')]['GSI1PK'] == 'TASK_CATALOG'
+
+    res = task_management.get_tasks()
+    body = json.loads(res['body'])
+    assert [task['task_type'] for task in body] == ['1', '2', '10']
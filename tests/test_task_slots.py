@@ -0,0 +1,64 @@
+import sys, os
+from collections import defaultdict
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import task_slots
+from common.cache import reference_cache
+import shift_assignment
+
+
+class DummyTable:
+    """Serves the task catalog from GSI1 and counts the catalog queries"""
+    def __init__(self, tasks):
+        self.tasks = tasks
+        self.queries = 0
+    def get_item(self, Key):
+        return {}
+    def query(self, IndexName=None, ExpressionAttributeValues=None, **kwargs):
+        self.queries += 1
+        return {'Items': [dict(task) for task in self.tasks]}
+
+
+def catalog_item(task_type, **times):
+    return {'PK': f'TASK#{task_type}', 'SK': 'CONFIG', 'GSI1PK': 'TASK_CATALOG', 'task_type': task_type, **times}
+
+
+def test_compile_prefers_catalog_times_and_registers_aliases():
+    slots = task_slots.compile_slots([
+        catalog_item('1', morning_start_time='04:30', morning_end_time='06:30',
+                     afternoon_start_time='16:30', afternoon_end_time='18:30'),
+        catalog_item('5', recommended_start_time='22:00', recommended_end_time='01:00'),
+        catalog_item('6', morning_start_time='bad', morning_end_time='07:00'),
+    ])
+    assert slots.times('milking') == slots.times('1') == [('04:30', '06:30'), ('16:30', '18:30')]
+    assert slots.for_half('1', 'afternoon').minutes == 120
+    # no catalog times: the built-in slots, reachable under both ids
+    assert slots.times('2') == slots.times('feeding') == [('08:00', '09:00'), ('16:00', '17:00')]
+    night = slots.first('5')
+    assert (night.start, night.end, night.minutes, night.half) == (1320, 1500, 180, None)
+    assert '6' not in slots
+    assert slots.times('unknown', [task_slots.FALLBACK_SLOT]) == [('09:00', '17:00')]
+    # shift_type: the catalog label, else morning when the slot starts before noon
+    assert slots.half_of('1', '16:30', '18:30') == 'afternoon'
+    assert slots.half_of('5', '22:00', '01:00') == 'afternoon'
+    assert slots.half_of('unknown', '09:00', '17:00') == 'morning'
+
+    demands = shift_assignment.requirements_to_demands({'milking': {'morning': 1, 'afternoon': 2}, '5': 1}, slots)
+    assert demands == [('milking', '04:30', '06:30', 1), ('milking', '16:30', '18:30', 2), ('5', '22:00', '01:00', 1)]
+
+    employees = [{'id': 'E1', 'name': 'a', 'skills': ['5']}]
+    assignments = shift_assignment.auto_assign_shifts('2030-01-01', [{'task_type': '5', 'count': 1}],
+                                                      employees, defaultdict(list), slots=slots)
+    assert [(a['start_time'], a['end_time']) for a in assignments] == [('22:00', '01:00')]
+
+
+def test_load_reuses_compiled_table_until_catalog_changes():
+    dummy = DummyTable([catalog_item('1', morning_start_time='05:00', morning_end_time='06:00')])
+    first = task_slots.load(dummy)
+    assert task_slots.load(dummy) is first
+    assert dummy.queries == 1
+
+    dummy.tasks[0]['morning_end_time'] = '06:30'
+    reference_cache.invalidate(dummy, 'tasks')
+    assert task_slots.load(dummy).times('milking')[0] == ('05:00', '06:30')
@@ -0,0 +1,165 @@
+import sys, os, json, importlib
+os.environ.setdefault('TABLE_NAME', 'TEST_TABLE')
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+from common import repositories
+import vacation_management
+import employee_management
+importlib.reload(vacation_management)
+importlib.reload(employee_management)
+
+
+class DummyTable:
+    def __init__(self):
+        self.items = {}
+        self.queried = []
+    def get_item(self, Key):
+        item = self.items.get((Key['PK'], Key['SK']))
+        return {'Item': dict(item)} if item else {}
+    def query(self, KeyConditionExpression, FilterExpression, ExpressionAttributeValues, ExpressionAttributeNames=None):
+        values = ExpressionAttributeValues
+        self.queried.append(values[':pk'])
+        items = [dict(item) for (pk, sk), item in sorted(self.items.items())
+                 if pk == values[':pk'] and item['start_date'] <= values[':to'] and item['end_date'] >= values[':from']
+                 and item['status'] == values.get(':status', item['status'])]
+        return {'Items': items}
+    def transact(self, actions):
+        for action in actions:
+            (kind, params), = action.items()
+            if kind == 'Put':
+                self.items[(params['Item']['PK'], params['Item']['SK'])] = params['Item']
+            elif kind == 'Update':
+                item = self.items.setdefault((params['Key']['PK'], params['Key']['SK']), dict(params['Key']))
+                names, values = params['ExpressionAttributeNames'], params['ExpressionAttributeValues']
+                for placeholder, name in names.items():
+                    if placeholder.startswith('#c'):
+                        item[name] = item.get(name, 0) + values[':' + placeholder[1:]]
+            else:
+                self.items.pop((params['Key']['PK'], params['Key']['SK']), None)
+
+
+def create(employee_id, start, end, status='applying', **extra):
+    body = {'employee_id': employee_id, 'start_date': start, 'end_date': end, 'status': status, **extra}
+    res = vacation_management.create_vacation_request({'body': json.dumps(body)})
+    assert res['statusCode'] == 201
+    return json.loads(res['body'])['request_id']
+
+
+def in_range(date_from, date_to, status=None):
+    params = {'from': date_from, 'to': date_to}
+    if status:
+        params['status'] = status
+    res = vacation_management.lambda_handler({'httpMethod': 'GET', 'path': '/vacation-requests',
+                                              'queryStringParameters': params}, None)
+    return res['statusCode'], json.loads(res['body'])
+
+
+def test_range_query_reads_only_overlapping_months(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(vacation_management, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    long_leave = create('001', '2025-11-25', '2026-01-05')
+    create('002', '2025-12-10', '2025-12-10')
+    create('003', '2025-10-01', '2025-10-02')
+    assert sorted(pk for pk, sk in dummy.items if pk.startswith('VACMONTH#')) == [
+        'VACMONTH#2025-10', 'VACMONTH#2025-11', 'VACMONTH#2025-12', 'VACMONTH#2025-12', 'VACMONTH#2026-01'
+    ]
+    assert ('VACMONTH#2026-01', f'EMP#001#{long_leave}') in dummy.items
+
+    status, body = in_range('2025-12-01', '2025-12-31')
+    assert status == 200
+    assert [item['employee_id'] for item in body] == ['001', '002']
+    assert dummy.queried == ['VACMONTH#2025-12']
+
+    res = vacation_management.update_vacation_request(long_leave, {'body': json.dumps({'status': 'approved'})})
+    assert res['statusCode'] == 200
+    status, body = in_range('2025-11-01', '2026-01-31', status='approved')
+    assert [item['request_id'] for item in body] == [long_leave]
+
+    vacation_management.delete_vacation_request(long_leave)
+    assert not [key for key in dummy.items if key[1].endswith(long_leave)]
+
+    assert in_range('2025-12-31', '2025-12-01')[0] == 400
+    assert in_range('2020-01-01', '2025-12-01')[0] == 400
+
+
+def test_ledger_follows_create_approve_and_delete(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(vacation_management, 'table', dummy)
+    monkeypatch.setattr(employee_management, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+    dummy.items[('EMPLOYEE', '001')] = {'PK': 'EMPLOYEE', 'SK': '001', 'vacation_days': 10}
+
+    def used(fiscal_year):
+        res = employee_management.get_vacation_used('001', {'queryStringParameters': {'fiscal_year': str(fiscal_year)}})
+        return json.loads(res['body'])
+
+    # fiscal year starts in April: 2026-03-30..04-01 is split 2 days / 1 day
+    spring = create('001', '2026-03-30', '2026-04-01', type='paid')
+    half = create('001', '2026-04-10', '2026-04-10', type='paid', time_type='morning')
+    assert used(2025)['pending_days'] == 2
+    assert used(2026)['pending_days'] == 1.5
+
+    vacation_management.update_vacation_request(spring, {'body': json.dumps({'status': 'approved'})})
+    body = used(2026)
+    assert (body['used_days'], body['pending_days'], body['remaining_days']) == (1, 0.5, 9)
+    assert body['by_type']['paid'] == {'used_days': 1, 'pending_days': 0.5}
+
+    vacation_management.update_vacation_request(half, {'body': json.dumps({'status': 'rejected'})})
+    vacation_management.delete_vacation_request(spring)
+    assert (used(2025)['used_days'], used(2026)['used_days'], used(2026)['pending_days']) == (0, 0, 0)
+
+
+class TransactionCanceled(Exception):
+    response = {'Error': {'Code': 'TransactionCanceledException'}}
+
+
+def test_untyped_requests_share_one_ledger_type_and_racing_delete_is_409(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(vacation_management, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    request_id = create('001', '2026-05-01', '2026-05-01')
+    legacy = {'start_date': '2026-05-02', 'status': 'applying'}
+    created = next(item for (pk, sk), item in dummy.items.items() if sk.endswith(request_id.split('_', 1)[1]))
+    assert created['type'] == repositories.VacationRepo.DEFAULT_TYPE
+    assert set(repositories.VacationLedgerRepo.contributions(legacy)) == {
+        (2026, 'pending_days'), (2026, f'pending_days#{repositories.VacationRepo.DEFAULT_TYPE}')}
+
+    def cancelled(table, actions):
+        raise TransactionCanceled()
+    monkeypatch.setattr(repositories, 'transact_write', cancelled)
+    res = vacation_management.delete_vacation_request(request_id)
+    assert res['statusCode'] == 409
+
+
+def test_legacy_date_only_requests_can_be_updated_and_deleted(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(vacation_management, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+    dummy.items[('EMPLOYEE#005', 'VACATION#1')] = {'PK': 'EMPLOYEE#005', 'SK': 'VACATION#1', 'date': '2025-12-05', 'status': 'applying'}
+    dummy.items[('EMPLOYEE#005', 'VACATION#2')] = {'PK': 'EMPLOYEE#005', 'SK': 'VACATION#2', 'status': 'applying'}
+
+    res = vacation_management.update_vacation_request('005_1', {'body': json.dumps({'status': 'approved'})})
+    assert res['statusCode'] == 200
+    copy = dummy.items[('VACMONTH#2025-12', 'EMP#005#005_1')]
+    assert (copy['start_date'], copy['end_date'], copy['status']) == ('2025-12-05', '2025-12-05', 'approved')
+    # no date at all: only the request itself is written
+    res = vacation_management.update_vacation_request('005_2', {'body': json.dumps({'status': 'approved'})})
+    assert res['statusCode'] == 200
+    assert [key for key in dummy.items if key[0].startswith('VACMONTH#')] == [('VACMONTH#2025-12', 'EMP#005#005_1')]
+
+    for request_id in ('005_1', '005_2'):
+        assert vacation_management.delete_vacation_request(request_id)['statusCode'] == 200
+    assert not [key for key in dummy.items if key[0].startswith(('VACMONTH#', 'EMPLOYEE#005'))]
+
+
+def test_null_end_date_is_a_single_day_request(monkeypatch):
+    dummy = DummyTable()
+    monkeypatch.setattr(vacation_management, 'table', dummy)
+    monkeypatch.setattr(repositories, 'transact_write', lambda table, actions: table.transact(actions))
+
+    request_id = create('006', '2025-12-08', None)
+    item = next(item for item in dummy.items.values() if item.get('request_id') == request_id and item['PK'].startswith('EMPLOYEE#'))
+    assert item['end_date'] == '2025-12-08'
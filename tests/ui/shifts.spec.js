@@ -3,6 +3,11 @@ const path = require('path');
 
 test('menu -> shifts: no modal on load, month defaults to current, click day opens modal', async ({ page }) => {
   // Stub backend endpoints used during page load to keep test deterministic
+  await page.route('**/bootstrap/shift-calendar**', route => {
+    const month = new URL(route.request().url()).searchParams.get('month');
+    const payload = { month, employees: [], tasks: [], requirements: { default: {}, daily: {} }, vacations: [], confirmation: { confirmation_day: 25 }, shifts: [] };
+    route.fulfill({ status: 200, body: JSON.stringify(payload), headers: { 'Content-Type': 'application/json', 'ETag': '"test"' } });
+  });
   await page.route('**/shifts/by-month/**', route => route.fulfill({ status: 200, body: '[]', headers: { 'Content-Type': 'application/json' } }));
   await page.route('**/shifts/by-date/**', route => route.fulfill({ status: 200, body: '[]', headers: { 'Content-Type': 'application/json' } }));
   await page.route('**/tasks', route => route.fulfill({ status: 200, body: '[]', headers: { 'Content-Type': 'application/json' } }));